@@ -1,10 +1,21 @@
 import os
-import requests
-import json
-from typing import List, Dict, Any
+import re
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 import itertools
+from concurrent.futures import ThreadPoolExecutor, wait
+from geo_utils import estimate_drive, haversine_meters_many
+from llm_cache import get_llm_cache, request_key
+from maps_client import get_maps_client
+from places_cache import places_cache
+from price_catalog import get_price_catalog
+from price_matrix import PriceMatrix, SubsetCostEngine
+from rate_limit import QuotaExceeded
+from route_solver import TravelMatrix
 from secrets_utils import get_secret
-
+from store_directory import get_store_directory
+from telemetry import count, span, submit_in_context
 
 try:
     from google.adk import Agent, AgentRequest, AgentResponse
@@ -37,13 +48,28 @@ try:
             if self._adk_agent is None:
                 return f"[ADK AGENT {self.name}] Agent not available, processing: {str(request)[:100]}..."
 
+            # Identical requests to the same agent are answered from the cache
+            cache = get_llm_cache()
+            key = request_key(self.name, self.model, self.instructions, request)
+            cached = cache.get(key) if cache is not None else None
+            if cached is not None:
+                count("cache.llm.hits")
+                return _decode_agent_response(cached)
+            count("cache.llm.misses")
+
             try:
                 if isinstance(request, (str, AgentRequest)):
-                    return self._adk_agent.run(request)
-                return self._adk_agent.run(AgentRequest(content=str(request)))
+                    response = self._adk_agent.run(request)
+                else:
+                    response = self._adk_agent.run(AgentRequest(content=str(request)))
             except Exception as e:
+                # Errors are returned as text but never cached
                 return f"[ADK AGENT {self.name}] Processed request: {str(request)[:100]}... (Error: {e})"
 
+            if cache is not None:
+                cache.put(key, _encode_agent_response(response))
+            return response
+
 except ImportError:
 
     ADK_AVAILABLE = False
@@ -74,159 +100,529 @@ except ImportError:
             self.content = content
 
 
+def _encode_agent_response(response) -> Dict:
+    if isinstance(response, AgentResponse):
+        return {"agent_response": True, "content": response.content}
+    return {"agent_response": False, "content": response}
+
+
+def _decode_agent_response(cached: Dict):
+    if cached["agent_response"]:
+        return AgentResponse(content=cached["content"])
+    return cached["content"]
+
+
 AVERAGE_GAS_PRICE_PER_GALLON = 3.50
 AVERAGE_VEHICLE_MPG = 25.0
 VALUE_OF_TIME_PER_HOUR = 20.00
 
+# Without a travel matrix every store combination needs its own Directions call,
+# so the no-preference search only considers plans of up to this many stores.
+MAX_DIRECTIONS_PLAN_STORES = 3
+
+# Chains searched when the user hasn't picked any
+DEFAULT_SEARCH_CHAINS = [
+    "Walmart",
+    "Target",
+    "Kroger",
+    "Costco",
+    "Whole Foods",
+    "Safeway",
+    "Meijer",
+]
+
+# Chains are searched concurrently by default; the deadline bounds the whole search.
+STORE_SEARCH_MAX_WORKERS = 5
+STORE_SEARCH_DEADLINE_SECONDS = 30.0
+
+# "text" runs one Places text search per chain (at most TEXT_SEARCH_MAX_CHAINS of
+# them); "nearby" runs a single paginated Nearby Search for grocery stores and
+# sorts the results into chains locally, for any number of chains.
+STORE_SEARCH_MODES = ("text", "nearby")
+TEXT_SEARCH_MAX_CHAINS = 5
+NEARBY_SEARCH_TYPE = "grocery_or_supermarket"
+# The API serves at most three pages of 20 results and a radius of 50 km
+NEARBY_SEARCH_MAX_PAGES = 3
+NEARBY_SEARCH_MAX_RADIUS_METERS = 50000
+# A next_page_token becomes valid a moment after it is issued
+NEARBY_PAGE_TOKEN_RETRY_DELAYS = (0.5, 1.0, 2.0)
+
+# The Distance Matrix API accepts at most 25 destinations (and 100 elements)
+# per request, so candidates are sent in chunks of this size.
+DISTANCE_MATRIX_MAX_DESTINATIONS = 25
+DISTANCE_MATRIX_MAX_ELEMENTS = 100
+
+# Driving distance is never shorter than the straight line, so candidates beyond
+# the radius as the crow flies are dropped before Distance Matrix, and only this
+# many of the nearest remaining ones per chain are sent to it.
+DISTANCE_MATRIX_CANDIDATES_PER_CHAIN = 5
+
+# A Places text search returns at most this many results per page; results are
+# ranked by prominence, so a full page may have left out nearer stores.
+PLACES_PAGE_SIZE = 20
+
+SERVICE_WORD_EXCLUSIONS = [
+    "tire center",
+    "vision center",
+    "optical",
+    "pharmacy",
+    "gas station",
+    "auto center",
+    "distribution",
+    "office",
+]
+
+
+class ChainMatcher:
+    """
+    Classifies Places result names into chains with precompiled patterns.
+
+    A name belongs to a chain when it contains the chain's name (longer names win,
+    case-insensitively) and none of the ``SERVICE_WORD_EXCLUSIONS``, which mark
+    secondary locations like gas stations or vision centers.
+    """
+
+    def __init__(
+        self, chains: Sequence[str], exclusions: Sequence[str] = SERVICE_WORD_EXCLUSIONS
+    ):
+        self._chains = {chain.lower(): chain for chain in chains}
+        names = sorted(self._chains, key=len, reverse=True)
+        self._chain_pattern = (
+            re.compile("|".join(re.escape(name) for name in names)) if names else None
+        )
+        self._exclusion_pattern = (
+            re.compile("|".join(re.escape(word) for word in exclusions))
+            if exclusions
+            else None
+        )
+
+    def classify(self, name: str) -> Optional[str]:
+        """The chain ``name`` belongs to, or ``None``."""
+        if self._chain_pattern is None:
+            return None
+        lowered = name.lower()
+        if self._exclusion_pattern is not None and self._exclusion_pattern.search(
+            lowered
+        ):
+            return None
+        match = self._chain_pattern.search(lowered)
+        return self._chains[match.group(0)] if match else None
+
+
+@lru_cache(maxsize=256)
+def chain_matcher(chains: Tuple[str, ...]) -> ChainMatcher:
+    """A shared ``ChainMatcher`` per set of chains, so patterns compile once."""
+    return ChainMatcher(chains)
+
+
+def get_distance_matrix_elements(
+    origin: str, destinations: List[str], key: str
+) -> List[Dict]:
+    """
+    Returns one Distance Matrix element per destination, in the same order.
+
+    All destinations share a single origin, so they are sent as multi-destination
+    requests chunked to the API's per-request limit instead of one request each.
+    Destinations whose chunk failed get ``None`` so callers can skip them; chunks
+    refused by the rate limiter or call budget get straight-line estimates instead.
+    """
+    elements = []
+    for start in range(0, len(destinations), DISTANCE_MATRIX_MAX_DESTINATIONS):
+        chunk = destinations[start : start + DISTANCE_MATRIX_MAX_DESTINATIONS]
+        dist_params = {
+            "origins": origin,
+            "destinations": "|".join(chunk),
+            "mode": "driving",
+            "key": key,
+        }
+        try:
+            dist_data = get_maps_client().get_json("distancematrix", dist_params)
+            if dist_data.get("status") == "OK" and dist_data.get("rows"):
+                row = dist_data["rows"][0]["elements"]
+                elements.extend(row + [None] * (len(chunk) - len(row)))
+                continue
+            print(f"    - Distance Matrix request failed: {dist_data.get('status')}")
+        except QuotaExceeded as e:
+            print(f"    - Distance Matrix quota reached, estimating distances: {e}")
+            count("travel.estimated")
+            elements.extend(estimate_distance_elements(origin, chunk))
+            continue
+        except Exception as e:
+            print(f"    - Distance calculation failed for {len(chunk)} stores: {e}")
+        elements.extend([None] * len(chunk))
+
+    return elements
+
+
+def _parse_point(point: str):
+    lat, lng = point.split(",")
+    return float(lat), float(lng)
+
+
+def estimate_distance_elements(origin: str, destinations: List[str]) -> List[Dict]:
+    """Distance Matrix-shaped elements estimated from straight-line distance."""
+    origin_lat, origin_lng = _parse_point(origin)
+    elements = []
+    for destination in destinations:
+        meters, seconds = estimate_drive(
+            origin_lat, origin_lng, *_parse_point(destination)
+        )
+        elements.append(
+            {
+                "status": "OK",
+                "distance": {"value": round(meters)},
+                "duration": {"value": round(seconds)},
+                "estimated": True,
+            }
+        )
+    return elements
+
+
+def nearest_candidates(
+    lat: float,
+    lng: float,
+    places: List[Dict],
+    max_distance_miles: float,
+    limit: int = DISTANCE_MATRIX_CANDIDATES_PER_CHAIN,
+) -> List[Dict]:
+    """
+    The ``limit`` places nearest to ``lat``/``lng`` in a straight line, dropping
+    any farther than ``max_distance_miles``.
+    """
+    distances = haversine_meters_many(
+        lat,
+        lng,
+        [place["geometry"]["location"]["lat"] for place in places],
+        [place["geometry"]["location"]["lng"] for place in places],
+    )
+    max_meters = max_distance_miles * 1609.34
+    ranked = sorted(
+        (meters, index)
+        for index, meters in enumerate(distances)
+        if meters <= max_meters
+    )
+    return [places[index] for _, index in ranked[:limit]]
+
+
+def search_chain_places(
+    lat: float, lng: float, chain: str, key: str, max_distance_miles: float
+) -> List[Dict]:
+    """
+    Returns the main-store Places results for ``chain`` around ``lat``/``lng``.
+
+    Results are served from ``places_cache`` when a search for the same chain
+    already covers this neighbourhood and radius, then from the persistent store
+    directory when the whole area has been explored recently; otherwise one
+    Places text search is made and its filtered results are cached and recorded,
+    unless a full page shows the search was cut short.
+    """
+    places = places_cache.get(chain, lat, lng, max_distance_miles)
+    if places is not None:
+        count("cache.places.hits")
+        return places
+    count("cache.places.misses")
+
+    directory = get_store_directory()
+    places = directory.search(chain, lat, lng, max_distance_miles)
+    if places is not None:
+        count("cache.store_directory.hits")
+        places_cache.put(chain, lat, lng, max_distance_miles, places)
+        return places
+    count("cache.store_directory.misses")
+
+    # Use Google Places API to find stores
+    search_params = {
+        "query": f"{chain} near {lat},{lng}",
+        "location": f"{lat},{lng}",
+        "radius": max_distance_miles * 1609.34,
+        "key": key,
+    }
+    data = get_maps_client().get_json("place/textsearch", search_params)
+
+    if data.get("status") not in ("OK", "ZERO_RESULTS"):
+        # Errors and throttling aren't cached so the next request retries
+        return []
+
+    # Keep only main stores of the requested brand
+    matcher = chain_matcher((chain,))
+    results = data.get("results", [])
+    places = [place for place in results if matcher.classify(place.get("name", ""))]
+
+    if len(results) >= PLACES_PAGE_SIZE:
+        # Text results are ranked by prominence, not distance, so a full page may
+        # have left out nearer stores: keep the stores but vouch for no area
+        directory.record(chain, lat, lng, 0, places)
+    else:
+        places_cache.put(chain, lat, lng, max_distance_miles, places)
+        directory.record(chain, lat, lng, max_distance_miles, places)
+    return places
+
+
+def fetch_nearby_grocery_places(
+    lat: float, lng: float, key: str, radius_meters: float
+) -> Optional[Tuple[List[Dict], bool]]:
+    """
+    All pages of a Places Nearby Search for grocery stores around ``lat``/``lng``.
+
+    Returns ``(results, complete)``, where ``complete`` is false when pages were
+    left unread, or ``None`` if the first page failed.
+    """
+    client = get_maps_client()
+    params = {
+        "location": f"{lat},{lng}",
+        "radius": round(radius_meters),
+        "type": NEARBY_SEARCH_TYPE,
+        "key": key,
+    }
+    results = []
+    for page in range(NEARBY_SEARCH_MAX_PAGES):
+        data = client.get_json("place/nearbysearch", params)
+        if page:
+            for delay in NEARBY_PAGE_TOKEN_RETRY_DELAYS:
+                if data.get("status") != "INVALID_REQUEST":
+                    break
+                time.sleep(delay)
+                data = client.get_json("place/nearbysearch", params)
+
+        if data.get("status") not in ("OK", "ZERO_RESULTS"):
+            print(f"    - Nearby search page {page + 1} failed: {data.get('status')}")
+            return (results, False) if page else None
+        results.extend(data.get("results", []))
+        token = data.get("next_page_token")
+        if not token:
+            return results, True
+        params = {"pagetoken": token, "key": key}
+    return results, False
+
+
+def search_nearby_places(
+    lat: float, lng: float, chains: List[str], key: str, max_distance_miles: float
+) -> Dict[str, List[Dict]]:
+    """
+    Returns the main-store Places results for each of ``chains``, like
+    ``search_chain_places``, but with one Nearby Search for every chain the
+    caches can't answer. Chains the Nearby Search finds no stores for get their
+    own text search; chains missing from a failed search map to ``[]``.
+    """
+    directory = get_store_directory()
+    found = {}
+    missing = []
+    for chain in chains:
+        places = places_cache.get(chain, lat, lng, max_distance_miles)
+        if places is not None:
+            count("cache.places.hits")
+            found[chain] = places
+            continue
+        count("cache.places.misses")
+        places = directory.search(chain, lat, lng, max_distance_miles)
+        if places is not None:
+            count("cache.store_directory.hits")
+            places_cache.put(chain, lat, lng, max_distance_miles, places)
+            found[chain] = places
+            continue
+        count("cache.store_directory.misses")
+        missing.append(chain)
+
+    if not missing:
+        return found
+
+    radius_meters = min(max_distance_miles * 1609.34, NEARBY_SEARCH_MAX_RADIUS_METERS)
+    fetched = fetch_nearby_grocery_places(lat, lng, key, radius_meters)
+    if fetched is None:
+        # Errors and throttling aren't cached so the next request retries
+        found.update((chain, []) for chain in missing)
+        return found
+
+    results, complete = fetched
+    by_chain = {chain: [] for chain in missing}
+    matcher = chain_matcher(tuple(missing))
+    for place in results:
+        chain = matcher.classify(place.get("name", ""))
+        if chain is not None:
+            by_chain[chain].append(place)
+
+    # Nearby results are ranked by prominence too, so only a search read to its
+    # last page covers the whole circle
+    explored_miles = radius_meters / 1609.34 if complete else 0
+    for chain, places in by_chain.items():
+        if not places:
+            # Places doesn't tag every chain (e.g. Target, Costco) as a grocery
+            # store, so finding none here doesn't show the area has none
+            count("places.nearby.text_fallbacks")
+            found[chain] = search_chain_places(lat, lng, chain, key, max_distance_miles)
+            continue
+        found[chain] = places
+        if explored_miles:
+            places_cache.put(chain, lat, lng, explored_miles, places)
+        directory.record(chain, lat, lng, explored_miles, places)
+    return found
+
 
 def find_stores_with_maps_api(
-    location: str, preferred_chains: List[str], max_distance_miles: int = 15
+    location: str,
+    preferred_chains: List[str],
+    max_distance_miles: int = 15,
+    max_workers: int = STORE_SEARCH_MAX_WORKERS,
+    deadline_seconds: float = STORE_SEARCH_DEADLINE_SECONDS,
+    on_store: Optional[Callable[[Dict], None]] = None,
+    search_mode: Optional[str] = None,
 ) -> List[Dict]:
     """
     Finds the single nearest store for each requested chain within a given radius.
 
     This function iterates through each specified grocery chain (e.g., 'Walmart', 'Target').
     For each chain, it queries the Google Places API to find all nearby locations. It then calculates
-    the driving time and distance to every result and selects only the one with the shortest travel time.
+    the driving time and distance to the nearest results (by straight-line distance, see
+    ``nearest_candidates``) and selects only the one with the shortest travel time.
     This ensures the application always considers the truly nearest store for each chain.
+
+    Chains are independent, so up to ``max_workers`` of them are searched concurrently
+    (``max_workers=1`` searches them one after another). Chains still running when
+    ``deadline_seconds`` expires are left out of the result.
+
+    ``on_store`` is called with each chain's store as soon as it is found, possibly
+    from a worker thread, before the final list is sorted.
+
+    ``search_mode`` picks how Places is queried (see ``STORE_SEARCH_MODES``); it
+    defaults to ``GROCERY_STORE_SEARCH_MODE`` or ``"text"``. Text mode searches at
+    most ``TEXT_SEARCH_MAX_CHAINS`` chains; nearby mode has no such cap.
     """
+    search_mode = search_mode or os.getenv("GROCERY_STORE_SEARCH_MODE", "text")
+    if search_mode not in STORE_SEARCH_MODES:
+        raise ValueError(f"search_mode must be one of {STORE_SEARCH_MODES}")
+
+    def _find_best_store_for_chain(
+        lat, lng, chain, key, max_distance_miles, places=None
+    ):
+        chain_candidates = []  # Stores all potential candidates for this chain
+
+        try:
+            if places is None:
+                places = search_chain_places(lat, lng, chain, key, max_distance_miles)
+            places = nearest_candidates(lat, lng, places, max_distance_miles)
+
+            if places:
+                # Use Google Distance Matrix API for accurate travel time,
+                # one batched request for the nearest candidates of this chain
+                elements = get_distance_matrix_elements(
+                    f"{lat},{lng}",
+                    [
+                        "{lat},{lng}".format(**place["geometry"]["location"])
+                        for place in places
+                    ],
+                    key,
+                )
+
+                for place, element in zip(places, elements):
+                    if not element or element.get("status") != "OK":
+                        continue
+                    distance_miles = element["distance"]["value"] / 1609.34
+
+                    # Add any store within the radius to our candidate list
+                    if distance_miles <= max_distance_miles:
+                        store = {
+                            "name": place["name"],
+                            "address": place.get("formatted_address", ""),
+                            "lat": place["geometry"]["location"]["lat"],
+                            "lng": place["geometry"]["location"]["lng"],
+                            "rating": place.get("rating", 4.0),
+                            "chain": chain,
+                            "place_id": place["place_id"],
+                            "travel_duration_seconds": element["duration"]["value"],
+                            "distance_meters": element["distance"]["value"],
+                        }
+                        chain_candidates.append(store)
+
+            # After checking all results, select the BEST candidate for the current chain
+            if chain_candidates:
+                # Sort candidates by travel time to find the closest one
+                chain_candidates.sort(
+                    key=lambda s: s.get("travel_duration_seconds", float("inf"))
+                )
+                best_store_for_chain = chain_candidates[0]
+
+                # Log the best store that was chosen for this chain
+                duration_min = (
+                    best_store_for_chain.get("travel_duration_seconds", 0) / 60
+                )
+                distance_miles = (
+                    best_store_for_chain.get("distance_meters", 0) / 1609.34
+                )
+                print(
+                    f"  ✅ Best for {chain}: {best_store_for_chain['name']} - {duration_min:.1f} min, {distance_miles:.1f} miles"
+                )
+                if on_store is not None:
+                    on_store(best_store_for_chain)
+                return best_store_for_chain
+
+            print(
+                f"  ❌ No suitable {chain} stores found within {max_distance_miles} miles."
+            )
+
+        except Exception as e:
+            print(f"  ❌ Error searching for {chain}: {e}")
+
+        return None
 
     def _find_nearest_stores(loc, chains, key, max_distance_miles):
         if isinstance(loc, str):
             return []
 
         lat, lng = loc["lat"], loc["lng"]
-        final_stores = []
-
-        # Iterate through each requested store chain
-        for chain in chains[:5]:  # Limit to 5 chains per request to be safe
-
-            chain_candidates = []  # Stores all potential candidates for this chain
-
+        if search_mode == "nearby":
+            # One search covers every chain, so there's no need to cap them
             try:
-                # Use Google Places API to find stores
-                search_params = {
-                    "query": f"{chain} near {lat},{lng}",
-                    "location": f"{lat},{lng}",
-                    "radius": max_distance_miles * 1609.34,
-                    "key": key,
-                }
-                response = requests.get(
-                    "https://maps.googleapis.com/maps/api/place/textsearch/json",
-                    params=search_params,
-                    timeout=10,
+                places_by_chain = search_nearby_places(
+                    lat, lng, chains, key, max_distance_miles
                 )
-                data = response.json()
-
-                if data.get("status") == "OK" and data.get("results"):
-
-                    # Iterate through ALL results from the API for this chain
-                    for place in data["results"]:
-                        place_name = place.get("name", "").lower()
-                        # Basic filter to ensure it's the correct store brand
-                        if chain.lower() in place_name:
-                            # Filter out secondary locations like gas stations or vision centers
-                            is_main_store = not any(
-                                service_word in place_name
-                                for service_word in [
-                                    "tire center",
-                                    "vision center",
-                                    "optical",
-                                    "pharmacy",
-                                    "gas station",
-                                    "auto center",
-                                    "distribution",
-                                    "office",
-                                ]
-                            )
-                            if is_main_store:
-                                place_lat = place["geometry"]["location"]["lat"]
-                                place_lng = place["geometry"]["location"]["lng"]
-
-                                # Use Google Distance Matrix API for accurate travel time
-                                dist_params = {
-                                    "origins": f"{lat},{lng}",
-                                    "destinations": f"{place_lat},{place_lng}",
-                                    "mode": "driving",
-                                    "key": key,
-                                }
-
-                                try:
-                                    dist_response = requests.get(
-                                        "https://maps.googleapis.com/maps/api/distancematrix/json",
-                                        params=dist_params,
-                                        timeout=10,
-                                    )
-                                    dist_data = dist_response.json()
-
-                                    if (
-                                        dist_data.get("status") == "OK"
-                                        and dist_data["rows"][0]["elements"][0][
-                                            "status"
-                                        ]
-                                        == "OK"
-                                    ):
-                                        element = dist_data["rows"][0]["elements"][0]
-                                        distance_miles = (
-                                            element["distance"]["value"] / 1609.34
-                                        )
-
-                                        # Add any store within the radius to our candidate list
-                                        if distance_miles <= max_distance_miles:
-                                            store = {
-                                                "name": place["name"],
-                                                "address": place.get(
-                                                    "formatted_address", ""
-                                                ),
-                                                "lat": place_lat,
-                                                "lng": place_lng,
-                                                "rating": place.get("rating", 4.0),
-                                                "chain": chain,
-                                                "place_id": place["place_id"],
-                                                "travel_duration_seconds": element[
-                                                    "duration"
-                                                ]["value"],
-                                                "distance_meters": element["distance"][
-                                                    "value"
-                                                ],
-                                            }
-                                            chain_candidates.append(store)
-
-                                except Exception as e:
-                                    print(
-                                        f"    - Distance calculation failed for {place.get('name', 'a store')}: {e}"
-                                    )
-                                    continue
-
-                # After checking all results, select the BEST candidate for the current chain
-                if chain_candidates:
-                    # Sort candidates by travel time to find the closest one
-                    chain_candidates.sort(
-                        key=lambda s: s.get("travel_duration_seconds", float("inf"))
-                    )
-                    best_store_for_chain = chain_candidates[0]
-                    final_stores.append(best_store_for_chain)
-
-                    # Log the best store that was chosen for this chain
-                    duration_min = (
-                        best_store_for_chain.get("travel_duration_seconds", 0) / 60
-                    )
-                    distance_miles = (
-                        best_store_for_chain.get("distance_meters", 0) / 1609.34
-                    )
-                    print(
-                        f"  ✅ Best for {chain}: {best_store_for_chain['name']} - {duration_min:.1f} min, {distance_miles:.1f} miles"
-                    )
-                else:
+            except Exception as e:
+                print(f"  ❌ Nearby store search failed: {e}")
+                return []
+        else:
+            # Limit to 5 chains per request to be safe
+            chains = chains[:TEXT_SEARCH_MAX_CHAINS]
+            places_by_chain = {}
+
+        if max_workers <= 1:
+            results = [
+                _find_best_store_for_chain(
+                    lat,
+                    lng,
+                    chain,
+                    key,
+                    max_distance_miles,
+                    places_by_chain.get(chain),
+                )
+                for chain in chains
+            ]
+        else:
+            pool = ThreadPoolExecutor(max_workers=min(max_workers, len(chains) or 1))
+            futures = [
+                submit_in_context(
+                    pool,
+                    _find_best_store_for_chain,
+                    lat,
+                    lng,
+                    chain,
+                    key,
+                    max_distance_miles,
+                    places_by_chain.get(chain),
+                )
+                for chain in chains
+            ]
+            done, not_done = wait(futures, timeout=deadline_seconds)
+            # Don't block on stragglers; their threads finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+            for chain, future in zip(chains, futures):
+                if future in not_done:
                     print(
-                        f"  ❌ No suitable {chain} stores found within {max_distance_miles} miles."
+                        f"  ❌ Search for {chain} missed the {deadline_seconds}s deadline."
                     )
+            # Collect in request order so ties in travel time sort the same way
+            # as the sequential search
+            results = [f.result() if f in done else None for f in futures]
 
-            except Exception as e:
-                print(f"  ❌ Error searching for {chain}: {e}")
-                continue
-
-        return final_stores
+        return [store for store in results if store]
 
     api_key = get_secret("GOOGLE_MAPS_API_KEY") or get_secret("Maps_API_KEY")
     if not api_key:
@@ -258,125 +654,19 @@ def find_stores_with_maps_api(
 
 
 def estimate_prices_simple(items: List[str], stores: List[Dict]) -> Dict:
+    with span("pricing.quote"):
+        return get_price_catalog().quote(items, stores)
 
-    base_prices = {
-        "milk": 1.0,
-        "bread": 1.3,
-        "eggs": 1.6,
-        "bananas": 1.9,
-        "avocados": 2.2,
-        "chicken breast": 2.5,
-        "rice": 2.8,
-        "pasta": 3.1,
-        "cheese": 3.4,
-        "yogurt": 3.7,
-        "butter": 1.2,
-        "apples": 1.5,
-        "oranges": 1.8,
-        "tomatoes": 2.1,
-        "lettuce": 2.4,
-        "cereal": 2.7,
-        "soda": 3.0,
-        "coffee": 3.3,
-        "tea": 3.6,
-        "bacon": 3.9,
-        "sausage": 1.4,
-        "ground beef": 1.7,
-        "pork chops": 2.0,
-        "oatmeal": 2.3,
-        "flour": 2.6,
-        "sugar": 2.9,
-        "salt": 3.2,
-        "pepper": 3.5,
-        "olive oil": 3.8,
-        "canola oil": 4.1,
-        "peanut butter": 1.6,
-        "jelly": 1.9,
-        "canned beans": 2.2,
-        "canned corn": 2.5,
-        "canned tomatoes": 2.8,
-        "pasta sauce": 3.1,
-        "ketchup": 3.4,
-        "mustard": 3.7,
-        "mayonnaise": 4.0,
-        "grapes": 4.3,
-        "strawberries": 1.8,
-        "blueberries": 2.1,
-        "spinach": 2.4,
-        "onions": 2.7,
-        "potatoes": 3.0,
-        "carrots": 3.3,
-        "broccoli": 3.6,
-        "cucumbers": 3.9,
-        "peppers": 4.2,
-        "canned tuna": 4.5,
-        "chips": 2.0,
-        "crackers": 2.3,
-        "cookies": 2.6,
-        "nuts": 2.9,
-        "granola bars": 3.2,
-        "popcorn": 3.5,
-        "chocolate": 3.8,
-        "ice cream": 4.1,
-        "bagels": 4.4,
-        "tortillas": 4.7,
-    }
-
-    store_multipliers = {
-        "Walmart": 0.9,
-        "Target": 1.0,
-        "Kroger": 0.95,
-        "Costco": 0.85,
-        "Whole Foods": 1.3,
-        "Safeway": 1.05,
-        "Meijer": 0.92,
-    }
-
-    price_database = {
-        item: {
-            store: round(base_prices[item] * mult + ((idx % 5) * 0.05), 2)
-            for store, mult in store_multipliers.items()
-        }
-        for idx, item in enumerate(base_prices)
-    }
-
-    prices = {}
-    for item in items:
-        item_lower = item.lower()
-        prices[item] = {}
-
-        for store in stores:
-            chain = store.get("chain", "")
-            store_name = store.get("name", chain)
-
-            if item_lower in price_database and chain in price_database[item_lower]:
-                price = price_database[item_lower][chain]
-            else:
-
-                base_price = 3.00
-                if "walmart" in store_name.lower():
-                    price = base_price * 0.9
-                elif "target" in store_name.lower():
-                    price = base_price * 0.95
-                elif "meijer" in store_name.lower():
-                    price = base_price * 0.88
-                elif "whole foods" in store_name.lower():
-                    price = base_price * 1.2
-                elif "kroger" in store_name.lower():
-                    price = base_price * 0.93
-                elif "safeway" in store_name.lower():
-                    price = base_price * 1.05
-                elif chain == "General":
-                    price = base_price * 1.0
-                else:
-                    price = base_price
-
-            prices[item][store_name] = {"price": round(price, 2), "confidence": 0.8}
 
-    return prices
+def estimate_price_matrix(items: List[str], stores: List[Dict]) -> PriceMatrix:
+    """The ``estimate_prices_simple`` prices as a strategist price matrix."""
+    with span("pricing.matrix"):
+        return get_price_catalog().price_matrix(items, stores)
 
 
-def get_trip_details_from_api(user_location: Dict, stores: List[Dict]) -> Dict:
+def get_trip_details_from_api(
+    user_location: Dict, stores: List[Dict], optimize: bool = True
+) -> Dict:
 
     api_key = get_secret("GOOGLE_MAPS_API_KEY") or get_secret("Maps_API_KEY")
     if not api_key:
@@ -393,15 +683,13 @@ def get_trip_details_from_api(user_location: Dict, stores: List[Dict]) -> Dict:
     params = {
         "origin": origin,
         "destination": destination,
-        "waypoints": f"optimize:true|{waypoints_str}",
+        "waypoints": (f"optimize:true|{waypoints_str}" if optimize else waypoints_str),
         "key": api_key,
         "mode": "driving",
     }
 
     try:
-        url = "https://maps.googleapis.com/maps/api/directions/json"
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+        data = get_maps_client().get_json("directions", params)
 
         if data["status"] == "OK" and data["routes"]:
             route = data["routes"][0]
@@ -423,6 +711,9 @@ def get_trip_details_from_api(user_location: Dict, stores: List[Dict]) -> Dict:
                 "distance_meters": total_distance_meters,
                 "duration_seconds": total_duration_seconds,
                 "optimized_stores": optimized_stores,
+                "overview_polyline": route.get("overview_polyline", {}).get(
+                    "points", ""
+                ),
             }
 
         else:
@@ -430,6 +721,8 @@ def get_trip_details_from_api(user_location: Dict, stores: List[Dict]) -> Dict:
                 f"Google Directions API failed: {data.get('status')}. Cannot calculate accurate distances without API access."
             )
 
+    except QuotaExceeded:
+        raise
     except Exception as e:
         print(f"Trip details API error: {e}")
         raise ValueError(
@@ -437,6 +730,81 @@ def get_trip_details_from_api(user_location: Dict, stores: List[Dict]) -> Dict:
         )
 
 
+def get_travel_matrix_from_api(user_location: Dict, stores: List[Dict]) -> TravelMatrix:
+    """
+    Fetches driving distances and durations between the user and every store.
+
+    The full (stores + 1) x (stores + 1) matrix is requested from the Distance Matrix
+    API in blocks that respect its 25 origins/destinations and 100 elements limits.
+    Unreachable pairs are stored as infinite so the solver avoids them.
+    """
+    api_key = get_secret("GOOGLE_MAPS_API_KEY") or get_secret("Maps_API_KEY")
+    if not api_key:
+        raise ValueError("Google Maps API key is required for the travel matrix.")
+
+    points = [f"{user_location['lat']},{user_location['lng']}"] + [
+        f"{s['lat']},{s['lng']}" for s in stores
+    ]
+    size = len(points)
+    distance = [
+        [0.0 if i == j else float("inf") for j in range(size)] for i in range(size)
+    ]
+    duration = [
+        [0.0 if i == j else float("inf") for j in range(size)] for i in range(size)
+    ]
+
+    dest_step = min(size, DISTANCE_MATRIX_MAX_DESTINATIONS)
+    origin_step = max(1, DISTANCE_MATRIX_MAX_ELEMENTS // dest_step)
+    for o_start in range(0, size, origin_step):
+        for d_start in range(0, size, dest_step):
+            params = {
+                "origins": "|".join(points[o_start : o_start + origin_step]),
+                "destinations": "|".join(points[d_start : d_start + dest_step]),
+                "mode": "driving",
+                "key": api_key,
+            }
+            data = get_maps_client().get_json("distancematrix", params)
+            if data.get("status") != "OK":
+                raise ValueError(
+                    f"Google Distance Matrix API failed: {data.get('status')}"
+                )
+
+            for i, row in enumerate(data["rows"], start=o_start):
+                for j, element in enumerate(row["elements"], start=d_start):
+                    if i != j and element.get("status") == "OK":
+                        distance[i][j] = element["distance"]["value"]
+                        duration[i][j] = element["duration"]["value"]
+
+    return TravelMatrix(
+        stores,
+        distance,
+        duration,
+        cost_per_meter=AVERAGE_GAS_PRICE_PER_GALLON / (AVERAGE_VEHICLE_MPG * 1609.34),
+        cost_per_second=VALUE_OF_TIME_PER_HOUR / 3600,
+    )
+
+
+def estimate_travel_matrix(user_location: Dict, stores: List[Dict]) -> TravelMatrix:
+    """A ``TravelMatrix`` built from straight-line estimates, with no API calls."""
+    points = [(user_location["lat"], user_location["lng"])] + [
+        (s["lat"], s["lng"]) for s in stores
+    ]
+    distance = [[0.0] * len(points) for _ in points]
+    duration = [[0.0] * len(points) for _ in points]
+    for i, (lat1, lng1) in enumerate(points):
+        for j, (lat2, lng2) in enumerate(points):
+            if i != j:
+                distance[i][j], duration[i][j] = estimate_drive(lat1, lng1, lat2, lng2)
+
+    return TravelMatrix(
+        stores,
+        distance,
+        duration,
+        cost_per_meter=AVERAGE_GAS_PRICE_PER_GALLON / (AVERAGE_VEHICLE_MPG * 1609.34),
+        cost_per_second=VALUE_OF_TIME_PER_HOUR / 3600,
+    )
+
+
 def calculate_travel_costs(
     distance_meters: int, duration_seconds: int
 ) -> Dict[str, float]:
@@ -459,36 +827,84 @@ def calculate_travel_costs(
 
 
 class ShoppingStrategist:
-    def __init__(self, user_location, all_items, price_data):
+    def __init__(self, user_location, all_items, price_data, price_matrix=None):
         self.user_location = user_location
         self.all_items = all_items
         self.price_data = price_data
         self.store_names = sorted(list(price_data[next(iter(price_data))].keys()))
+        # A catalog can supply the matrix directly (see BasePriceCatalog.price_matrix)
+        self._price_matrix = price_matrix
+        # Filled by find_best_strategy; None means "ask Directions per plan"
+        self.travel_matrix = None
+        # True when the Maps quota ran out and travel costs are estimates
+        self.travel_estimated = False
+
+    @property
+    def price_matrix(self) -> PriceMatrix:
+        # Built on first use so constructing a strategist stays cheap
+        if self._price_matrix is None:
+            self._price_matrix = PriceMatrix(self.price_data, self.all_items)
+        return self._price_matrix
+
+    def _prepare_travel_matrix(self, available_stores: List[Dict]):
+        try:
+            with span("strategy.travel_matrix"):
+                self.travel_matrix = get_travel_matrix_from_api(
+                    self.user_location, available_stores
+                )
+        except QuotaExceeded as e:
+            # Queuing for quota would stall the workflow; estimate instead
+            print(f"Maps quota reached, estimating travel costs: {e}")
+            count("travel.estimated")
+            self.travel_matrix = estimate_travel_matrix(
+                self.user_location, available_stores
+            )
+            self.travel_estimated = True
+        except Exception as e:
+            print(f"Travel matrix unavailable, using Directions per plan: {e}")
+            self.travel_matrix = None
 
-    def _calculate_plan_costs(
-        self, stores_to_visit_names: List[str], all_stores_info: List[Dict]
-    ):
+    def _get_trip_details(self, stores_to_visit_details: List[Dict]) -> Dict:
+        if self.travel_matrix is not None:
+            try:
+                return self.travel_matrix.solve_trip(stores_to_visit_details)
+            except ValueError as e:
+                print(f"Local route solve failed, asking Directions: {e}")
+        try:
+            return get_trip_details_from_api(
+                self.user_location, stores_to_visit_details
+            )
+        except QuotaExceeded as e:
+            print(f"Maps quota reached, estimating travel costs: {e}")
+            count("travel.estimated")
+            self.travel_estimated = True
+            return estimate_travel_matrix(
+                self.user_location, stores_to_visit_details
+            ).solve_trip(stores_to_visit_details)
+
+    def _attach_route_details(self, plan: Dict):
+        """Fetches the chosen plan's route once from Directions for its polyline."""
+        try:
+            trip_details = get_trip_details_from_api(
+                self.user_location, plan["optimized_stores_in_route"], optimize=False
+            )
+            plan["route_polyline"] = trip_details.get("overview_polyline", "")
+        except Exception as e:
+            print(f"Could not fetch route polyline: {e}")
+
+    def _score_plan(
+        self,
+        stores_to_visit_names: List[str],
+        all_stores_info: List[Dict],
+        item_cost: Optional[float] = None,
+    ) -> Optional[Dict]:
+        """
+        Costs a store combination without its shopping list. ``item_cost`` may be
+        passed in when the caller already knows it (see ``SubsetCostEngine``).
+        """
         stores_to_visit_names = sorted(stores_to_visit_names)
-        shopping_list = {}
-        total_item_cost = 0
-
-        for item in sorted(self.all_items):
-            best_price_for_item = float("inf")
-            best_store_for_item = None
-
-            for store_name in sorted(stores_to_visit_names):
-                price = self.price_data[item][store_name]["price"]
-                if price < best_price_for_item:
-                    best_price_for_item = price
-                    best_store_for_item = store_name
-
-            if best_store_for_item:
-                if best_store_for_item not in shopping_list:
-                    shopping_list[best_store_for_item] = []
-                shopping_list[best_store_for_item].append(
-                    {"item": item, "price": best_price_for_item}
-                )
-                total_item_cost += best_price_for_item
+        if item_cost is None:
+            item_cost = self.price_matrix.item_cost(stores_to_visit_names)
 
         stores_to_visit_details = [
             s for s in all_stores_info if s["name"] in stores_to_visit_names
@@ -498,42 +914,74 @@ class ShoppingStrategist:
         if not stores_to_visit_details:
             return None
 
-        trip_details = get_trip_details_from_api(
-            self.user_location, stores_to_visit_details
-        )
+        trip_details = self._get_trip_details(stores_to_visit_details)
         travel_costs = calculate_travel_costs(
             trip_details["distance_meters"], trip_details["duration_seconds"]
         )
 
-        total_plan_cost = total_item_cost + travel_costs["total_travel_cost"]
+        total_plan_cost = item_cost + travel_costs["total_travel_cost"]
 
-        return {
-            "plan_stores": sorted(stores_to_visit_names),
+        plan = {
+            "plan_stores": stores_to_visit_names,
             "optimized_stores_in_route": trip_details.get("optimized_stores", []),
-            "shopping_list": shopping_list,
-            "item_cost": round(total_item_cost, 2),
+            "item_cost": round(item_cost, 2),
             "travel_costs": travel_costs,
             "total_plan_cost": round(total_plan_cost, 2),
         }
+        if "overview_polyline" in trip_details:
+            # Routed by Directions already, so no second call is needed for the map
+            plan["route_polyline"] = trip_details["overview_polyline"]
+        return plan
 
     def find_best_strategy(
         self,
         available_stores: List[Dict],
         strict_mode: bool = False,
         preferred_store_names: List[str] = None,
+        on_plan: Optional[Callable[[Dict, int], None]] = None,
     ):
+        """
+        Returns the cheapest plan for the scenario implied by the arguments.
+
+        ``on_plan(plan, plans_evaluated)`` is called after each plan is costed.
+        Candidates are costed without a shopping list; only the chosen plan gets
+        one.
+        """
         all_plans = []
+
+        def add_plan(plan):
+            all_plans.append(plan)
+            count("strategy.plans_evaluated")
+            if on_plan is not None:
+                on_plan(plan, len(all_plans))
+
         store_pool = sorted(
             [s["name"] for s in available_stores if s["name"] in self.store_names]
         )
 
         if not preferred_store_names or len(preferred_store_names) == 0:
             print("Scenario 1: No store preferences - full algorithm optimization")
-            for i in range(1, min(4, len(store_pool) + 1)):
-                for combo in sorted(itertools.combinations(store_pool, i)):
-                    plan = self._calculate_plan_costs(list(combo), available_stores)
+            if len(store_pool) > 1:
+                self._prepare_travel_matrix(available_stores)
+            if self.travel_matrix is not None:
+                # Routes are solved locally, so every combination can be explored
+                def evaluate(combo, item_cost):
+                    plan = self._score_plan(combo, available_stores, item_cost)
                     if plan:
-                        all_plans.append(plan)
+                        add_plan(plan)
+                        return plan["total_plan_cost"]
+                    return None
+
+                SubsetCostEngine(self.price_matrix, store_pool).search(
+                    evaluate, self.travel_matrix.round_trip_lower_bound
+                )
+            else:
+                # Each combination costs a Directions call, so keep to small plans
+                for i in range(1, min(MAX_DIRECTIONS_PLAN_STORES, len(store_pool)) + 1):
+                    for combo in sorted(itertools.combinations(store_pool, i)):
+                        plan = self._score_plan(list(combo), available_stores)
+                        if plan:
+                            add_plan(plan)
 
         elif strict_mode:
             print("Scenario 3: Strict mode - must visit all selected stores")
@@ -564,14 +1012,14 @@ class ShoppingStrategist:
 
             if plan_stores:
                 print(f"Strict mode: Planning route for {sorted(plan_stores)}")
-                plan = self._calculate_plan_costs(plan_stores, available_stores)
+                plan = self._score_plan(plan_stores, available_stores)
                 if plan:
                     if missing_chains:
                         plan["warning"] = (
                             f"Note: Could not find these required stores in your area: {', '.join(missing_chains)}. Consider disabling strict mode or selecting different stores."
                         )
                         plan["missing_chains"] = missing_chains
-                    all_plans.append(plan)
+                    add_plan(plan)
                 else:
                     print("Failed to calculate costs for strict mode plan")
             else:
@@ -594,24 +1042,30 @@ class ShoppingStrategist:
                     preferred_in_pool.append(matching_stores[0])
 
             preferred_in_pool.sort()
+            others = [name for name in store_pool if name not in preferred_in_pool]
+            if 2 ** len(preferred_in_pool) - 1 + len(others) > 1:
+                self._prepare_travel_matrix(available_stores)
 
             if preferred_in_pool:
                 for i in range(1, len(preferred_in_pool) + 1):
                     for combo in sorted(itertools.combinations(preferred_in_pool, i)):
-                        plan = self._calculate_plan_costs(list(combo), available_stores)
+                        plan = self._score_plan(list(combo), available_stores)
                         if plan:
-                            all_plans.append(plan)
+                            add_plan(plan)
 
-            for store_name in sorted(store_pool):
-                if store_name not in preferred_in_pool:
-                    plan = self._calculate_plan_costs([store_name], available_stores)
-                    if plan:
-                        all_plans.append(plan)
+            for store_name in others:
+                plan = self._score_plan([store_name], available_stores)
+                if plan:
+                    add_plan(plan)
 
         if not all_plans:
             return None
-        all_plans.sort(key=lambda p: (p["total_plan_cost"], p["plan_stores"]))
-        best_plan = all_plans[0]
+        best_plan = min(
+            all_plans, key=lambda p: (p["total_plan_cost"], p["plan_stores"])
+        )
+        best_plan["shopping_list"], _ = self.price_matrix.assign(
+            best_plan["plan_stores"]
+        )
         single_store_costs = []
         for plan in all_plans:
             if len(plan["plan_stores"]) == 1:
@@ -624,6 +1078,10 @@ class ShoppingStrategist:
         else:
             best_plan["savings"] = 0
         best_plan["total_plans_evaluated"] = len(all_plans)
+        if self.travel_estimated:
+            best_plan["travel_estimated"] = True
+        elif self.travel_matrix is not None:
+            self._attach_route_details(best_plan)
         best_plan["is_single_store"] = len(best_plan["plan_stores"]) == 1
         best_plan["scenario"] = (
             "scenario_1_no_preferences"
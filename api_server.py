@@ -0,0 +1,332 @@
+"""
+Headless JSON HTTP API for the shopping workflow.
+
+Endpoints (request and response bodies are JSON)::
+
+    GET  /healthz
+    GET  /metrics   Prometheus text exposition of span timings and counters
+    POST /geocode   {"address": "Columbus, OH"}
+    POST /stores    {"address": ... | "location": {"lat", "lng"}, "chains": [...], "radius": 15}
+    POST /workflow  {"address": ... | "location": {...}, "items": [...],
+                     "preferred_stores": [...], "strict": false, "radius": 15}
+
+The server is a stdlib ``ThreadingHTTPServer`` with HTTP/1.1 keep-alive, so it
+needs nothing beyond the app's own dependencies. Every handler thread shares the
+process-wide Maps client and caches. Identical requests that arrive while one is
+already being computed (same normalized location, and the same items and
+preferences in the same order and casing) wait for that computation instead of
+starting their own.
+
+    python api_server.py --host 0.0.0.0 --port 8080
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from agents import DEFAULT_SEARCH_CHAINS, find_stores_with_maps_api
+from geocode_cache import normalize_address
+from telemetry import render_prometheus
+
+DEFAULT_RADIUS_MILES = 15
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class BadRequest(Exception):
+    """Invalid request body; reported to the client as HTTP 400."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Runs ``func`` unless a call with ``key`` is already in flight, in which
+        case its result (or exception) is shared. Returns ``(result, shared)``.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = func()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result, not leader
+
+
+def request_key(endpoint: str, normalized: Dict[str, Any]) -> str:
+    """Stable hash of an endpoint and its normalized request."""
+    canonical = json.dumps([endpoint, normalized], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _names(values, field: str) -> list:
+    """
+    ``values`` as sent, minus blanks. Order and casing are kept: they show up in
+    the result, so requests differing in them can't share one.
+    """
+    if values is None:
+        return []
+    if not isinstance(values, list):
+        raise BadRequest(f"'{field}' must be a list")
+    return [str(v).strip() for v in values if str(v).strip()]
+
+
+def _normalize_location(body: Dict[str, Any]) -> Dict[str, Any]:
+    location = body.get("location")
+    if isinstance(location, dict):
+        try:
+            return {
+                "lat": round(float(location["lat"]), 5),
+                "lng": round(float(location["lng"]), 5),
+            }
+        except (KeyError, TypeError, ValueError):
+            raise BadRequest("'location' needs numeric 'lat' and 'lng'")
+    address = body.get("address")
+    if isinstance(address, str) and address.strip():
+        return {"address": normalize_address(address)}
+    raise BadRequest("Request needs an 'address' or a 'location'")
+
+
+def _normalize_radius(body: Dict[str, Any]) -> float:
+    try:
+        radius = float(body.get("radius", DEFAULT_RADIUS_MILES))
+    except (TypeError, ValueError):
+        raise BadRequest("'radius' must be a number")
+    if not 0 < radius <= 50:
+        raise BadRequest("'radius' must be between 0 and 50 miles")
+    return radius
+
+
+def _geocode(address: str) -> Dict[str, Any]:
+    # app is imported on first use; it pulls in Streamlit
+    from app import geocode_address
+
+    return geocode_address(address)
+
+
+class ShoppingService:
+    """Request handling independent of the HTTP layer."""
+
+    def __init__(self):
+        self.inflight = SingleFlight()
+        self._workflow = None
+        self._workflow_lock = threading.Lock()
+
+    def _get_workflow(self):
+        if self._workflow is None:
+            with self._workflow_lock:
+                if self._workflow is None:
+                    from app import GoogleADKMultiAgent
+
+                    self._workflow = GoogleADKMultiAgent()
+        return self._workflow
+
+    def _resolve_location(self, normalized: Dict[str, Any], body: Dict[str, Any]):
+        """Returns ``(location, error_response)`` for a normalized location."""
+        if "address" not in normalized:
+            location = dict(normalized)
+            location.setdefault(
+                "formatted_address", body["location"].get("formatted_address", "")
+            )
+            return location, None
+        location, _ = self.inflight.do(
+            request_key("geocode", normalized), lambda: _geocode(body["address"])
+        )
+        if "error" in location:
+            return None, _geocode_error(location)
+        return location, None
+
+    def geocode(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        address = body.get("address")
+        if not isinstance(address, str) or not address.strip():
+            raise BadRequest("Request needs a non-empty 'address'")
+        normalized = {"address": normalize_address(address)}
+        result, _ = self.inflight.do(
+            request_key("geocode", normalized), lambda: _geocode(address)
+        )
+        if "error" in result:
+            return _geocode_error(result)
+        return 200, result
+
+    def stores(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        chains = _names(body.get("chains"), "chains") or DEFAULT_SEARCH_CHAINS
+        radius = _normalize_radius(body)
+        normalized = {
+            "location": _normalize_location(body),
+            "chains": chains,
+            "radius": radius,
+        }
+        location, error = self._resolve_location(normalized["location"], body)
+        if error:
+            return error
+        stores, shared = self.inflight.do(
+            request_key("stores", normalized),
+            lambda: find_stores_with_maps_api(location, chains, radius),
+        )
+        return 200, {"location": location, "stores": stores, "coalesced": shared}
+
+    def workflow(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        items = body.get("items")
+        if not isinstance(items, list) or not any(str(i).strip() for i in items):
+            raise BadRequest("Request needs a non-empty 'items' list")
+        # Only the location is normalized; everything else reaches the workflow
+        # (and the coalescing key) as the caller sent it
+        request = {
+            "items": _names(items, "items"),
+            "preferred_stores": _names(
+                body.get("preferred_stores"), "preferred_stores"
+            ),
+            "strict_mode": bool(body.get("strict", False)),
+            "max_distance_miles": _normalize_radius(body),
+        }
+        normalized = dict(request, location=_normalize_location(body))
+        location, error = self._resolve_location(normalized["location"], body)
+        if error:
+            return error
+
+        def run():
+            return self._get_workflow().execute_shopping_workflow(location, **request)
+
+        result, shared = self.inflight.do(request_key("workflow", normalized), run)
+        status = 200 if result.get("status") == "success" else 422
+        return status, dict(result, coalesced=shared)
+
+
+def _geocode_error(result: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    source = result.get("source")
+    if source in ("not_found", "error"):
+        return 422, result
+    if source == "no_api_key":
+        return 503, result
+    return 502, result
+
+
+class ShoppingRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle enabled every
+    # keep-alive response would stall on the client's delayed ACK
+    disable_nagle_algorithm = True
+    service: ShoppingService = None
+
+    routes = {
+        "/geocode": "geocode",
+        "/stores": "stores",
+        "/workflow": "workflow",
+    }
+
+    def log_message(self, format, *args):
+        # Per-request access logs would dominate output at high request rates
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise BadRequest("Request body too large")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise BadRequest("Request body must be valid JSON")
+        if not isinstance(body, dict):
+            raise BadRequest("Request body must be a JSON object")
+        return body
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        method = self.routes.get(self.path)
+        try:
+            body = self._read_body()
+            if method is None:
+                self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+                return
+            status, payload = getattr(self.service, method)(body)
+        except BadRequest as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            print(f"API error on {self.path}: {e}")
+            status, payload = 500, {"error": "Internal server error"}
+        self._send_json(status, payload)
+
+
+class ShoppingHTTPServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections under bursts of clients
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def create_server(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    service: Optional[ShoppingService] = None,
+) -> ThreadingHTTPServer:
+    """Builds (but doesn't start) a server bound to ``host:port``."""
+    handler = type(
+        "BoundShoppingRequestHandler",
+        (ShoppingRequestHandler,),
+        {"service": service or ShoppingService()},
+    )
+    return ShoppingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the shopping workflow API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    server = create_server(args.host, args.port)
+    # Built once here rather than inside the first request
+    server.RequestHandlerClass.service._get_workflow()
+    print(f"Serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
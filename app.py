@@ -1,8 +1,16 @@
 import streamlit as st
-import os
+import asyncio
+import contextvars
+import functools
+import queue
+import threading
+import time
 import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from typing import Dict, List, Any
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
 import pandas as pd
 
 # import pydeck as pdk
@@ -14,16 +22,22 @@ from agents import (
     shopping_advisor_agent,
     find_stores_with_maps_api,
     estimate_prices_simple,
+    estimate_price_matrix,
     create_Maps_url,
     ShoppingStrategist,
+    DEFAULT_SEARCH_CHAINS,
     AVERAGE_VEHICLE_MPG,
     AVERAGE_GAS_PRICE_PER_GALLON,
-    VALUE_OF_TIME_PER_HOUR,
     ADK_AVAILABLE,
     AgentRequest,
     AgentResponse,
 )
+from geocode_cache import get_geocode_cache
+from maps_client import get_maps_client
+from price_catalog import get_price_catalog
+from rate_limit import call_budget
 from secrets_utils import get_secret
+from telemetry import count, span, submit_in_context, trace
 
 # Load environment variables (local development)
 load_dotenv()
@@ -36,14 +50,212 @@ st.set_page_config(
 )
 
 
+# Seconds each workflow stage may take before the workflow stops waiting for it.
+# Stages run on worker threads, which can't be interrupted, so a timed-out stage
+# finishes in the background and its result is discarded.
+STAGE_TIMEOUTS = {
+    "store_finder": 60.0,
+    "price_optimizer": 30.0,
+    "shopping_strategist": 60.0,
+    "route_optimizer": 30.0,
+    "shopping_advisor": 30.0,
+}
+
+
+# Strategist progress events are sent at most this often
+PLAN_PROGRESS_INTERVAL_SECONDS = 0.1
+
+# Maps requests one workflow may make (retries included). Past it, travel costs
+# fall back to estimates so a single large request can't drain the shared quota.
+WORKFLOW_MAPS_CALL_BUDGET = 60
+
+# Hard cap on a whole workflow run. Stage timeouts are shortened to whatever is
+# left of it, and each agent may use at most its share of it before the workflow
+# stops waiting and goes with the deterministic result.
+WORKFLOW_DEADLINE_SECONDS = 90.0
+AGENT_DEADLINE_SHARES = {
+    "store_finder": 0.25,
+    "price_optimizer": 0.15,
+    "shopping_strategist": 0.25,
+    "route_optimizer": 0.15,
+    "shopping_advisor": 0.15,
+}
+
+# Threads per pool in each workflow run (see _WorkflowPools). Each stage makes at
+# most one agent call and one fallback, so a run never queues behind its own
+# abandoned calls.
+WORKFLOW_POOL_THREADS = len(STAGE_TIMEOUTS)
+
+
+class StageTimeout(Exception):
+    """Raised when a required workflow stage misses its timeout."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"{stage} did not finish within {timeout:.0f}s")
+        self.stage = stage
+
+
+class _Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar(
+    "workflow_deadline", default=None
+)
+
+
+class _WorkflowPools:
+    """
+    Threads for one workflow run: stages, agent calls and the speculative
+    deterministic paths. Threads can't be interrupted, so a timed-out stage or an
+    agent over its budget finishes in the background; because every run gets its
+    own pools, a call that hangs only holds a thread of the run that gave up on
+    it, never a slot a later run needs.
+
+    Stages run here rather than on the event loop's default executor, which
+    ``asyncio.run`` joins on exit and would make every caller wait out a
+    timed-out stage anyway.
+    """
+
+    def __init__(self, threads: Optional[int] = None):
+        threads = threads or WORKFLOW_POOL_THREADS
+        self.stage = ThreadPoolExecutor(threads, thread_name_prefix="stage")
+        self.agent = ThreadPoolExecutor(threads, thread_name_prefix="agent")
+        self.speculation = ThreadPoolExecutor(threads, thread_name_prefix="fallback")
+
+    def shutdown(self):
+        # Don't wait: abandoned calls finish (and their threads exit) on their own
+        for pool in (self.stage, self.agent, self.speculation):
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_current_pools: contextvars.ContextVar = contextvars.ContextVar(
+    "workflow_pools", default=None
+)
+
+
+@contextmanager
+def _workflow_pools():
+    """The running workflow's pools, or pools for this call alone outside one."""
+    pools = _current_pools.get()
+    if pools is not None:
+        yield pools
+        return
+    pools = _WorkflowPools()
+    try:
+        yield pools
+    finally:
+        pools.shutdown()
+
+
+def _run_coroutine(coro):
+    """Runs ``coro`` to completion from synchronous code."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Already inside an event loop (e.g. called from async code): use a fresh
+    # loop on a helper thread instead of nesting
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return submit_in_context(pool, asyncio.run, coro).result()
+
+
+class _EventGate:
+    """
+    Event callback for a speculative source: events are held until the source is
+    known to be used (``release``) and discarded if it loses (``drop``).
+    """
+
+    def __init__(self, emit):
+        self.emit = emit
+        self.held = []
+        self.released = False
+        self.dropped = False
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self._lock:
+            if self.dropped:
+                return
+            if not self.released:
+                self.held.append(args)
+                return
+            self.emit(*args)
+
+    def release(self):
+        with self._lock:
+            if self.released or self.dropped:
+                return
+            self.released = True
+            for args in self.held:
+                self.emit(*args)
+            self.held = []
+
+    def drop(self):
+        with self._lock:
+            if not self.released:
+                self.dropped = True
+                self.held = []
+
+
+class WorkflowEvent(NamedTuple):
+    """A progress event from ``GoogleADKMultiAgent.iter_shopping_workflow``."""
+
+    kind: str
+    data: Any
+
+
+class _PlanProgress:
+    """Strategist ``on_plan`` callback that emits throttled progress events."""
+
+    def __init__(self, emit, interval_seconds: float = PLAN_PROGRESS_INTERVAL_SECONDS):
+        self.emit = emit
+        self.interval_seconds = interval_seconds
+        self.best_plan = None
+        self.last_emit = 0.0
+
+    def __call__(self, plan, plans_evaluated):
+        if (
+            self.best_plan is None
+            or plan["total_plan_cost"] < self.best_plan["total_plan_cost"]
+        ):
+            self.best_plan = plan
+        now = time.monotonic()
+        if now - self.last_emit >= self.interval_seconds:
+            self.last_emit = now
+            self.emit(
+                "plans_evaluated",
+                {"plans_evaluated": plans_evaluated, "best_plan": self.best_plan},
+            )
+
+
 class GoogleADKMultiAgent:
 
-    def __init__(self):
+    def __init__(
+        self,
+        stage_timeouts: Dict[str, float] = None,
+        maps_call_budget: Optional[int] = WORKFLOW_MAPS_CALL_BUDGET,
+        deadline_seconds: Optional[float] = WORKFLOW_DEADLINE_SECONDS,
+        agent_deadline_shares: Dict[str, float] = None,
+    ):
         self.root_agent = root_agent
         self.store_finder_agent = store_finder_agent
         self.price_optimizer_agent = price_optimizer_agent
         self.route_optimizer_agent = route_optimizer_agent
         self.shopping_advisor_agent = shopping_advisor_agent
+        self.stage_timeouts = dict(STAGE_TIMEOUTS, **(stage_timeouts or {}))
+        self.maps_call_budget = maps_call_budget
+        self.deadline_seconds = deadline_seconds
+        self.agent_deadline_shares = dict(
+            AGENT_DEADLINE_SHARES, **(agent_deadline_shares or {})
+        )
+        # Load the catalog and its item index now rather than in the first request
+        get_price_catalog()
 
     def execute_shopping_workflow(
         self,
@@ -60,62 +272,146 @@ class GoogleADKMultiAgent:
         1. User enters address + products (no store selection): Agents suggest optimal stores, route, and savings
         2. User selects stores + strict mode: Agents must visit all selected stores, optimize only route and item allocation
         3. User selects stores + non-strict mode: Agents treat selections as suggestions, optimize everything including store selection
-        """
 
-        # STEP 1: Store Finder Agent - Use Google ADK agent to find nearby stores
-        original_preferred_stores = preferred_stores.copy() if preferred_stores else []
-        search_chains = (
-            preferred_stores
-            if preferred_stores
-            else [
-                "Walmart",
-                "Target",
-                "Kroger",
-                "Costco",
-                "Whole Foods",
-                "Safeway",
-                "Meijer",
-            ]
+        Synchronous wrapper around ``execute_shopping_workflow_async``.
+        """
+        return _run_coroutine(
+            self.execute_shopping_workflow_async(
+                location, items, preferred_stores, strict_mode, max_distance_miles
+            )
         )
 
-        if ADK_AVAILABLE:
+    def iter_shopping_workflow(
+        self,
+        location: Dict[str, Any],
+        items: List[str],
+        preferred_stores: List[str],
+        strict_mode: bool,
+        max_distance_miles: int = 30,
+    ) -> Iterator[WorkflowEvent]:
+        """
+        Runs the workflow in the background and yields ``WorkflowEvent``s as
+        stages progress, so callers can render partial results right away.
+
+        Event kinds, in order: ``location``, ``store_found`` (one per store),
+        ``stores_ready``, ``prices_ready``, ``plans_evaluated`` (repeated, with the
+        running count and best plan so far), ``best_plan``, ``route``, and finally
+        ``result`` with the same dict ``execute_shopping_workflow`` returns.
+        Stages that don't run (e.g. after no stores are found) emit nothing.
+        """
+        events = queue.Queue()
+
+        def run():
             try:
-                store_request = {
-                    "task": "find_nearby_stores",
-                    "location": location,
-                    "preferred_chains": search_chains,
-                    "max_distance_miles": max_distance_miles,
-                    "user_requirements": {
-                        "strict_mode": strict_mode,
-                        "original_preferences": original_preferred_stores,
-                    },
-                }
-                agent_request = AgentRequest(
-                    content=(
-                        f"Find grocery stores near {location.get('formatted_address', 'user location')} "
-                        f"within {max_distance_miles} miles. Search for these chains: {', '.join(search_chains)}."
-                        " Return store details including name, address, coordinates, and chain information."
-                    ),
-                    context=store_request,
-                )
-                store_response = self.store_finder_agent.run(agent_request)
-                stores = (
-                    store_response.content
-                    if isinstance(store_response, AgentResponse)
-                    else store_response
-                )
-                if not isinstance(stores, list):
-                    stores = find_stores_with_maps_api(
-                        location, search_chains, max_distance_miles
+                result = _run_coroutine(
+                    self.execute_shopping_workflow_async(
+                        location,
+                        items,
+                        preferred_stores,
+                        strict_mode,
+                        max_distance_miles,
+                        on_event=lambda kind, data: events.put(
+                            WorkflowEvent(kind, data)
+                        ),
                     )
-            except Exception:
-                stores = find_stores_with_maps_api(
-                    location, search_chains, max_distance_miles
                 )
-        else:
-            stores = find_stores_with_maps_api(
-                location, search_chains, max_distance_miles
+            except Exception as e:
+                result = {
+                    "status": "error",
+                    "message": f"Multi-agent workflow failed: {e}",
+                    "stores": [],
+                }
+            events.put(WorkflowEvent("result", result))
+
+        threading.Thread(target=run, daemon=True).start()
+        yield WorkflowEvent("location", location)
+        while True:
+            event = events.get()
+            yield event
+            if event.kind == "result":
+                return
+
+    async def execute_shopping_workflow_async(
+        self,
+        location: str,
+        items: List[str],
+        preferred_stores: List[str],
+        strict_mode: bool,
+        max_distance_miles: int = 30,
+        on_event: Optional[Callable[[str, Any], None]] = None,
+    ):
+        """
+        Async form of ``execute_shopping_workflow``.
+
+        Stages run on worker threads, each under its own timeout from
+        ``stage_timeouts``, cut short so the whole run fits in ``deadline_seconds``.
+        Each agent call is limited to its ``agent_deadline_shares`` of that
+        deadline; where a deterministic path exists it runs alongside the agent
+        and the first valid result wins. The route optimizer and the final
+        advisor only depend on the chosen plan, so they run concurrently.
+
+        ``on_event(kind, data)`` receives progress events as stages finish (see
+        ``iter_shopping_workflow``); it may be called from worker threads.
+
+        Stage, agent and Maps API timings, call counts, cache hits and bytes
+        transferred during the run are reported under ``workflow_metadata`` as
+        ``timings``. The run may make at most ``maps_call_budget`` Maps requests;
+        the number used is reported as ``maps_calls_used``.
+        """
+        deadline = _Deadline(self.deadline_seconds) if self.deadline_seconds else None
+        deadline_token = _current_deadline.set(deadline)
+        pools = _WorkflowPools()
+        pools_token = _current_pools.set(pools)
+        try:
+            with trace() as workflow_trace, call_budget(
+                self.maps_call_budget
+            ) as budget:
+                result = await self._execute_workflow(
+                    location,
+                    items,
+                    preferred_stores,
+                    strict_mode,
+                    max_distance_miles,
+                    on_event,
+                )
+        finally:
+            _current_pools.reset(pools_token)
+            _current_deadline.reset(deadline_token)
+            pools.shutdown()
+        if "workflow_metadata" in result:
+            result["workflow_metadata"]["timings"] = workflow_trace.summary()
+            if budget is not None:
+                result["workflow_metadata"]["maps_calls_used"] = budget.used
+        return result
+
+    async def _execute_workflow(
+        self,
+        location,
+        items,
+        preferred_stores,
+        strict_mode,
+        max_distance_miles,
+        on_event,
+    ):
+        emit = on_event or (lambda kind, data: None)
+        original_preferred_stores = preferred_stores.copy() if preferred_stores else []
+        search_chains = preferred_stores if preferred_stores else DEFAULT_SEARCH_CHAINS
+
+        try:
+            # STEP 1: Store Finder Agent - Use Google ADK agent to find nearby stores
+            stores = await self._run_stage(
+                "store_finder",
+                self._find_stores,
+                location,
+                search_chains,
+                max_distance_miles,
+                strict_mode,
+                original_preferred_stores,
+                on_event and (lambda store: emit("store_found", store)),
             )
+        except StageTimeout:
+            stores = []
+        emit("stores_ready", stores)
 
         if not stores:
             return {
@@ -124,75 +420,29 @@ class GoogleADKMultiAgent:
                 "stores": [],
             }
 
-        # STEP 2: Price Optimizer Agent
-        if ADK_AVAILABLE:
-            try:
-                price_request = AgentRequest(
-                    content=(
-                        f"Estimate prices for {len(items)} grocery items across {len(stores)} stores. "
-                        f"Items: {', '.join(items)}. Stores: {', '.join([s['name'] for s in stores])}."
-                        " Provide detailed price comparisons and identify best deals."
-                    ),
-                    context={
-                        "task": "estimate_prices",
-                        "items": items,
-                        "stores": stores,
-                        "analysis_type": "comprehensive_comparison",
-                    },
-                )
-                price_response = self.price_optimizer_agent.run(price_request)
-                prices_data = (
-                    price_response.content
-                    if isinstance(price_response, AgentResponse)
-                    else price_response
-                )
-                if not isinstance(prices_data, dict):
-                    prices_data = estimate_prices_simple(items, stores)
-            except Exception:
-                prices_data = estimate_prices_simple(items, stores)
-        else:
-            prices_data = estimate_prices_simple(items, stores)
-
-        # STEP 3: Shopping Strategist Agent
-        if ADK_AVAILABLE:
-            try:
-                strategy_request = AgentRequest(
-                    content=(
-                        f"Analyze optimal shopping strategy for {len(items)} items across {len(stores)} stores. "
-                        f"Mode: {'Strict' if strict_mode else 'Optimized'}. User preferences: {original_preferred_stores}."
-                        " Consider cost-benefit analysis including travel costs."
-                    ),
-                    context={
-                        "task": "optimize_shopping_strategy",
-                        "user_location": location,
-                        "items": items,
-                        "price_data": prices_data,
-                        "available_stores": stores,
-                        "strict_mode": strict_mode,
-                        "preferred_stores": original_preferred_stores,
-                    },
-                )
-                strategy_response = self.shopping_advisor_agent.run(strategy_request)
-                strategy_data = (
-                    strategy_response.content
-                    if isinstance(strategy_response, AgentResponse)
-                    else None
-                )
-            except Exception:
-                strategy_data = None
-
-        strategist = ShoppingStrategist(
-            user_location=location, all_items=items, price_data=prices_data
-        )
-
-        if ADK_AVAILABLE and strategy_data and isinstance(strategy_data, dict):
-            best_plan = strategy_data
-        else:
-            best_plan = strategist.find_best_strategy(
-                available_stores=stores,
-                strict_mode=strict_mode,
-                preferred_store_names=original_preferred_stores,
+        try:
+            # STEP 2: Price Optimizer Agent
+            prices_data, price_matrix = await self._run_stage(
+                "price_optimizer", self._estimate_prices, items, stores
             )
+            emit("prices_ready", prices_data)
+
+            # STEP 3: Shopping Strategist Agent
+            best_plan = await self._run_stage(
+                "shopping_strategist",
+                self._plan_strategy,
+                location,
+                items,
+                stores,
+                prices_data,
+                price_matrix,
+                strict_mode,
+                original_preferred_stores,
+                on_event and _PlanProgress(emit),
+            )
+        except StageTimeout as e:
+            print(f"Workflow stage timed out: {e}")
+            best_plan = None
 
         if not best_plan:
             return {
@@ -201,73 +451,428 @@ class GoogleADKMultiAgent:
                 "stores": stores,
             }
 
-        # STEP 4: Route Optimizer Agent
-        if ADK_AVAILABLE:
-            try:
-                route_request = AgentRequest(
-                    content=(
-                        f"Generate optimal route for shopping at {len(best_plan['optimized_stores_in_route'])} stores. "
-                        "Calculate travel costs, time, and create Google Maps URL. "
-                        f"Stores: {', '.join([s['name'] for s in best_plan['optimized_stores_in_route']])}"
-                    ),
-                    context={
-                        "task": "optimize_route",
-                        "user_location": location,
-                        "stores": best_plan["optimized_stores_in_route"],
-                        "travel_preferences": {
-                            "max_distance_miles": max_distance_miles
-                        },
-                    },
-                )
-                route_response = self.route_optimizer_agent.run(route_request)
-                route_data = (
-                    route_response.content
-                    if isinstance(route_response, AgentResponse)
-                    else None
-                )
-            except Exception:
-                route_data = None
-        else:
-            route_data = None
+        emit("best_plan", best_plan)
+
+        # STEP 4: Route Optimizer and Shopping Advisor Agents, side by side
+        draft_maps_url = create_Maps_url(
+            location, best_plan["optimized_stores_in_route"]
+        )
+        route_data, advisor_response = await asyncio.gather(
+            self._run_optional_stage(
+                "route_optimizer",
+                self._optimize_route,
+                location,
+                best_plan,
+                max_distance_miles,
+            ),
+            self._run_optional_stage(
+                "shopping_advisor",
+                self._advise,
+                best_plan,
+                draft_maps_url,
+                strict_mode,
+                original_preferred_stores,
+                max_distance_miles,
+            ),
+        )
 
         maps_url = (
             route_data.get("maps_url")
             if isinstance(route_data, dict)
-            else create_Maps_url(location, best_plan["optimized_stores_in_route"])
+            else draft_maps_url
         )
+        emit("route", {"maps_url": maps_url, "route_data": route_data})
 
-        advisor_response = None
-        if ADK_AVAILABLE:
+        # Generate scenario-specific advisor response (enhanced with ADK insights)
+        scenario = best_plan.get("scenario", "unknown")
+        if advisor_response is None:
+            advisor_response = self._fallback_advice(
+                best_plan, stores, original_preferred_stores
+            )
+
+        return {
+            "status": "success",
+            "stores": stores,
+            "best_plan": best_plan,
+            "maps_url": maps_url,
+            "advisor_response": advisor_response,
+            "scenario": "strict" if strict_mode else "optimized",
+            "workflow_metadata": {
+                "adk_available": ADK_AVAILABLE,
+                "agents_used": [
+                    "store_finder_agent",
+                    "price_optimizer_agent",
+                    "shopping_strategist_agent",
+                    "route_optimizer_agent",
+                    "shopping_advisor_agent",
+                ],
+                "total_stores_analyzed": len(stores),
+                "total_items_priced": len(items),
+                "optimization_mode": scenario,
+            },
+        }
+
+    def _stage_timeout(self, stage: str) -> Optional[float]:
+        timeout = self.stage_timeouts.get(stage)
+        deadline = _current_deadline.get()
+        if deadline is not None:
+            remaining = deadline.remaining()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def _agent_budget(self, stage: str) -> Optional[float]:
+        """Seconds the agent for ``stage`` may take before it is abandoned."""
+        timeout = self._stage_timeout(stage)
+        deadline = _current_deadline.get()
+        share = self.agent_deadline_shares.get(stage)
+        if deadline is None or share is None:
+            return timeout
+        budget = share * deadline.seconds
+        return budget if timeout is None else min(budget, timeout)
+
+    async def _run_stage(self, stage: str, func, *args):
+        timeout = self._stage_timeout(stage)
+        with span(f"stage.{stage}"):
+            # Copy the context so budgets, deadlines and traces follow the stage
+            call = functools.partial(contextvars.copy_context().run, func, *args)
             try:
-                advisor_request = AgentRequest(
-                    content=(
-                        f"Generate comprehensive shopping recommendations based on analysis. Scenario: {best_plan.get('scenario', 'unknown')}. "
-                        f"Total cost: ${best_plan['total_plan_cost']:.2f}. Stores: {', '.join(best_plan['plan_stores'])}. "
-                        "Create user-friendly advice with cost breakdown and justifications."
-                    ),
-                    context={
-                        "task": "generate_final_recommendations",
-                        "best_plan": best_plan,
-                        "scenario": best_plan.get("scenario", "unknown"),
-                        "maps_url": maps_url,
-                        "user_preferences": {
-                            "strict_mode": strict_mode,
-                            "preferred_stores": original_preferred_stores,
-                            "max_distance": max_distance_miles,
-                        },
-                    },
+                with _workflow_pools() as pools:
+                    return await asyncio.wait_for(
+                        asyncio.get_running_loop().run_in_executor(pools.stage, call),
+                        timeout,
+                    )
+            except asyncio.TimeoutError:
+                count(f"stage.{stage}.timeouts")
+                raise StageTimeout(stage, timeout)
+
+    async def _run_optional_stage(self, stage: str, func, *args):
+        """Like ``_run_stage`` but a timeout yields ``None`` instead of failing."""
+        try:
+            return await self._run_stage(stage, func, *args)
+        except StageTimeout as e:
+            print(f"Workflow stage timed out, continuing without it: {e}")
+            return None
+
+    def _call_agent(self, agent, request):
+        with span(f"agent.{getattr(agent, 'name', type(agent).__name__)}"):
+            return agent.run(request)
+
+    def _run_agent(self, agent, request, stage: str):
+        """Runs ``agent`` within the stage's budget; raises ``TimeoutError`` past it."""
+        with _workflow_pools() as pools:
+            future = submit_in_context(pools.agent, self._call_agent, agent, request)
+            try:
+                return future.result(timeout=self._agent_budget(stage))
+            except FutureTimeout:
+                count(f"agent.{stage}.over_budget")
+                raise
+
+    def _speculate(
+        self, stage: str, agent, request, parse, fallback, fallback_events=None
+    ):
+        """
+        Runs ``agent`` and the deterministic ``fallback()`` side by side and returns
+        whichever valid result arrives first. ``parse(response)`` turns the agent's
+        response into a result, or ``None`` if it isn't usable. The agent is given
+        up on after its budget. If the fallback raises, the agent still gets its
+        budget, and the fallback's error is raised only if the agent fails too.
+
+        ``fallback_events`` (an ``_EventGate`` the fallback emits through) is
+        released once the fallback can win and dropped if the agent wins.
+        """
+        if not ADK_AVAILABLE:
+            return fallback()
+
+        with _workflow_pools() as pools:
+            agent_future = submit_in_context(
+                pools.agent, self._call_agent, agent, request
+            )
+            fallback_future = submit_in_context(pools.speculation, fallback)
+            budget = self._agent_budget(stage)
+            agent_deadline = None if budget is None else time.monotonic() + budget
+            fallback_error = None
+            pending = {agent_future, fallback_future}
+            while pending:
+                timeout = None
+                if agent_future in pending and agent_deadline is not None:
+                    timeout = max(0.0, agent_deadline - time.monotonic())
+                done, pending = wait(
+                    pending, timeout=timeout, return_when=FIRST_COMPLETED
                 )
-                advisor_response_obj = self.shopping_advisor_agent.run(advisor_request)
-                advisor_response = (
-                    advisor_response_obj.content
-                    if isinstance(advisor_response_obj, AgentResponse)
-                    else str(advisor_response_obj)
+                if not done:
+                    count(f"agent.{stage}.over_budget")
+                    pending.discard(agent_future)
+                    if fallback_events is not None:
+                        fallback_events.release()
+                    continue
+                if fallback_future in done:
+                    try:
+                        result = fallback_future.result()
+                    except Exception as e:
+                        count(f"stage.{stage}.fallback_errors")
+                        fallback_error = e
+                    else:
+                        count(f"stage.{stage}.fallback_wins")
+                        if fallback_events is not None:
+                            fallback_events.release()
+                        return result
+                if agent_future in done:
+                    try:
+                        result = parse(agent_future.result())
+                    except Exception:
+                        result = None
+                    if result is not None:
+                        count(f"stage.{stage}.agent_wins")
+                        if fallback_events is not None:
+                            fallback_events.drop()
+                        return result
+                    if fallback_events is not None:
+                        fallback_events.release()
+            # Both sides are out: the agent failed or ran over, and the fallback raised
+            raise fallback_error
+
+    def _find_stores(
+        self,
+        location,
+        search_chains,
+        max_distance_miles,
+        strict_mode,
+        original_preferred_stores,
+        on_store=None,
+    ):
+        def find_with_maps(emit=on_store):
+            if emit is None:
+                return find_stores_with_maps_api(
+                    location, search_chains, max_distance_miles
                 )
-            except Exception:
-                advisor_response = None
+            return find_stores_with_maps_api(
+                location, search_chains, max_distance_miles, on_store=emit
+            )
 
-        # Generate scenario-specific advisor response (enhanced with ADK insights)
+        if not ADK_AVAILABLE:
+            return find_with_maps()
+
+        store_request = {
+            "task": "find_nearby_stores",
+            "location": location,
+            "preferred_chains": search_chains,
+            "max_distance_miles": max_distance_miles,
+            "user_requirements": {
+                "strict_mode": strict_mode,
+                "original_preferences": original_preferred_stores,
+            },
+        }
+        agent_request = AgentRequest(
+            content=(
+                f"Find grocery stores near {location.get('formatted_address', 'user location')} "
+                f"within {max_distance_miles} miles. Search for these chains: {', '.join(search_chains)}."
+                " Return store details including name, address, coordinates, and chain information."
+            ),
+            context=store_request,
+        )
+
+        def parse(store_response):
+            stores = (
+                store_response.content
+                if isinstance(store_response, AgentResponse)
+                else store_response
+            )
+            return stores if isinstance(stores, list) else None
+
+        # Stores the Maps search finds are held back while the agent may still win
+        gate = _EventGate(on_store) if on_store else None
+        stores = self._speculate(
+            "store_finder",
+            self.store_finder_agent,
+            agent_request,
+            parse,
+            lambda: find_with_maps(gate),
+            fallback_events=gate,
+        )
+        if gate is not None and gate.dropped:
+            for store in stores:
+                on_store(store)
+        return stores
+
+    def _estimate_prices(self, items, stores):
+        """Returns ``(prices_data, price_matrix)``; the matrix is ``None`` for agent prices."""
+
+        def estimate_from_catalog():
+            prices_data = estimate_prices_simple(items, stores)
+            # The catalog builds the strategist's price matrix directly
+            return prices_data, estimate_price_matrix(items, stores)
+
+        if not ADK_AVAILABLE:
+            return estimate_from_catalog()
+
+        price_request = AgentRequest(
+            content=(
+                f"Estimate prices for {len(items)} grocery items across {len(stores)} stores. "
+                f"Items: {', '.join(items)}. Stores: {', '.join([s['name'] for s in stores])}."
+                " Provide detailed price comparisons and identify best deals."
+            ),
+            context={
+                "task": "estimate_prices",
+                "items": items,
+                "stores": stores,
+                "analysis_type": "comprehensive_comparison",
+            },
+        )
+
+        def parse(price_response):
+            prices_data = (
+                price_response.content
+                if isinstance(price_response, AgentResponse)
+                else price_response
+            )
+            return (prices_data, None) if isinstance(prices_data, dict) else None
+
+        return self._speculate(
+            "price_optimizer",
+            self.price_optimizer_agent,
+            price_request,
+            parse,
+            estimate_from_catalog,
+        )
+
+    def _plan_strategy(
+        self,
+        location,
+        items,
+        stores,
+        prices_data,
+        price_matrix,
+        strict_mode,
+        original_preferred_stores,
+        on_plan=None,
+    ):
+        def find_best():
+            strategist = ShoppingStrategist(
+                user_location=location,
+                all_items=items,
+                price_data=prices_data,
+                price_matrix=price_matrix,
+            )
+            with span("strategy.find_best"):
+                return strategist.find_best_strategy(
+                    available_stores=stores,
+                    strict_mode=strict_mode,
+                    preferred_store_names=original_preferred_stores,
+                    on_plan=on_plan,
+                )
+
+        if not ADK_AVAILABLE:
+            return find_best()
+
+        strategy_request = AgentRequest(
+            content=(
+                f"Analyze optimal shopping strategy for {len(items)} items across {len(stores)} stores. "
+                f"Mode: {'Strict' if strict_mode else 'Optimized'}. User preferences: {original_preferred_stores}."
+                " Consider cost-benefit analysis including travel costs."
+            ),
+            context={
+                "task": "optimize_shopping_strategy",
+                "user_location": location,
+                "items": items,
+                "price_data": prices_data,
+                "available_stores": stores,
+                "strict_mode": strict_mode,
+                "preferred_stores": original_preferred_stores,
+            },
+        )
+
+        def parse(strategy_response):
+            strategy_data = (
+                strategy_response.content
+                if isinstance(strategy_response, AgentResponse)
+                else None
+            )
+            return (
+                strategy_data
+                if strategy_data and isinstance(strategy_data, dict)
+                else None
+            )
+
+        return self._speculate(
+            "shopping_strategist",
+            self.shopping_advisor_agent,
+            strategy_request,
+            parse,
+            find_best,
+        )
+
+    def _optimize_route(self, location, best_plan, max_distance_miles):
+        if not ADK_AVAILABLE:
+            return None
+        try:
+            route_request = AgentRequest(
+                content=(
+                    f"Generate optimal route for shopping at {len(best_plan['optimized_stores_in_route'])} stores. "
+                    "Calculate travel costs, time, and create Google Maps URL. "
+                    f"Stores: {', '.join([s['name'] for s in best_plan['optimized_stores_in_route']])}"
+                ),
+                context={
+                    "task": "optimize_route",
+                    "user_location": location,
+                    "stores": best_plan["optimized_stores_in_route"],
+                    "travel_preferences": {"max_distance_miles": max_distance_miles},
+                },
+            )
+            route_response = self._run_agent(
+                self.route_optimizer_agent, route_request, "route_optimizer"
+            )
+            return (
+                route_response.content
+                if isinstance(route_response, AgentResponse)
+                else None
+            )
+        except Exception:
+            return None
+
+    def _advise(
+        self,
+        best_plan,
+        maps_url,
+        strict_mode,
+        original_preferred_stores,
+        max_distance_miles,
+    ):
+        if not ADK_AVAILABLE:
+            return None
+        try:
+            advisor_request = AgentRequest(
+                content=(
+                    f"Generate comprehensive shopping recommendations based on analysis. Scenario: {best_plan.get('scenario', 'unknown')}. "
+                    f"Total cost: ${best_plan['total_plan_cost']:.2f}. Stores: {', '.join(best_plan['plan_stores'])}. "
+                    "Create user-friendly advice with cost breakdown and justifications."
+                ),
+                context={
+                    "task": "generate_final_recommendations",
+                    "best_plan": best_plan,
+                    "scenario": best_plan.get("scenario", "unknown"),
+                    "maps_url": maps_url,
+                    "user_preferences": {
+                        "strict_mode": strict_mode,
+                        "preferred_stores": original_preferred_stores,
+                        "max_distance": max_distance_miles,
+                    },
+                },
+            )
+            advisor_response_obj = self._run_agent(
+                self.shopping_advisor_agent, advisor_request, "shopping_advisor"
+            )
+            return (
+                advisor_response_obj.content
+                if isinstance(advisor_response_obj, AgentResponse)
+                else str(advisor_response_obj)
+            )
+        except Exception:
+            return None
+
+    def _fallback_advice(self, best_plan, stores, original_preferred_stores):
+        """Scenario-specific advice used when the advisor agent gives none."""
         scenario = best_plan.get("scenario", "unknown")
+        advisor_response = None
 
         gas_cost_only = best_plan.get("travel_costs", {}).get("gas_cost", 0)
         display_total_cost = best_plan.get("item_cost", 0) + gas_cost_only
@@ -342,27 +947,7 @@ class GoogleADKMultiAgent:
                 💡 **Cost-Benefit Analysis**: Your selections align with the optimal cost-benefit analysis!
                 """
 
-        return {
-            "status": "success",
-            "stores": stores,
-            "best_plan": best_plan,
-            "maps_url": maps_url,
-            "advisor_response": advisor_response,
-            "scenario": "strict" if strict_mode else "optimized",
-            "workflow_metadata": {
-                "adk_available": ADK_AVAILABLE,
-                "agents_used": [
-                    "store_finder_agent",
-                    "price_optimizer_agent",
-                    "shopping_strategist_agent",
-                    "route_optimizer_agent",
-                    "shopping_advisor_agent",
-                ],
-                "total_stores_analyzed": len(stores),
-                "total_items_priced": len(items),
-                "optimization_mode": scenario,
-            },
-        }
+        return advisor_response
 
 
 # def get_places_api_suggestions(user_input: str) -> List[str]:
@@ -398,22 +983,34 @@ def geocode_address(address: str) -> Dict[str, Any]:
     if not address or not address.strip():
         return {"error": "Please enter a valid location", "source": "error"}
 
+    cache = get_geocode_cache()
+    cached = cache.get(address)
+    count("cache.geocode.hits" if cached is not None else "cache.geocode.misses")
+    if cached is not None:
+        if cached["negative"]:
+            return {
+                "error": f"Location '{address}' not found. Please try a more specific address (e.g., 'San Francisco, CA' or '123 Main St, New York, NY')",
+                "source": "not_found",
+            }
+        return dict(cached["result"], source="geocode_cache")
+
     try:
-        url = f"https://maps.googleapis.com/maps/api/geocode/json"
         params = {"address": address.strip(), "key": api_key}
-        response = requests.get(url, params=params, timeout=15)
-        data = response.json()
+        data = get_maps_client().get_json("geocode", params)
 
         if data["status"] == "OK" and data["results"]:
             location = data["results"][0]["geometry"]["location"]
             formatted_address = data["results"][0]["formatted_address"]
-            return {
+            result = {
                 "lat": location["lat"],
                 "lng": location["lng"],
                 "formatted_address": formatted_address,
                 "source": "google_api",
             }
+            cache.put(address, result)
+            return result
         elif data["status"] == "ZERO_RESULTS":
+            cache.put(address, None, negative=True)
             return {
                 "error": f"Location '{address}' not found. Please try a more specific address (e.g., 'San Francisco, CA' or '123 Main St, New York, NY')",
                 "source": "not_found",
@@ -550,20 +1147,53 @@ def main():
                         f"🏪 **Target Stores**: {', '.join(preferred_stores) if preferred_stores else 'Algorithm will decide'}"
                     )
                     status.write("🔍 **Store Finder Agent**: Locating nearby stores...")
-                    status.write(
-                        "💰 **Price Optimizer Agent**: Gathering price intelligence..."
-                    )
-                    status.write(
-                        "🧠 **Shopping Strategist**: Evaluating all plans for total cost..."
-                    )
 
-                    workflow_result = multi_agent.execute_shopping_workflow(
+                    workflow_result = None
+                    plan_progress = None
+                    for event in multi_agent.iter_shopping_workflow(
                         location=location_data,
                         items=items,
                         preferred_stores=preferred_stores,
                         strict_mode=strict_mode,
                         max_distance_miles=max_distance,
-                    )
+                    ):
+                        if event.kind == "store_found":
+                            store = event.data
+                            status.write(
+                                f"  • Found **{store['name']}** ({store.get('distance_meters', 0) / 1609.34:.1f} miles)"
+                            )
+                        elif event.kind == "stores_ready" and event.data:
+                            status.write(
+                                f"✅ **Store Finder Agent**: {len(event.data)} stores located"
+                            )
+                            status.write(
+                                "💰 **Price Optimizer Agent**: Gathering price intelligence..."
+                            )
+                        elif event.kind == "prices_ready":
+                            status.write(
+                                f"✅ **Price Optimizer Agent**: Prices ready for {len(items)} items"
+                            )
+                            status.write(
+                                "🧠 **Shopping Strategist**: Evaluating all plans for total cost..."
+                            )
+                            plan_progress = status.empty()
+                        elif event.kind == "plans_evaluated" and plan_progress:
+                            best_so_far = event.data["best_plan"]
+                            plan_progress.write(
+                                f"  • {event.data['plans_evaluated']} plans evaluated, best so far: "
+                                f"{', '.join(best_so_far['plan_stores'])} (${best_so_far['total_plan_cost']:.2f})"
+                            )
+                        elif event.kind == "best_plan":
+                            status.write(
+                                f"✅ **Shopping Strategist**: Best plan visits {', '.join(event.data['plan_stores'])}"
+                            )
+                            status.write(
+                                "🗺️ **Route Optimizer & Shopping Advisor**: Finalizing route and advice..."
+                            )
+                        elif event.kind == "route":
+                            status.write("✅ **Route Optimizer Agent**: Route ready")
+                        elif event.kind == "result":
+                            workflow_result = event.data
 
                     if workflow_result.get("status") != "success":
                         st.error(
@@ -0,0 +1,265 @@
+"""
+Runs shopping workflows in bulk from a JSONL file, outside the Streamlit UI.
+
+Each input line is one request::
+
+    {"id": "r1", "address": "Columbus, OH", "items": ["milk", "eggs"],
+     "preferred_stores": ["Kroger"], "strict": false, "radius": 15}
+
+Only ``address`` and ``items`` are required. Requests run across a process pool
+whose workers share the on-disk caches in ``--cache-dir``, and one JSON result per
+request is streamed to the output as it finishes (so results are not in input
+order; each carries its input ``line`` and ``id``). Progress, throughput and
+failure counts are reported on stderr.
+
+    python batch_runner.py requests.jsonl -o results.jsonl --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, TextIO, Tuple
+
+DEFAULT_RADIUS_MILES = 15
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+_workflow = None
+
+
+def _init_worker(cache_dir: Optional[str]):
+    if cache_dir:
+        _use_cache_dir(cache_dir)
+
+
+def _use_cache_dir(cache_dir: Optional[str]):
+    """Points the process-wide caches at ``cache_dir`` (``None`` for the default)."""
+    if cache_dir is None:
+        os.environ.pop("GROCERY_CACHE_DIR", None)
+    else:
+        os.environ["GROCERY_CACHE_DIR"] = cache_dir
+    # Each cache reads the directory when it is next created
+    from geocode_cache import set_geocode_cache
+    from llm_cache import set_llm_cache
+    from store_directory import set_store_directory
+
+    set_geocode_cache(None)
+    set_llm_cache(None)
+    set_store_directory(None)
+
+
+@contextmanager
+def _in_process_cache_dir(cache_dir: Optional[str]):
+    """``_init_worker`` for this process, undone once the batch finishes."""
+    if not cache_dir:
+        yield
+        return
+    previous = os.environ.get("GROCERY_CACHE_DIR")
+    _use_cache_dir(cache_dir)
+    try:
+        yield
+    finally:
+        _use_cache_dir(previous)
+
+
+def _get_workflow():
+    # app is imported lazily so the parent process never loads Streamlit
+    global _workflow
+    if _workflow is None:
+        from app import GoogleADKMultiAgent
+
+        _workflow = GoogleADKMultiAgent()
+    return _workflow
+
+
+def parse_request(line: str) -> Dict[str, Any]:
+    """Validates one input line and fills in defaults; raises ``ValueError``."""
+    request = json.loads(line)
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object")
+    address = request.get("address")
+    if not isinstance(address, str) or not address.strip():
+        raise ValueError("Request needs a non-empty 'address'")
+    items = request.get("items")
+    if not isinstance(items, list) or not items:
+        raise ValueError("Request needs a non-empty 'items' list")
+    return {
+        "id": request.get("id"),
+        "address": address,
+        "items": [str(item).strip() for item in items if str(item).strip()],
+        "preferred_stores": list(request.get("preferred_stores") or []),
+        "strict": bool(request.get("strict", False)),
+        "radius": request.get("radius", DEFAULT_RADIUS_MILES),
+    }
+
+
+def run_request(line_number: int, line: str) -> Dict[str, Any]:
+    """Runs one request line; never raises, failures come back as ``status: error``."""
+    started = time.perf_counter()
+    output = {"line": line_number, "id": None}
+    try:
+        request = parse_request(line)
+        output["id"] = request["id"]
+
+        from app import geocode_address
+
+        location = geocode_address(request["address"])
+        if "error" in location:
+            output.update(status="error", error=location["error"])
+        else:
+            result = _get_workflow().execute_shopping_workflow(
+                location,
+                request["items"],
+                request["preferred_stores"],
+                request["strict"],
+                max_distance_miles=request["radius"],
+            )
+            output.update(
+                status=result.get("status", "error"),
+                location=location,
+                result=result,
+            )
+            if result.get("status") != "success":
+                output["error"] = result.get("message")
+    except Exception as e:
+        output.update(status="error", error=f"{type(e).__name__}: {e}")
+    output["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return output
+
+
+def _read_requests(source: TextIO) -> Iterator[Tuple[int, str]]:
+    for line_number, line in enumerate(source, start=1):
+        if line.strip():
+            yield line_number, line
+
+
+class _Progress:
+    def __init__(self, stream: TextIO, interval: float):
+        self.stream = stream
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last_report = self.started
+        self.done = 0
+        self.failed = 0
+
+    def record(self, output: Dict[str, Any]):
+        self.done += 1
+        if output.get("status") != "success":
+            self.failed += 1
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report()
+
+    def report(self, final: bool = False):
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        label = "finished" if final else "progress"
+        print(
+            f"[batch] {label}: {self.done} done, {self.failed} failed, "
+            f"{rate:.2f} req/s, {elapsed:.1f}s elapsed",
+            file=self.stream,
+            flush=True,
+        )
+
+
+def run_batch(
+    source: TextIO,
+    sink: TextIO,
+    workers: int = 1,
+    cache_dir: Optional[str] = None,
+    progress_stream: TextIO = sys.stderr,
+    progress_interval: float = PROGRESS_INTERVAL_SECONDS,
+) -> Dict[str, int]:
+    """
+    Runs every request in ``source`` and writes results to ``sink``.
+
+    With ``workers`` <= 1 requests run in this process, which is handy for
+    debugging. Returns the final ``done`` / ``failed`` counts.
+    """
+    progress = _Progress(progress_stream, progress_interval)
+
+    def emit(output):
+        sink.write(json.dumps(output, default=str) + "\n")
+        sink.flush()
+        progress.record(output)
+
+    if workers <= 1:
+        with _in_process_cache_dir(cache_dir):
+            for line_number, line in _read_requests(source):
+                emit(run_request(line_number, line))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(cache_dir,)
+        ) as pool:
+            # Bounded submission keeps huge input files from being read at once
+            max_in_flight = workers * 2
+            pending = set()
+            for line_number, line in _read_requests(source):
+                pending.add(pool.submit(run_request, line_number, line))
+                if len(pending) >= max_in_flight:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        emit(future.result())
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    emit(future.result())
+
+    progress.report(final=True)
+    return {"done": progress.done, "failed": progress.failed}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Run shopping workflows for every request in a JSONL file."
+    )
+    parser.add_argument("input", help="JSONL file of requests, or - for stdin")
+    parser.add_argument(
+        "-o", "--output", default="-", help="JSONL file for results (default stdout)"
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (1 runs requests in this process)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.getenv("GROCERY_CACHE_DIR"),
+        help="Directory for the shared on-disk caches",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=PROGRESS_INTERVAL_SECONDS,
+        help="Seconds between progress reports on stderr",
+    )
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = (
+        sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    )
+    try:
+        counts = run_batch(
+            source,
+            sink,
+            workers=args.workers,
+            cache_dir=args.cache_dir,
+            progress_interval=args.progress_interval,
+        )
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""
+Benchmarks for the shopping strategist, pricing and the full workflow.
+
+Price data is synthesized from ``mock_data._generate_price_data`` and stores from
+the ``maps_stub`` synthetic world, at every combination of the requested item and
+store counts. All Maps traffic goes to the in-process ``SyntheticMaps`` stand-in,
+so runs are repeatable and never touch the network. Results (ops/sec, p50/p99 and
+peak traced memory per case) are written as JSON so runs can be compared. Each
+case runs in its own process; cases exceeding ``--case-timeout`` are reported as
+timed out rather than measured::
+
+    python benchmark.py --items 5,50,500 --stores 3,10 --repeat 5 -o before.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import mock_data
+from agents import (
+    DEFAULT_SEARCH_CHAINS,
+    ShoppingStrategist,
+    estimate_prices_simple,
+)
+from geocode_cache import set_geocode_cache
+from llm_cache import set_llm_cache
+from maps_client import MapsClient, set_maps_client
+from maps_stub import SyntheticMaps, SyntheticSession
+from places_cache import places_cache
+from store_directory import get_store_directory, set_store_directory
+
+DEFAULT_ITEM_COUNTS = [5, 50, 500, 5000]
+DEFAULT_STORE_COUNTS = [3, 10, 30]
+ORIGIN = {"lat": 39.9612, "lng": -82.9988, "formatted_address": "Columbus, OH, USA"}
+
+# Chains beyond the app's defaults, so large store counts have distinct chains
+EXTRA_CHAINS = [
+    "Aldi",
+    "Publix",
+    "Trader Joe's",
+    "Sprouts",
+    "Giant Eagle",
+    "H-E-B",
+    "Wegmans",
+    "Food Lion",
+]
+
+
+def synthetic_items(count: int) -> List[str]:
+    """``count`` item names: the mock catalog's items, then numbered variants."""
+    base = list(mock_data.BASE_PRICES)
+    return [
+        (
+            base[i % len(base)]
+            if i < len(base)
+            else f"{base[i % len(base)]} {i // len(base)}"
+        )
+        for i in range(count)
+    ]
+
+
+def synthetic_stores(count: int, maps: SyntheticMaps) -> List[Dict]:
+    """``count`` stores around ``ORIGIN``, spread across chains."""
+    chains = DEFAULT_SEARCH_CHAINS + EXTRA_CHAINS
+    per_chain = -(-count // len(chains))
+    stores = []
+    for chain in chains:
+        places = [
+            place
+            for place in maps.chain_stores(chain, ORIGIN["lat"], ORIGIN["lng"])
+            if not place["name"].endswith("Gas Station")
+        ]
+        for rank, place in enumerate(places[:per_chain]):
+            location = place["geometry"]["location"]
+            stores.append(
+                {
+                    "rank": rank,
+                    "name": place["name"],
+                    "address": place["formatted_address"],
+                    "lat": location["lat"],
+                    "lng": location["lng"],
+                    "chain": chain,
+                    "place_id": place["place_id"],
+                }
+            )
+    # Interleave chains so small counts still cover several of them
+    stores.sort(key=lambda s: (s.pop("rank"), s["chain"]))
+    return stores[:count]
+
+
+def synthetic_price_data(
+    items: List[str], stores: List[Dict], seed: int = 0
+) -> Dict[str, Dict]:
+    """Strategist-shaped price data (item -> store -> {"price"}) for every store."""
+    rng = random.Random(seed)
+    base_count = len(mock_data.BASE_PRICES)
+    variants = -(-len(items) // base_count)
+    rows = []
+    for _ in range(variants):
+        multipliers = {
+            s["name"]: mock_data.DEFAULT_MULTIPLIERS.get(s["chain"], 1.0)
+            * rng.uniform(0.9, 1.1)
+            for s in stores
+        }
+        rows.extend(mock_data._generate_price_data(multipliers).values())
+    return {
+        item: {store: {"price": price} for store, price in row.items()}
+        for item, row in zip(items, rows)
+    }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def measure(name: str, params: Dict, operation: Callable, repeat: int) -> Dict:
+    """Times ``operation`` ``repeat`` times, then once more under tracemalloc."""
+    quiet = io.StringIO()
+    durations = []
+    with contextlib.redirect_stdout(quiet):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            operation()
+            durations.append(time.perf_counter() - started)
+            quiet.seek(0)
+            quiet.truncate()
+
+        tracemalloc.start()
+        try:
+            operation()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    durations.sort()
+    total = sum(durations)
+    return {
+        "name": name,
+        "params": params,
+        "runs": repeat,
+        "ops_per_sec": round(repeat / total, 3) if total else None,
+        "mean_ms": round(1000 * total / repeat, 3),
+        "p50_ms": round(1000 * percentile(durations, 0.50), 3),
+        "p99_ms": round(1000 * percentile(durations, 0.99), 3),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+STRATEGY_SCENARIOS = ("no_preferences", "suggestions", "strict")
+DEFAULT_CASE_TIMEOUT_SECONDS = 60.0
+
+
+def _strategy_options(scenario: str, stores: List[Dict]) -> Dict:
+    chains = sorted({s["chain"] for s in stores})
+    if scenario == "suggestions":
+        return {"strict_mode": False, "preferred_store_names": chains[:2]}
+    if scenario == "strict":
+        return {"strict_mode": True, "preferred_store_names": chains[:3]}
+    return {"strict_mode": False, "preferred_store_names": []}
+
+
+def build_operation(name: str, params: Dict, seed: int) -> Callable:
+    """Prepares the inputs for one case and returns the callable to time."""
+    maps = SyntheticMaps(seed=seed)
+    set_maps_client(MapsClient(session=SyntheticSession(maps)))
+    items = synthetic_items(params["items"])
+
+    if name.startswith("find_best_strategy."):
+        stores = synthetic_stores(params["stores"], maps)
+        price_data = synthetic_price_data(items, stores, seed)
+        options = _strategy_options(name.split(".", 1)[1], stores)
+
+        def operation():
+            strategist = ShoppingStrategist(ORIGIN, items, price_data)
+            return strategist.find_best_strategy(available_stores=stores, **options)
+
+        return operation
+
+    if name == "estimate_prices_simple":
+        stores = synthetic_stores(params["stores"], maps)
+        return lambda: estimate_prices_simple(items, stores)
+
+    if name == "workflow":
+        from app import GoogleADKMultiAgent
+
+        workflow = GoogleADKMultiAgent()
+
+        def operation():
+            # Cold store search every run; the caches would hide it
+            places_cache.clear()
+            get_store_directory().clear()
+            result = workflow.execute_shopping_workflow(ORIGIN, items, [], False, 15)
+            if result.get("status") != "success":
+                raise RuntimeError(result.get("message"))
+            return result
+
+        return operation
+
+    raise ValueError(f"Unknown benchmark {name}")
+
+
+def benchmark_cases(
+    item_counts: List[int], store_counts: List[int], benchmarks: List[str]
+) -> List[Tuple[str, Dict]]:
+    cases = []
+    if "strategy" in benchmarks:
+        for stores in store_counts:
+            for items in item_counts:
+                for scenario in STRATEGY_SCENARIOS:
+                    cases.append(
+                        (
+                            f"find_best_strategy.{scenario}",
+                            {"items": items, "stores": stores},
+                        )
+                    )
+    if "pricing" in benchmarks:
+        for stores in store_counts:
+            for items in item_counts:
+                cases.append(
+                    ("estimate_prices_simple", {"items": items, "stores": stores})
+                )
+    if "workflow" in benchmarks:
+        # The store finder decides how many stores the workflow sees
+        for items in item_counts:
+            cases.append(("workflow", {"items": items}))
+    return cases
+
+
+def _isolate_environment():
+    # Keep benchmark runs away from the user's caches and real API key
+    cache_dir = tempfile.mkdtemp(prefix="grocery-bench-")
+    os.environ["GROCERY_CACHE_DIR"] = cache_dir
+    # Caches inherited from the parent would still point at the old directory
+    set_geocode_cache(None)
+    set_llm_cache(None)
+    set_store_directory(None)
+    os.environ["GOOGLE_MAPS_API_KEY"] = "synthetic-benchmark-key"
+
+
+def _run_case(results, name, params, repeat, seed):
+    _isolate_environment()
+    try:
+        results.put(measure(name, params, build_operation(name, params, seed), repeat))
+    except Exception as e:
+        results.put(
+            {"name": name, "params": params, "error": f"{type(e).__name__}: {e}"}
+        )
+
+
+def run_case(name: str, params: Dict, repeat: int, seed: int, timeout: float) -> Dict:
+    """
+    Runs one case in a child process, so a case that blows up combinatorially is
+    reported as timed out instead of stalling the whole run, and peak memory
+    isn't skewed by earlier cases.
+    """
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_run_case, args=(results, name, params, repeat, seed)
+    )
+    process.start()
+    try:
+        return results.get(timeout=timeout)
+    except queue.Empty:
+        return {"name": name, "params": params, "timed_out_after_seconds": timeout}
+    finally:
+        process.join(timeout=1)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+
+def run_benchmarks(
+    item_counts: List[int],
+    store_counts: List[int],
+    repeat: int,
+    benchmarks: List[str],
+    seed: int = 0,
+    case_timeout: float = DEFAULT_CASE_TIMEOUT_SECONDS,
+) -> Dict:
+    results = []
+    for name, params in benchmark_cases(item_counts, store_counts, benchmarks):
+        print(f"[bench] {name} {params}", file=sys.stderr, flush=True)
+        results.append(run_case(name, params, repeat, seed, case_timeout))
+
+    try:
+        import numpy
+
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": numpy_version,
+            "repeat": repeat,
+            "seed": seed,
+            "case_timeout_seconds": case_timeout,
+        },
+        "results": results,
+    }
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the shopping workflow.")
+    parser.add_argument(
+        "--items",
+        type=_int_list,
+        default=DEFAULT_ITEM_COUNTS,
+        help="Comma-separated item counts",
+    )
+    parser.add_argument(
+        "--stores",
+        type=_int_list,
+        default=DEFAULT_STORE_COUNTS,
+        help="Comma-separated store counts",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument(
+        "--benchmarks",
+        default="strategy,pricing,workflow",
+        help="Comma-separated subset of strategy, pricing, workflow",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--case-timeout",
+        type=float,
+        default=DEFAULT_CASE_TIMEOUT_SECONDS,
+        help="Seconds before a case is abandoned and reported as timed out",
+    )
+    parser.add_argument("-o", "--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.items,
+        args.stores,
+        args.repeat,
+        [b.strip() for b in args.benchmarks.split(",")],
+        args.seed,
+        args.case_timeout,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Memory-mapped columnar price catalog for large SKU sets.
+
+A catalog is built once from a CSV file with an ``item`` column followed by one
+price column per chain (blank cells mean the chain doesn't carry the item)::
+
+    item,Walmart,Target,Kroger
+    milk,0.95,1.05,
+    ...
+
+and written as a compact binary file that worker processes open with ``mmap``.
+Nothing is parsed up front: item names are found by binary search over a sorted
+offset table and prices are read straight out of the mapped float32 columns, so
+every Streamlit worker shares the same page-cache copy of the file.
+
+File layout (little-endian)::
+
+    header       magic, item count, chain count, section offsets
+    chains       per chain: uint16 length + UTF-8 name
+    offsets      (items + 1) x uint32 offsets into the names blob
+    names        lowercase UTF-8 item names, sorted bytewise
+    prices       chains x items float32 columns, NaN where missing
+
+Next to it, ``<catalog>.trigrams`` holds the saved fuzzy item index (see
+``item_matcher.MappedTrigramIndex``), so opening a catalog never has to decode
+every item name to build one.
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional
+
+from item_matcher import MappedTrigramIndex, TrigramIndex
+from price_catalog import BasePriceCatalog
+from price_matrix import NUMPY_AVAILABLE, PriceMatrix, np
+
+MAGIC = b"GPCAT\x00\x01\x00"
+HEADER = struct.Struct("<8sIIQQQ")
+
+
+def _align(offset: int, boundary: int = 8) -> int:
+    return (offset + boundary - 1) // boundary * boundary
+
+
+def index_path(catalog_path: str) -> str:
+    return f"{catalog_path}.trigrams"
+
+
+def build_catalog(csv_path: str, out_path: str) -> int:
+    """
+    Converts a price CSV into a columnar catalog file plus its trigram index;
+    returns the item count.
+    """
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        chains = [c.strip() for c in header[1:]]
+        rows = {}
+        for record in reader:
+            if not record or not record[0].strip():
+                continue
+            rows[record[0].strip().lower().encode("utf-8")] = [
+                float(cell) if cell.strip() else float("nan")
+                for cell in (record[1:] + [""] * len(chains))[: len(chains)]
+            ]
+
+    names = sorted(rows)
+    chain_bytes = b"".join(
+        struct.pack("<H", len(c.encode("utf-8"))) + c.encode("utf-8") for c in chains
+    )
+    offsets = [0]
+    for name in names:
+        offsets.append(offsets[-1] + len(name))
+
+    chains_offset = HEADER.size
+    offsets_offset = _align(chains_offset + len(chain_bytes), 4)
+    names_offset = offsets_offset + 4 * len(offsets)
+    prices_offset = _align(names_offset + offsets[-1])
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(
+            HEADER.pack(
+                MAGIC,
+                len(names),
+                len(chains),
+                offsets_offset,
+                names_offset,
+                prices_offset,
+            )
+        )
+        out.write(chain_bytes)
+        out.write(b"\0" * (offsets_offset - out.tell()))
+        out.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        out.write(b"".join(names))
+        out.write(b"\0" * (prices_offset - out.tell()))
+        for j in range(len(chains)):
+            out.write(struct.pack(f"<{len(names)}f", *(rows[n][j] for n in names)))
+    # Readers never see a half-written catalog
+    os.replace(tmp_path, out_path)
+    TrigramIndex([name.decode("utf-8") for name in names]).save(index_path(out_path))
+    return len(names)
+
+
+class MmapPriceCatalog(BasePriceCatalog):
+    """Read-only price catalog backed by a memory-mapped columnar file."""
+
+    def __init__(self, path: str, **fallback_options):
+        super().__init__(**fallback_options)
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        (
+            magic,
+            self.item_count,
+            chain_count,
+            offsets_offset,
+            names_offset,
+            prices_offset,
+        ) = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a columnar price catalog")
+
+        chains = []
+        position = HEADER.size
+        for _ in range(chain_count):
+            (length,) = struct.unpack_from("<H", buffer, position)
+            chains.append(bytes(buffer[position + 2 : position + 2 + length]).decode())
+            position += 2 + length
+        self.chains = tuple(chains)
+        self._chain_index = {chain: j for j, chain in enumerate(chains)}
+
+        n = self.item_count
+        self._offsets = buffer[offsets_offset : offsets_offset + 4 * (n + 1)].cast("I")
+        self._names = buffer[names_offset : names_offset + self._offsets[n]]
+        # Zero-copy views of each chain's price column
+        self._columns = [
+            buffer[prices_offset + 4 * n * j : prices_offset + 4 * n * (j + 1)].cast(
+                "f"
+            )
+            for j in range(chain_count)
+        ]
+        self._arrays = (
+            [
+                np.frombuffer(
+                    self._mmap, dtype="<f4", count=n, offset=prices_offset + 4 * n * j
+                )
+                for j in range(chain_count)
+            ]
+            if NUMPY_AVAILABLE
+            else None
+        )
+
+    def __len__(self) -> int:
+        return self.item_count
+
+    def name(self, index: int) -> str:
+        return bytes(
+            self._names[self._offsets[index] : self._offsets[index + 1]]
+        ).decode("utf-8")
+
+    def index(self, item: str) -> Optional[int]:
+        """Position of ``item`` in the sorted name index, or ``None``."""
+        key = item.strip().lower().encode("utf-8")
+        offsets, names = self._offsets, self._names
+        lo, hi = 0, self.item_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if names[offsets[mid] : offsets[mid + 1]].tobytes() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.item_count and names[offsets[lo] : offsets[lo + 1]] == key:
+            return lo
+        return None
+
+    def item_names(self) -> List[str]:
+        return [self.name(i) for i in range(self.item_count)]
+
+    def _build_matcher(self) -> TrigramIndex:
+        path = index_path(self.path)
+        if os.path.exists(path):
+            index = MappedTrigramIndex(path, self.name)
+            if len(index) == self.item_count:
+                return index
+            index.close()
+            print(f"Ignoring {path}: built for a different catalog")
+        return super()._build_matcher()
+
+    def row(self, item: str) -> Optional[Dict[str, float]]:
+        index = self.index(item)
+        if index is None:
+            return None
+        row = {}
+        for chain, column in zip(self.chains, self._columns):
+            value = column[index]
+            if value == value:  # NaN marks a chain without this item
+                row[chain] = round(value, 2)
+        return row
+
+    def price_matrix(self, items: List[str], stores: List[Dict]) -> PriceMatrix:
+        if not NUMPY_AVAILABLE:
+            return super().price_matrix(items, stores)
+
+        items = sorted(items)
+        by_name = {
+            name: (chain, fallback) for chain, name, fallback in self._targets(stores)
+        }
+        store_names = sorted(by_name)
+        resolved = self.resolve(items)
+        indices = np.array(
+            [
+                -1 if resolved[item] is None else self.index(resolved[item])
+                for item in items
+            ],
+            dtype=np.int64,
+        )
+        found = indices >= 0
+
+        prices = np.empty((len(items), len(store_names)), dtype=np.float64)
+        for j, store_name in enumerate(store_names):
+            chain, fallback = by_name[store_name]
+            prices[:, j] = fallback
+            chain_index = self._chain_index.get(chain)
+            if chain_index is None:
+                continue
+            # Only the pages holding the requested rows are touched
+            values = np.round(
+                self._arrays[chain_index][indices[found]].astype(np.float64), 2
+            )
+            prices[found, j] = np.where(np.isnan(values), fallback, values)
+        return PriceMatrix.from_rows(items, store_names, prices)
+
+    def close(self):
+        if isinstance(self._matcher, MappedTrigramIndex):
+            self._matcher.close()
+        self._matcher = None
+        self._columns = self._arrays = self._offsets = self._names = None
+        self._mmap.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build a memory-mapped price catalog from a CSV file."
+    )
+    parser.add_argument("csv_path")
+    parser.add_argument("out_path")
+    args = parser.parse_args()
+    count = build_catalog(args.csv_path, args.out_path)
+    print(f"Wrote {count} items to {args.out_path}")
@@ -0,0 +1,140 @@
+"""
+Small geographic helpers shared by the caches and the store finder.
+
+``haversine_meters_many`` uses NumPy when installed; otherwise it loops in Python.
+"""
+
+import math
+from typing import List, Sequence
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 6) -> str:
+    """Encodes a coordinate as a geohash string of ``precision`` characters."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+EARTH_RADIUS_METERS = 6371008.8
+
+
+def haversine_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two coordinates in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_meters_many(
+    lat: float, lng: float, lats: Sequence[float], lngs: Sequence[float]
+) -> List[float]:
+    """Great-circle distances in meters from one point to many, in input order."""
+    if not NUMPY_AVAILABLE:
+        return [haversine_meters(lat, lng, a, b) for a, b in zip(lats, lngs)]
+    phi1 = math.radians(lat)
+    phi2 = np.radians(np.asarray(lats, dtype=float))
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(np.asarray(lngs, dtype=float) - lng)
+    a = (
+        np.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    )
+    distances = 2 * EARTH_RADIUS_METERS * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+    return distances.tolist()
+
+
+# Roads are longer than the straight line between two points
+ROAD_FACTOR = 1.3
+# Average driving speed, about 30 mph
+SPEED_METERS_PER_SECOND = 13.4
+
+
+def estimate_drive(lat1: float, lng1: float, lat2: float, lng2: float):
+    """Rough driving ``(meters, seconds)`` when no routing data is available."""
+    meters = haversine_meters(lat1, lng1, lat2, lng2) * ROAD_FACTOR
+    return meters, meters / SPEED_METERS_PER_SECOND
+
+
+def geohash_bounds(geohash: str):
+    """The ``(lat_min, lat_max, lng_min, lng_max)`` box a geohash cell covers."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        bits = _GEOHASH_BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (bits >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+
+def geohash_cells_in_radius(
+    lat: float, lng: float, radius_meters: float, precision: int
+) -> List[str]:
+    """Every geohash cell of ``precision`` that overlaps the circle around a point."""
+    lng_bits = (5 * precision + 1) // 2
+    cell_height = 180.0 / 2 ** (5 * precision - lng_bits)
+    cell_width = 360.0 / 2**lng_bits
+    lat_span = math.degrees(radius_meters / EARTH_RADIUS_METERS)
+    lng_span = lat_span / max(0.01, math.cos(math.radians(lat)))
+
+    cells = []
+    cell_lat = max(-90.0, lat - lat_span)
+    cell_lat = -90 + (math.floor((cell_lat + 90) / cell_height) + 0.5) * cell_height
+    while cell_lat - cell_height / 2 <= min(90.0, lat + lat_span):
+        cell_lng = lng - lng_span
+        cell_lng = -180 + (math.floor((cell_lng + 180) / cell_width) + 0.5) * cell_width
+        while cell_lng - cell_width / 2 <= lng + lng_span:
+            # Closest point of the cell to the centre decides whether it overlaps
+            nearest_lat = min(
+                max(lat, cell_lat - cell_height / 2), cell_lat + cell_height / 2
+            )
+            nearest_lng = min(
+                max(lng, cell_lng - cell_width / 2), cell_lng + cell_width / 2
+            )
+            if haversine_meters(lat, lng, nearest_lat, nearest_lng) <= radius_meters:
+                cells.append(geohash_encode(cell_lat, cell_lng, precision))
+            cell_lng += cell_width
+        cell_lat += cell_height
+    return cells
@@ -0,0 +1,144 @@
+"""
+Persistent geocode cache shared by every Streamlit worker process.
+
+Results are stored in a SQLite database in WAL mode, so several processes can
+read concurrently while one writes. Lookups are keyed by a normalized form of
+the address and also memoized in-process, so repeat geocodes never leave the
+process. ``ZERO_RESULTS`` answers are cached as negative entries with a shorter TTL.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+GEOCODE_TTL_SECONDS = 30 * 24 * 3600
+NEGATIVE_TTL_SECONDS = 24 * 3600
+MEMORY_CACHE_MAX_ENTRIES = 4096
+
+
+def normalize_address(address: str) -> str:
+    """Folds case, unicode forms, whitespace and comma spacing into one key."""
+    address = unicodedata.normalize("NFKC", address).lower()
+    address = re.sub(r"\s*,\s*", ", ", address)
+    address = re.sub(r"\s+", " ", address)
+    return address.strip(" ,.;")
+
+
+class GeocodeCache:
+    """TTL cache of geocoding results backed by SQLite."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = GEOCODE_TTL_SECONDS,
+        negative_ttl_seconds: float = NEGATIVE_TTL_SECONDS,
+    ):
+        self.path = path or os.path.join(
+            os.getenv("GROCERY_CACHE_DIR", ".cache"), "geocode.sqlite"
+        )
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._local = threading.local()
+        self._memory = {}
+        self._memory_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocodes ("
+                "address TEXT PRIMARY KEY, payload TEXT, negative INTEGER, expires_at REAL)"
+            )
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def get(self, address: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached entry for ``address`` or ``None`` on a miss.
+
+        Hits are ``{"negative": bool, "result": dict}``; negative entries have an
+        empty ``result``.
+        """
+        key = normalize_address(address)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        row = (
+            self._connection()
+            .execute(
+                "SELECT payload, negative, expires_at FROM geocodes WHERE address = ?",
+                (key,),
+            )
+            .fetchone()
+        )
+        if row is None or row[2] <= now:
+            return None
+
+        cached = {"negative": bool(row[1]), "result": json.loads(row[0])}
+        self._remember(key, row[2], cached)
+        return cached
+
+    def put(self, address: str, result: Optional[Dict[str, Any]], negative=False):
+        """Stores a geocoding result, or a negative entry when ``negative`` is set."""
+        key = normalize_address(address)
+        ttl = self.negative_ttl_seconds if negative else self.ttl_seconds
+        expires_at = time.time() + ttl
+        result = {} if negative else result
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?)",
+            (key, json.dumps(result), int(negative), expires_at),
+        )
+        conn.commit()
+        self._remember(key, expires_at, {"negative": negative, "result": result})
+
+    def _remember(self, key, expires_at, cached):
+        with self._memory_lock:
+            if len(self._memory) >= MEMORY_CACHE_MAX_ENTRIES:
+                self._memory.clear()
+            self._memory[key] = (expires_at, cached)
+
+    def purge_expired(self) -> int:
+        conn = self._connection()
+        deleted = conn.execute(
+            "DELETE FROM geocodes WHERE expires_at <= ?", (time.time(),)
+        ).rowcount
+        conn.commit()
+        return deleted
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_geocode_cache() -> GeocodeCache:
+    """Returns the process-wide cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GeocodeCache()
+    return _cache
+
+
+def set_geocode_cache(cache: Optional[GeocodeCache]):
+    """Replaces the process-wide cache (``None`` resets to a fresh default)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
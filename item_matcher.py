@@ -0,0 +1,303 @@
+"""
+Fuzzy matching of free-text shopping-list items against catalog item names.
+
+Names are indexed by their character trigrams and scored by the Dice coefficient
+of their trigram sets. With NumPy, a query sums its trigrams' posting arrays into
+per-name overlap counts in one vectorized pass; without it, only names sharing
+one of the query's rarest trigrams (enough of them that any name reaching the
+threshold must share at least one) are scored. Either way lookups stay fast with
+100k+ names, where scanning every name would not.
+
+An index can be saved to a file (``TrigramIndex.save``) and memory-mapped back
+(``MappedTrigramIndex``), so large catalogs don't rebuild it in every process.
+"""
+
+import math
+import mmap
+import os
+import re
+import struct
+from collections import defaultdict
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+MATCH_THRESHOLD = 0.5
+
+# Size, packaging and grade words that don't identify the product itself
+QUALIFIER_WORDS = frozenset(
+    [
+        "a",
+        "of",
+        "the",
+        "large",
+        "medium",
+        "small",
+        "organic",
+        "fresh",
+        "pack",
+        "dozen",
+        "ct",
+        "oz",
+        "lb",
+        "lbs",
+        "kg",
+        "g",
+        "gallon",
+    ]
+)
+
+
+# Bare quantities such as "2", "12oz" or "1.5lb" ("2%" loses its "%" first)
+_QUANTITY = re.compile(r"^\d+(?:[a-z]{1,6})?$")
+
+
+def normalize_item(text: str) -> str:
+    """Lowercases and drops punctuation, bare quantities and qualifier words."""
+    words = re.sub(r"[^a-z0-9\s]", " ", text.lower()).split()
+    kept = [w for w in words if w not in QUALIFIER_WORDS and not _QUANTITY.match(w)]
+    return " ".join(kept or words)
+
+
+def trigrams(text: str) -> frozenset:
+    """Trigrams of each word, padded so word starts and ends count too."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def _gram_key(gram: str) -> int:
+    """Packs a trigram's three code points (21 bits each) into one integer."""
+    return (ord(gram[0]) << 42) | (ord(gram[1]) << 21) | ord(gram[2])
+
+
+class TrigramIndex:
+    """Inverted trigram index over a fixed list of item names."""
+
+    def __init__(self, names: Sequence[str], threshold: float = MATCH_THRESHOLD):
+        self.names = list(names)
+        self.threshold = threshold
+        postings = defaultdict(list)
+        self._sizes = []
+        for i, name in enumerate(self.names):
+            grams = trigrams(normalize_item(name))
+            self._sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(i)
+        if NUMPY_AVAILABLE:
+            self._postings = {
+                gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()
+            }
+            self._size_array = np.array(self._sizes, dtype=np.float64)
+        else:
+            self._postings = dict(postings)
+        self._gram_cache = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def name(self, i: int) -> str:
+        return self.names[i]
+
+    def _posting(self, gram: str):
+        """Ids of the names containing ``gram``, or ``None``."""
+        return self._postings.get(gram)
+
+    def _name_grams(self, i: int) -> frozenset:
+        grams = self._gram_cache.get(i)
+        if grams is None:
+            grams = self._gram_cache[i] = trigrams(normalize_item(self.name(i)))
+        return grams
+
+    def match(self, query: str) -> Optional[Tuple[str, float]]:
+        """Best ``(name, score)`` for ``query``, or ``None`` below the threshold."""
+        normalized = normalize_item(query)
+        query_grams = trigrams(normalized)
+        if not query_grams:
+            return None
+        postings = {}
+        for gram in query_grams:
+            ids = self._posting(gram)
+            if ids is not None and len(ids):
+                postings[gram] = ids
+        if not postings:
+            return None
+        if NUMPY_AVAILABLE:
+            best = self._best_vectorized(query_grams, postings, normalized)
+        else:
+            best = self._best_filtered(query_grams, postings, normalized)
+        if best is None:
+            return None
+        return self.name(best[0]), best[1]
+
+    def _tie_break(self, ids, query_size: int, normalized: str) -> int:
+        # A name equal to the query once normalized wins outright (it scores 1.0,
+        # like any name with the same trigrams); then names closer in length to
+        # the query, then alphabetical
+        exact = [i for i in ids if normalize_item(self.name(i)) == normalized]
+        if exact:
+            return min(exact)
+        return min(ids, key=lambda i: (abs(self._sizes[i] - query_size), self.name(i)))
+
+    def _best_vectorized(
+        self, query_grams, postings, normalized
+    ) -> Optional[Tuple[int, float]]:
+        """Counts overlaps for every name at once from the query's postings."""
+        overlaps = np.bincount(
+            np.concatenate(list(postings.values())), minlength=len(self)
+        )
+        scores = 2 * overlaps / (len(query_grams) + self._size_array)
+        top = float(scores.max())
+        if top < self.threshold:
+            return None
+        tied = np.flatnonzero(scores >= top - 1e-12).tolist()
+        return self._tie_break(tied, len(query_grams), normalized), top
+
+    def _best_filtered(
+        self, query_grams, postings, normalized
+    ) -> Optional[Tuple[int, float]]:
+        """Scores only names sharing one of the query's rarest trigrams."""
+        # Dice >= t needs an overlap of at least t*|q|/(2-t), so a match must
+        # share one of the |q| - overlap + 1 rarest query trigrams
+        t = self.threshold
+        min_overlap = max(1, math.ceil(t * len(query_grams) / (2 - t)))
+        rare = sorted(postings, key=lambda g: len(postings[g]))[
+            : len(query_grams) - min_overlap + 1
+        ]
+        candidates = set()
+        for gram in rare:
+            candidates.update(int(i) for i in postings[gram])
+
+        scores = {}
+        for i in candidates:
+            overlap = len(query_grams & self._name_grams(i))
+            scores[i] = 2 * overlap / (len(query_grams) + self._sizes[i])
+        top = max(scores.values(), default=0.0)
+        if top < t:
+            return None
+        tied = [i for i, score in scores.items() if score >= top - 1e-12]
+        return self._tie_break(tied, len(query_grams), normalized), top
+
+    def match_many(self, queries: Sequence[str]) -> Dict[str, Optional[str]]:
+        """Resolves a whole list at once; repeated queries are only matched once."""
+        resolved = {}
+        for query in queries:
+            if query not in resolved:
+                match = self.match(query)
+                resolved[query] = match[0] if match else None
+        return resolved
+
+    def save(self, path: str):
+        """Writes the index in the layout ``MappedTrigramIndex`` reads."""
+        grams = sorted(self._postings, key=_gram_key)
+        offsets = [0]
+        for gram in grams:
+            offsets.append(offsets[-1] + len(self._postings[gram]))
+
+        keys_offset = INDEX_HEADER.size
+        offsets_offset = keys_offset + 8 * len(grams)
+        ids_offset = offsets_offset + 4 * len(offsets)
+        sizes_offset = ids_offset + 4 * offsets[-1]
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(
+                INDEX_HEADER.pack(
+                    INDEX_MAGIC,
+                    len(self),
+                    len(grams),
+                    offsets_offset,
+                    ids_offset,
+                    sizes_offset,
+                )
+            )
+            out.write(struct.pack(f"<{len(grams)}Q", *map(_gram_key, grams)))
+            out.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            for gram in grams:
+                ids = self._postings[gram]
+                out.write(struct.pack(f"<{len(ids)}i", *(int(i) for i in ids)))
+            out.write(struct.pack(f"<{len(self)}H", *self._sizes))
+        # Readers never see a half-written index
+        os.replace(tmp_path, path)
+
+
+INDEX_MAGIC = b"GPTRI\x00\x01\x00"
+INDEX_HEADER = struct.Struct("<8sIIQQQ")
+
+
+class MappedTrigramIndex(TrigramIndex):
+    """
+    A saved ``TrigramIndex`` read through ``mmap``: posting lists are sliced out
+    of the file on demand and only candidate names are ever decoded, via
+    ``name(i)`` (e.g. ``MmapPriceCatalog.name``).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        name: Callable[[int], str],
+        threshold: float = MATCH_THRESHOLD,
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.name = name
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        (
+            magic,
+            self.count,
+            gram_count,
+            offsets_offset,
+            ids_offset,
+            sizes_offset,
+        ) = INDEX_HEADER.unpack_from(buffer)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a trigram index")
+
+        keys_offset = INDEX_HEADER.size
+        self._keys = buffer[keys_offset:offsets_offset].cast("Q")
+        self._offsets = buffer[offsets_offset:ids_offset].cast("I")
+        self._ids = buffer[ids_offset:sizes_offset].cast("i")
+        self._sizes = buffer[sizes_offset : sizes_offset + 2 * self.count].cast("H")
+        if NUMPY_AVAILABLE:
+            self._id_array = np.frombuffer(
+                self._mmap, dtype="<i4", count=len(self._ids), offset=ids_offset
+            )
+            self._size_array = np.frombuffer(
+                self._mmap, dtype="<u2", count=self.count, offset=sizes_offset
+            ).astype(np.float64)
+        self._gram_cache = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _posting(self, gram: str):
+        key = _gram_key(gram)
+        keys = self._keys
+        lo, hi = 0, len(keys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if keys[mid] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(keys) or keys[lo] != key:
+            return None
+        start, end = self._offsets[lo], self._offsets[lo + 1]
+        if NUMPY_AVAILABLE:
+            return self._id_array[start:end]
+        return self._ids[start:end]
+
+    def close(self):
+        self._keys = self._offsets = self._ids = self._sizes = None
+        self._id_array = self._size_array = None
+        self._mmap.close()
@@ -0,0 +1,183 @@
+"""
+Content-addressed cache of LLM agent responses.
+
+A response is keyed by the SHA-256 of the agent's name, model and instructions
+together with the request's prompt and its canonicalized context (dict keys
+sorted, sets ordered), so the same analysis asked for by different users is only
+sent to the model once. Entries live in a size-bounded, TTL-limited in-process
+LRU; with ``GROCERY_LLM_CACHE_DISK=1`` they are also written to a SQLite file in
+``GROCERY_CACHE_DIR`` that every worker process shares. ``GROCERY_LLM_CACHE=off``
+disables the cache.
+
+Responses are stored as JSON text and decoded on every hit, so callers can't
+mutate a cached answer.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+LLM_CACHE_TTL_SECONDS = 6 * 3600
+LLM_CACHE_MAX_ENTRIES = 512
+
+
+def _canonical_default(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    if hasattr(value, "__dict__"):
+        return vars(value)
+    return str(value)
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(
+        value,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=_canonical_default,
+    )
+
+
+def request_key(name: str, model: str, instructions: Optional[str], request) -> str:
+    """Stable hash identifying one agent's answer to one request."""
+    prompt = getattr(request, "content", request)
+    context = getattr(request, "context", None)
+    payload = canonical_json([name, model, instructions, prompt, context])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LlmResponseCache:
+    """TTL + LRU cache of encoded responses, optionally backed by SQLite."""
+
+    def __init__(
+        self,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, payload TEXT, expires_at REAL)"
+            )
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the decoded response stored under ``key``, or ``None``."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(entry[1])
+                del self._entries[key]
+
+        if self.path:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT payload, expires_at FROM llm_responses WHERE key = ?",
+                    (key,),
+                )
+                .fetchone()
+            )
+            if row is not None and row[1] > now:
+                self._remember(key, row[1], row[0])
+                with self._lock:
+                    self.hits += 1
+                return json.loads(row[0])
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, response: Any) -> bool:
+        """Stores a JSON-serializable response; returns ``False`` if it isn't one."""
+        try:
+            payload = json.dumps(response, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return False
+        expires_at = time.time() + self.ttl_seconds
+        if self.path:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?)",
+                (key, payload, expires_at),
+            )
+            conn.commit()
+        self._remember(key, expires_at, payload)
+        return True
+
+    def _remember(self, key, expires_at, payload):
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            conn = self._connection()
+            conn.execute("DELETE FROM llm_responses")
+            conn.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LlmResponseCache]:
+    """Returns the process-wide cache, or ``None`` when it is disabled."""
+    global _cache
+    if os.getenv("GROCERY_LLM_CACHE", "on").lower() in ("off", "0", "false"):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                disk = os.getenv("GROCERY_LLM_CACHE_DISK", "").lower() in (
+                    "1",
+                    "true",
+                    "yes",
+                )
+                cache_dir = os.getenv("GROCERY_CACHE_DIR", ".cache")
+                _cache = LlmResponseCache(
+                    path=os.path.join(cache_dir, "llm.sqlite") if disk else None
+                )
+    return _cache
+
+
+def set_llm_cache(cache: Optional[LlmResponseCache]):
+    """Replaces the process-wide cache (``None`` resets to a fresh default)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
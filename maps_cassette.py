@@ -0,0 +1,151 @@
+"""
+Record/replay cassettes for Google Maps responses.
+
+A cassette is a gzip file of JSON lines, one recorded response per line, keyed by
+the endpoint and its canonicalized request parameters (the API key is never part
+of the key or the file). ``MapsClient`` consults the cassette in one of three
+modes:
+
+``record``    every call goes to the API; successful answers are appended
+``replay``    calls are answered from the cassette only; a miss raises
+              ``CassetteMiss`` and nothing touches the network
+``fallback``  calls go to the API and successes are recorded, but network
+              errors and throttled/failed answers are served from the cassette
+              when it has a recording
+
+Enable it with ``GOOGLE_MAPS_CASSETTE=<path>`` and
+``GOOGLE_MAPS_CASSETTE_MODE=record|replay|fallback``.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from telemetry import count
+
+CASSETTE_MODES = ("record", "replay", "fallback")
+
+# Answers worth keeping; anything else would just replay a transient failure
+RECORDABLE_STATUSES = {"OK", "ZERO_RESULTS"}
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when no recording matches a request."""
+
+
+def canonical_params(params: Dict[str, Any]) -> Dict[str, str]:
+    """Request parameters as sorted strings, without the API key."""
+    return {k: str(v) for k, v in sorted(params.items()) if k != "key"}
+
+
+def request_key(endpoint: str, params: Dict[str, Any]) -> str:
+    canonical = json.dumps(
+        [endpoint, canonical_params(params)], sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _encode(response: Dict) -> str:
+    return json.dumps(response, sort_keys=True, separators=(",", ":"))
+
+
+class MapsCassette:
+    """An indexed, append-only cassette file."""
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Cassette mode must be one of {CASSETTE_MODES}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._index = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            if self.mode == "replay":
+                raise FileNotFoundError(f"Cassette {self.path} does not exist")
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    # Later recordings of the same request win
+                    self._index[entry["request_key"]] = _encode(entry["response"])
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def lookup(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict]:
+        encoded = self._index.get(request_key(endpoint, params))
+        # Decoded per call so callers can't mutate the recording
+        return None if encoded is None else json.loads(encoded)
+
+    def record(self, endpoint: str, params: Dict[str, Any], response: Dict):
+        key = request_key(endpoint, params)
+        encoded = _encode(response)
+        line = json.dumps(
+            {
+                "request_key": key,
+                "endpoint": endpoint,
+                "params": canonical_params(params),
+                "recorded_at": time.time(),
+                "response": response,
+            },
+            separators=(",", ":"),
+        )
+        with self._lock:
+            if self._index.get(key) == encoded:
+                return
+            self._index[key] = encoded
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Each append is its own gzip member; gzip readers concatenate them
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def call(
+        self, endpoint: str, params: Dict[str, Any], fetch: Callable[[], Dict]
+    ) -> Dict:
+        """Answers a request according to the cassette mode; ``fetch`` hits the API."""
+        if self.mode == "replay":
+            recorded = self.lookup(endpoint, params)
+            if recorded is None:
+                count("maps.cassette.misses")
+                raise CassetteMiss(
+                    f"No recording for {endpoint} {canonical_params(params)}"
+                )
+            count("maps.cassette.hits")
+            return recorded
+
+        try:
+            response = fetch()
+        except Exception:
+            if self.mode == "fallback":
+                recorded = self.lookup(endpoint, params)
+                if recorded is not None:
+                    count("maps.cassette.fallbacks")
+                    return recorded
+            raise
+
+        if response.get("status") in RECORDABLE_STATUSES:
+            self.record(endpoint, params, response)
+        elif self.mode == "fallback":
+            recorded = self.lookup(endpoint, params)
+            if recorded is not None:
+                count("maps.cassette.fallbacks")
+                return recorded
+        return response
+
+
+def cassette_from_env() -> Optional[MapsCassette]:
+    """The cassette configured by ``GOOGLE_MAPS_CASSETTE``, if any."""
+    path = os.getenv("GOOGLE_MAPS_CASSETTE")
+    if not path:
+        return None
+    return MapsCassette(path, os.getenv("GOOGLE_MAPS_CASSETTE_MODE", "replay"))
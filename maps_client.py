@@ -0,0 +1,206 @@
+"""
+Shared HTTP client for the Google Maps web services.
+
+Every Maps call (geocoding, Places, Distance Matrix, Directions) goes through a
+single pooled ``requests.Session`` so TLS connections are kept alive and reused
+across requests and worker threads. Transient failures (HTTP 5xx/429 and the
+``OVER_QUERY_LIMIT``/``UNKNOWN_ERROR`` API statuses) are retried with jittered
+exponential backoff. Each call is timed as a ``maps.<endpoint>`` span, with call,
+retry and byte counters.
+
+Before each request goes out it is charged to the current workflow's call budget
+and takes a token from the endpoint's rate limiter (see ``rate_limit``); either
+can refuse it with ``QuotaExceeded``.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+from maps_cassette import cassette_from_env
+from rate_limit import current_budget, get_rate_limiter
+from telemetry import count, span
+
+MAPS_API_BASE_URL = "https://maps.googleapis.com/maps/api"
+
+# Seconds to wait for each endpoint; geocoding is user-facing and historically
+# used a longer timeout than the per-store lookups.
+ENDPOINT_TIMEOUTS = {
+    "geocode": 15,
+    "place/textsearch": 10,
+    "place/nearbysearch": 10,
+    "distancematrix": 10,
+    "directions": 10,
+}
+DEFAULT_TIMEOUT = 10
+
+RETRYABLE_API_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+RETRYABLE_HTTP_CODES = {429, 500, 502, 503, 504}
+
+# Status reported for an HTTP error response (e.g. a 5xx left after the retries)
+HTTP_ERROR_STATUS = "HTTP_ERROR"
+
+
+class MapsClient:
+    """Pooled, retrying client for the Google Maps JSON web services."""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        pool_connections: int = 4,
+        pool_maxsize: int = 32,
+        max_retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        timeouts: Optional[Dict[str, float]] = None,
+        gzip: bool = True,
+        session=None,
+        cassette=None,
+        rate_limiter=None,
+    ):
+        self.base_url = (
+            base_url or os.getenv("GOOGLE_MAPS_BASE_URL") or MAPS_API_BASE_URL
+        ).rstrip("/")
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeouts = dict(ENDPOINT_TIMEOUTS, **(timeouts or {}))
+        self.gzip = gzip
+        self._session = session
+        self._session_lock = threading.Lock()
+        # Record/replay layer (see maps_cassette); configured from the environment
+        # unless one is passed in
+        self.cassette = cassette if cassette is not None else cassette_from_env()
+        self.rate_limiter = (
+            rate_limiter if rate_limiter is not None else get_rate_limiter()
+        )
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self):
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        # Retries are handled in get_json so API-level statuses are covered too
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=0,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Accept-Encoding"] = "gzip" if self.gzip else "identity"
+        return session
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": spreads retries from concurrent workers apart
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def get_json(
+        self, endpoint: str, params: Dict[str, Any], timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Calls ``<base_url>/<endpoint>/json`` and returns the decoded response.
+
+        The last response is returned as-is once retries are exhausted, so callers
+        keep inspecting ``status`` exactly as they would for a single request; an
+        HTTP error response comes back as status ``HTTP_ERROR`` without decoding
+        its body. Network errors are re-raised after the final attempt.
+        """
+        with span(f"maps.{endpoint}"):
+            count(f"maps.{endpoint}.calls")
+            if self.cassette is not None:
+                return self.cassette.call(
+                    endpoint, params, lambda: self._get_json(endpoint, params, timeout)
+                )
+            return self._get_json(endpoint, params, timeout)
+
+    def _get_json(self, endpoint, params, timeout):
+        url = f"{self.base_url}/{endpoint}/json"
+        timeout = timeout or self.timeouts.get(endpoint, DEFAULT_TIMEOUT)
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                count(f"maps.{endpoint}.retries")
+            last_attempt = attempt == self.max_retries
+            # Retries spend quota too, so they are charged like first attempts.
+            # A spent budget is caught before taking a (possibly shared) rate
+            # limit token, but charged only once the limiter lets the call through
+            budget = current_budget()
+            if budget is not None:
+                budget.check(endpoint)
+            self.rate_limiter.acquire(endpoint)
+            if budget is not None:
+                budget.spend(endpoint)
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if last_attempt:
+                    count(f"maps.{endpoint}.errors")
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            count(f"maps.{endpoint}.bytes", _response_bytes(response))
+            if response.status_code in RETRYABLE_HTTP_CODES and not last_attempt:
+                time.sleep(self._backoff(attempt))
+                continue
+            if response.status_code >= 400:
+                # Error pages are often HTML, so they aren't decoded
+                count(f"maps.{endpoint}.errors")
+                return {
+                    "status": HTTP_ERROR_STATUS,
+                    "error_message": f"HTTP {response.status_code} from {endpoint}",
+                }
+
+            data = response.json()
+            if data.get("status") in RETRYABLE_API_STATUSES and not last_attempt:
+                time.sleep(self._backoff(attempt))
+                continue
+            return data
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+def _response_bytes(response) -> int:
+    # Content-Length is the (possibly gzipped) size on the wire
+    length = getattr(response, "headers", {}).get("Content-Length")
+    if length and length.isdigit():
+        return int(length)
+    return len(getattr(response, "content", b"") or b"")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_maps_client() -> MapsClient:
+    """Returns the process-wide client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MapsClient()
+    return _client
+
+
+def set_maps_client(client: Optional[MapsClient]):
+    """Replaces the process-wide client (``None`` resets to a fresh default)."""
+    global _client
+    with _client_lock:
+        _client = client
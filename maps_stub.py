@@ -0,0 +1,527 @@
+"""
+Deterministic stand-in for the Google Maps web services.
+
+``SyntheticMaps`` answers the geocode, Places text and nearby search, Distance
+Matrix and Directions endpoints from a synthetic world: addresses hash to fixed
+coordinates, each chain has a handful of stores in every cell of a fixed grid
+(so a store keeps its place ID and position whichever search finds it), and
+driving distances are great-circle distances scaled by a road
+factor. Nearby searches return every ``nearby_chains`` store plus a few
+independent grocers, 20 per page behind ``next_page_token``s like the real API. Responses
+have the same shape as the real API, so the store finder and strategist run
+unchanged against it.
+
+``SyntheticSession`` plugs it into ``MapsClient`` in place of ``requests``::
+
+    set_maps_client(MapsClient(session=SyntheticSession(SyntheticMaps())))
+
+For load tests through the real HTTP stack, run it as a local server with
+configurable latency, error and quota behaviour, and point the app at it::
+
+    python maps_stub.py --port 8765 --latency 0.05 --error-rate 0.01
+    GOOGLE_MAPS_BASE_URL=http://127.0.0.1:8765/maps/api streamlit run app.py
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from geo_utils import ROAD_FACTOR, SPEED_METERS_PER_SECOND, haversine_meters
+from route_solver import solve_round_trip
+
+ENDPOINTS = (
+    "geocode",
+    "place/textsearch",
+    "place/nearbysearch",
+    "distancematrix",
+    "directions",
+)
+
+# Chains a nearby search finds, and independent stores no chain should claim
+NEARBY_CHAINS = (
+    "Walmart",
+    "Target",
+    "Kroger",
+    "Costco",
+    "Whole Foods",
+    "Safeway",
+    "Meijer",
+    "Aldi",
+    "Publix",
+    "Trader Joe's",
+)
+INDEPENDENT_GROCERS = ("Corner Market", "Fresh Fields Grocery", "Family Foods")
+NEARBY_PAGE_SIZE = 20
+NEARBY_MAX_RESULTS = 60
+
+
+def endpoint_from_path(path: str) -> Optional[str]:
+    """Maps a URL path such as ``/maps/api/geocode/json`` to its endpoint name."""
+    path = path.split("?", 1)[0].rstrip("/")
+    for endpoint in ENDPOINTS:
+        if path.endswith(f"/{endpoint}/json"):
+            return endpoint
+    return None
+
+
+def _parse_point(text: str) -> Tuple[float, float]:
+    lat, lng = text.split(",")
+    return float(lat), float(lng)
+
+
+def _parse_points(text: str) -> List[Tuple[float, float]]:
+    return [_parse_point(p) for p in text.split("|") if p]
+
+
+class SyntheticMaps:
+    """Answers Maps API requests from a seeded synthetic world."""
+
+    def __init__(
+        self,
+        seed: int = 0,
+        stores_per_chain: int = 6,
+        spread_miles: float = 12.0,
+        road_factor: float = ROAD_FACTOR,
+        speed_mps: float = SPEED_METERS_PER_SECOND,
+        center: Optional[Tuple[float, float]] = None,
+        city_radius_miles: float = 15.0,
+        nearby_chains: Tuple[str, ...] = NEARBY_CHAINS,
+    ):
+        """
+        With ``center``, every address geocodes into a synthetic city of
+        ``city_radius_miles`` around it; otherwise addresses spread across the
+        continental US.
+        """
+        self.seed = seed
+        self.center = center
+        self.city_radius_miles = city_radius_miles
+        self.stores_per_chain = stores_per_chain
+        self.spread_miles = spread_miles
+        self.road_factor = road_factor
+        self.speed_mps = speed_mps
+        self.nearby_chains = nearby_chains
+
+    def _rng(self, *parts) -> random.Random:
+        digest = hashlib.sha256(
+            ":".join(str(p) for p in (self.seed,) + parts).encode("utf-8")
+        ).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def handle(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the JSON payload the real API would for ``endpoint``."""
+        handler = {
+            "geocode": self.geocode,
+            "place/textsearch": self.text_search,
+            "place/nearbysearch": self.nearby_search,
+            "distancematrix": self.distance_matrix,
+            "directions": self.directions,
+        }.get(endpoint)
+        if handler is None:
+            return {"status": "INVALID_REQUEST", "error_message": endpoint}
+        try:
+            return handler(params)
+        except (KeyError, ValueError) as e:
+            return {"status": "INVALID_REQUEST", "error_message": str(e)}
+
+    def geocode(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        address = " ".join(str(params["address"]).split())
+        if not address or "nowhere" in address.lower():
+            return {"status": "ZERO_RESULTS", "results": []}
+        rng = self._rng("geocode", address.lower())
+        if self.center:
+            radius_deg = self.city_radius_miles / 69.0
+            lat = self.center[0] + rng.uniform(-radius_deg, radius_deg)
+            lng = self.center[1] + rng.uniform(-radius_deg, radius_deg)
+        else:
+            lat, lng = rng.uniform(28.0, 47.0), rng.uniform(-122.0, -72.0)
+        return {
+            "status": "OK",
+            "results": [
+                {
+                    "formatted_address": f"{address}, USA",
+                    "geometry": {"location": {"lat": lat, "lng": lng}},
+                    "place_id": f"geo-{rng.getrandbits(48):012x}",
+                }
+            ],
+        }
+
+    def chain_stores(
+        self, chain: str, lat: float, lng: float, radius_meters: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        The chain's stores within ``radius_meters`` (default ``spread_miles``) of a
+        location, nearest first.
+
+        The world is a grid of ``2 * spread_miles`` cells, each seeded by its
+        indices and holding ``stores_per_chain`` stores per chain, so every search
+        sees the same stores at the same coordinates.
+        """
+        if radius_meters is None:
+            radius_meters = self.spread_miles * 1609.34
+        cell_deg = 2 * self.spread_miles / 69.0
+        lat_reach = radius_meters / 111000.0
+        lng_reach = lat_reach / max(0.01, math.cos(math.radians(lat)))
+        found = []
+        for i in range(
+            math.floor((lat - lat_reach) / cell_deg),
+            math.floor((lat + lat_reach) / cell_deg) + 1,
+        ):
+            for j in range(
+                math.floor((lng - lng_reach) / cell_deg),
+                math.floor((lng + lng_reach) / cell_deg) + 1,
+            ):
+                for place in self._cell_stores(chain, i, j, cell_deg):
+                    meters = haversine_meters(lat, lng, *self._location(place))
+                    if meters <= radius_meters:
+                        found.append((meters, place["place_id"], place))
+        found.sort(key=lambda entry: entry[:2])
+        return [place for _, _, place in found]
+
+    def _cell_stores(self, chain: str, i: int, j: int, cell_deg: float) -> List[Dict]:
+        rng = self._rng("stores", chain.lower(), i, j)
+        slug = chain.lower().replace(" ", "-")
+        # Store numbers are unique across any 100 x 100 block of cells
+        number = ((i % 100) * 100 + j % 100) * 10
+        stores = []
+        for n in range(self.stores_per_chain + 1):
+            store_lat = (i + rng.random()) * cell_deg
+            store_lng = (j + rng.random()) * cell_deg
+            # One secondary location per chain exercises the service-word filter
+            suffix = (
+                "Gas Station" if n == self.stores_per_chain else f"#{number + n + 1}"
+            )
+            stores.append(
+                {
+                    "name": f"{chain} {suffix}",
+                    "formatted_address": f"{100 + n} Synthetic Ave, {chain} Town",
+                    "geometry": {"location": {"lat": store_lat, "lng": store_lng}},
+                    "place_id": f"{slug}-{i}-{j}-{n}",
+                    "rating": round(rng.uniform(3.5, 4.9), 1),
+                }
+            )
+        return stores
+
+    def text_search(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chain = params["query"].split(" near ")[0]
+        lat, lng = _parse_point(params["location"])
+        radius = float(params.get("radius", 50000))
+        results = self.chain_stores(chain, lat, lng, radius)
+        return {"status": "OK" if results else "ZERO_RESULTS", "results": results}
+
+    def nearby_search(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if "pagetoken" in params:
+            try:
+                token = json.loads(base64.urlsafe_b64decode(params["pagetoken"]))
+            except ValueError:
+                return {"status": "INVALID_REQUEST", "results": []}
+            lat, lng, radius, offset = token
+        else:
+            lat, lng = _parse_point(params["location"])
+            radius, offset = float(params["radius"]), 0
+
+        places = []
+        for chain in self.nearby_chains + INDEPENDENT_GROCERS:
+            for place in self.chain_stores(chain, lat, lng, radius):
+                meters = haversine_meters(lat, lng, *self._location(place))
+                places.append((meters, place["place_id"], place))
+        places.sort(key=lambda entry: entry[:2])
+        places = [place for _, _, place in places[:NEARBY_MAX_RESULTS]]
+
+        response = {
+            "status": "OK" if places else "ZERO_RESULTS",
+            "results": places[offset : offset + NEARBY_PAGE_SIZE],
+        }
+        if offset + NEARBY_PAGE_SIZE < len(places):
+            token = json.dumps([lat, lng, radius, offset + NEARBY_PAGE_SIZE])
+            response["next_page_token"] = base64.urlsafe_b64encode(
+                token.encode("utf-8")
+            ).decode("ascii")
+        return response
+
+    @staticmethod
+    def _location(place: Dict) -> Tuple[float, float]:
+        location = place["geometry"]["location"]
+        return location["lat"], location["lng"]
+
+    def _leg(self, a: Tuple[float, float], b: Tuple[float, float]) -> Dict:
+        meters = int(haversine_meters(*a, *b) * self.road_factor)
+        return {
+            "status": "OK",
+            "distance": {"value": meters, "text": f"{meters / 1609.34:.1f} mi"},
+            "duration": {
+                "value": int(meters / self.speed_mps),
+                "text": f"{meters / self.speed_mps / 60:.0f} mins",
+            },
+        }
+
+    def distance_matrix(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        origins = _parse_points(params["origins"])
+        destinations = _parse_points(params["destinations"])
+        if len(destinations) > 25 or len(origins) * len(destinations) > 100:
+            return {"status": "MAX_ELEMENTS_EXCEEDED", "rows": []}
+        return {
+            "status": "OK",
+            "rows": [
+                {"elements": [self._leg(o, d) for d in destinations]} for o in origins
+            ],
+        }
+
+    def directions(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        origin = _parse_point(params["origin"])
+        destination = _parse_point(params["destination"])
+        waypoints_param = params.get("waypoints", "")
+        optimize = waypoints_param.startswith("optimize:true|")
+        if optimize:
+            waypoints_param = waypoints_param[len("optimize:true|") :]
+        waypoints = _parse_points(waypoints_param)
+
+        order = list(range(len(waypoints)))
+        if optimize and waypoints:
+            points = [origin] + waypoints
+            cost = [[haversine_meters(*a, *b) for b in points] for a in points]
+            stops, _ = solve_round_trip(cost, [i + 1 for i in order])
+            order = [stop - 1 for stop in stops]
+
+        path = [origin] + [waypoints[i] for i in order] + [destination]
+        legs = [self._leg(a, b) for a, b in zip(path, path[1:])]
+        return {
+            "status": "OK",
+            "routes": [
+                {
+                    "legs": legs,
+                    "waypoint_order": order,
+                    "overview_polyline": {"points": f"synthetic{len(path)}"},
+                }
+            ],
+        }
+
+
+class SyntheticResponse:
+    """Just enough of ``requests.Response`` for ``MapsClient``."""
+
+    def __init__(self, payload: Dict[str, Any], status_code: int = 200):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode("utf-8")
+        self.headers = {"Content-Length": str(len(self.content))}
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class SyntheticSession:
+    """A ``requests.Session`` stand-in that answers from ``SyntheticMaps``."""
+
+    def __init__(self, maps: Optional[SyntheticMaps] = None, latency: float = 0.0):
+        self.maps = maps or SyntheticMaps()
+        self.latency = latency
+        self.calls = 0
+
+    def get(self, url: str, params=None, timeout=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        endpoint = endpoint_from_path(url)
+        if endpoint is None:
+            return SyntheticResponse({"status": "NOT_FOUND"}, status_code=404)
+        return SyntheticResponse(self.maps.handle(endpoint, dict(params or {})))
+
+    def close(self):
+        pass
+
+
+class StubServerConfig:
+    """Fault injection settings for ``create_stub_server``."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        quota_error_rate: float = 0.0,
+        quota: Optional[int] = None,
+        require_key: bool = True,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_error_rate = quota_error_rate
+        self.quota = quota
+        self.require_key = require_key
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "quota_errors": 0}
+        self.by_endpoint = {}
+
+    def admit(self, endpoint: str) -> Optional[Tuple[int, Dict]]:
+        """Counts a request; returns an injected ``(status, payload)`` or ``None``."""
+        with self.lock:
+            self.stats["requests"] += 1
+            self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+            roll = self.rng.random()
+            delay = max(0.0, self.latency + self.rng.uniform(-1, 1) * self.jitter)
+            over_quota = self.quota is not None and self.stats["requests"] > self.quota
+            if roll < self.error_rate:
+                self.stats["errors"] += 1
+                injected = (500, {"status": "UNKNOWN_ERROR"})
+            elif over_quota or roll < self.error_rate + self.quota_error_rate:
+                self.stats["quota_errors"] += 1
+                injected = (
+                    200,
+                    {
+                        "status": "OVER_QUERY_LIMIT",
+                        "error_message": "You have exceeded your rate-limit for this API.",
+                    },
+                )
+            else:
+                injected = None
+        if delay:
+            time.sleep(delay)
+        return injected
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return dict(self.stats, endpoints=dict(self.by_endpoint))
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    maps: SyntheticMaps = None
+    config: StubServerConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode("utf-8")
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = gzip.compress(body, compresslevel=1)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/stats":
+            self._send_json(200, self.config.snapshot())
+            return
+        endpoint = endpoint_from_path(url.path)
+        if endpoint is None:
+            self._send_json(404, {"status": "NOT_FOUND"})
+            return
+
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        injected = self.config.admit(endpoint)
+        if injected is not None:
+            self._send_json(*injected)
+        elif self.config.require_key and not params.get("key"):
+            self._send_json(
+                200,
+                {
+                    "status": "REQUEST_DENIED",
+                    "error_message": "You must use an API key to authenticate each request.",
+                },
+            )
+        else:
+            self._send_json(200, self.maps.handle(endpoint, params))
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    # Load tests open many connections at once; the default backlog is 5
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def create_stub_server(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    maps: Optional[SyntheticMaps] = None,
+    config: Optional[StubServerConfig] = None,
+) -> ThreadingHTTPServer:
+    """Builds (but doesn't start) a Maps stand-in server bound to ``host:port``."""
+    handler = type(
+        "BoundStubRequestHandler",
+        (StubRequestHandler,),
+        {"maps": maps or SyntheticMaps(), "config": config or StubServerConfig()},
+    )
+    return StubHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve a synthetic Google Maps API for offline load testing."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--center",
+        type=_parse_point,
+        default=(39.9612, -82.9988),
+        help="lat,lng of the synthetic city addresses geocode into",
+    )
+    parser.add_argument("--city-radius", type=float, default=15.0, help="miles")
+    parser.add_argument("--stores-per-chain", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction answered HTTP 500"
+    )
+    parser.add_argument(
+        "--quota-error-rate",
+        type=float,
+        default=0.0,
+        help="fraction answered OVER_QUERY_LIMIT",
+    )
+    parser.add_argument(
+        "--quota",
+        type=int,
+        default=None,
+        help="requests served before every answer is OVER_QUERY_LIMIT",
+    )
+    args = parser.parse_args()
+
+    server = create_stub_server(
+        args.host,
+        args.port,
+        SyntheticMaps(
+            seed=args.seed,
+            stores_per_chain=args.stores_per_chain,
+            center=args.center,
+            city_radius_miles=args.city_radius,
+        ),
+        StubServerConfig(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            quota_error_rate=args.quota_error_rate,
+            quota=args.quota,
+            seed=args.seed,
+        ),
+    )
+    print(
+        f"Maps stand-in on http://{args.host}:{server.server_port}/maps/api "
+        "(GET /stats for counters)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,117 @@
+"""
+In-process cache of Places text-search results per store chain.
+
+Searches are keyed by chain, the geohash cell containing the origin and a radius
+bucket, so users in the same neighbourhood share one lookup. A cached search is
+only reused when its circle contains the whole requested one, i.e. its radius is
+at least the requested radius plus the distance between the two origins; the
+store finder applies the exact distance filter afterwards.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from geo_utils import geohash_encode, haversine_meters
+
+# Precision 6 cells are roughly 1.2 km x 0.6 km
+PLACES_CACHE_GEOHASH_PRECISION = 6
+RADIUS_BUCKET_MILES = 5
+MAX_RADIUS_BUCKET_MILES = 50
+METERS_PER_MILE = 1609.34
+PLACES_CACHE_TTL_SECONDS = 24 * 3600
+PLACES_CACHE_MAX_ENTRIES = 2048
+
+
+def radius_bucket(radius_miles: float) -> int:
+    """Rounds a search radius down to its bucket boundary."""
+    return math.floor(radius_miles / RADIUS_BUCKET_MILES) * RADIUS_BUCKET_MILES
+
+
+class PlacesCache:
+    """Size-bounded LRU cache of Places search results with a TTL."""
+
+    def __init__(
+        self,
+        max_entries: int = PLACES_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = PLACES_CACHE_TTL_SECONDS,
+        precision: int = PLACES_CACHE_GEOHASH_PRECISION,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, chain, lat, lng, bucket):
+        return (chain.lower(), geohash_encode(lat, lng, self.precision), bucket)
+
+    def get(
+        self, chain: str, lat: float, lng: float, radius_miles: float
+    ) -> Optional[List[Dict]]:
+        """Returns cached places from the first search covering the circle, or ``None``."""
+        now = time.time()
+        bucket = radius_bucket(radius_miles)
+        last_bucket = max(MAX_RADIUS_BUCKET_MILES, bucket)
+        with self._lock:
+            while bucket <= last_bucket:
+                key = self._key(chain, lat, lng, bucket)
+                entry = self._entries.get(key)
+                if entry is not None:
+                    expires_at, cached_radius, cached_lat, cached_lng, places = entry
+                    if expires_at <= now:
+                        del self._entries[key]
+                    elif (
+                        cached_radius * METERS_PER_MILE
+                        >= radius_miles * METERS_PER_MILE
+                        + haversine_meters(lat, lng, cached_lat, cached_lng)
+                    ):
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return places
+                bucket += RADIUS_BUCKET_MILES
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        chain: str,
+        lat: float,
+        lng: float,
+        radius_miles: float,
+        places: List[Dict],
+    ):
+        key = self._key(chain, lat, lng, radius_bucket(radius_miles))
+        with self._lock:
+            self._entries[key] = (
+                time.time() + self.ttl_seconds,
+                radius_miles,
+                lat,
+                lng,
+                places,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+places_cache = PlacesCache()
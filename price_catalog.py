@@ -0,0 +1,294 @@
+"""
+Process-wide price catalog used by ``estimate_prices_simple``.
+
+The base price table and chain multipliers are expanded into an immutable
+item -> chain -> price table once per process, so quoting a shopping list is a
+pair of dictionary lookups per item and store. Entries that aren't exact catalog
+names are resolved to their closest catalog item through a trigram index.
+"""
+
+import functools
+import os
+import threading
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from item_matcher import TrigramIndex
+from price_matrix import PriceMatrix
+
+BASE_PRICES = {
+    "milk": 1.0,
+    "bread": 1.3,
+    "eggs": 1.6,
+    "bananas": 1.9,
+    "avocados": 2.2,
+    "chicken breast": 2.5,
+    "rice": 2.8,
+    "pasta": 3.1,
+    "cheese": 3.4,
+    "yogurt": 3.7,
+    "butter": 1.2,
+    "apples": 1.5,
+    "oranges": 1.8,
+    "tomatoes": 2.1,
+    "lettuce": 2.4,
+    "cereal": 2.7,
+    "soda": 3.0,
+    "coffee": 3.3,
+    "tea": 3.6,
+    "bacon": 3.9,
+    "sausage": 1.4,
+    "ground beef": 1.7,
+    "pork chops": 2.0,
+    "oatmeal": 2.3,
+    "flour": 2.6,
+    "sugar": 2.9,
+    "salt": 3.2,
+    "pepper": 3.5,
+    "olive oil": 3.8,
+    "canola oil": 4.1,
+    "peanut butter": 1.6,
+    "jelly": 1.9,
+    "canned beans": 2.2,
+    "canned corn": 2.5,
+    "canned tomatoes": 2.8,
+    "pasta sauce": 3.1,
+    "ketchup": 3.4,
+    "mustard": 3.7,
+    "mayonnaise": 4.0,
+    "grapes": 4.3,
+    "strawberries": 1.8,
+    "blueberries": 2.1,
+    "spinach": 2.4,
+    "onions": 2.7,
+    "potatoes": 3.0,
+    "carrots": 3.3,
+    "broccoli": 3.6,
+    "cucumbers": 3.9,
+    "peppers": 4.2,
+    "canned tuna": 4.5,
+    "chips": 2.0,
+    "crackers": 2.3,
+    "cookies": 2.6,
+    "nuts": 2.9,
+    "granola bars": 3.2,
+    "popcorn": 3.5,
+    "chocolate": 3.8,
+    "ice cream": 4.1,
+    "bagels": 4.4,
+    "tortillas": 4.7,
+}
+
+STORE_MULTIPLIERS = {
+    "Walmart": 0.9,
+    "Target": 1.0,
+    "Kroger": 0.95,
+    "Costco": 0.85,
+    "Whole Foods": 1.3,
+    "Safeway": 1.05,
+    "Meijer": 0.92,
+}
+
+# Stores whose chain has no catalog prices are quoted at FALLBACK_BASE_PRICE
+# scaled by the first of these name fragments found in the store name.
+FALLBACK_BASE_PRICE = 3.00
+FALLBACK_NAME_MULTIPLIERS = (
+    ("walmart", 0.9),
+    ("target", 0.95),
+    ("meijer", 0.88),
+    ("whole foods", 1.2),
+    ("kroger", 0.93),
+    ("safeway", 1.05),
+)
+
+DEFAULT_CONFIDENCE = 0.8
+
+
+class BasePriceCatalog:
+    """
+    Shared quoting logic for price catalogs.
+
+    Subclasses provide ``row(item)``: the chain -> price mapping for a catalog
+    item, or ``None`` when the catalog doesn't carry it.
+    """
+
+    def __init__(
+        self,
+        fallback_base_price: float = FALLBACK_BASE_PRICE,
+        fallback_name_multipliers: Sequence[Tuple[str, float]] = (
+            FALLBACK_NAME_MULTIPLIERS
+        ),
+    ):
+        self.fallback_base_price = fallback_base_price
+        self.fallback_name_multipliers = tuple(fallback_name_multipliers)
+        self._fallback_prices = {}
+        self._matcher = None
+        self._matcher_lock = threading.Lock()
+
+    def row(self, item: str) -> Optional[Mapping[str, float]]:
+        raise NotImplementedError
+
+    def item_names(self) -> List[str]:
+        raise NotImplementedError
+
+    def _build_matcher(self) -> TrigramIndex:
+        return TrigramIndex(self.item_names())
+
+    def warm(self):
+        """Builds the fuzzy item index now instead of on the first miss."""
+        if self._matcher is None:
+            with self._matcher_lock:
+                if self._matcher is None:
+                    self._matcher = self._build_matcher()
+
+    @property
+    def matcher(self) -> TrigramIndex:
+        # get_price_catalog warms it up front; this only guards direct use
+        self.warm()
+        return self._matcher
+
+    def resolve(self, items: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Maps each shopping-list entry to the catalog item it refers to: itself
+        when it's an exact (case-insensitive) catalog name, otherwise its best
+        fuzzy match, or ``None``.
+        """
+        resolved = {}
+        misses = []
+        for item in items:
+            if item in resolved:
+                continue
+            if self.row(item) is not None:
+                resolved[item] = item
+            else:
+                resolved[item] = None
+                misses.append(item)
+        if misses:
+            resolved.update(self.matcher.match_many(misses))
+        return resolved
+
+    def _rows(self, items: List[str]) -> Dict[str, Mapping[str, float]]:
+        return {
+            item: (self.row(name) if name else None) or {}
+            for item, name in self.resolve(items).items()
+        }
+
+    def __contains__(self, item: str) -> bool:
+        return self.row(item) is not None
+
+    def fallback_price(self, store_name: str) -> float:
+        """Price quoted at ``store_name`` for items the catalog doesn't carry."""
+        price = self._fallback_prices.get(store_name)
+        if price is None:
+            name = store_name.lower()
+            multiplier = next(
+                (
+                    m
+                    for fragment, m in self.fallback_name_multipliers
+                    if fragment in name
+                ),
+                1.0,
+            )
+            price = round(self.fallback_base_price * multiplier, 2)
+            self._fallback_prices[store_name] = price
+        return price
+
+    def price(self, item: str, chain: str, store_name: str = "") -> float:
+        row = self.row(item)
+        if row is not None and chain in row:
+            return row[chain]
+        return self.fallback_price(store_name or chain)
+
+    def _targets(self, stores: List[Dict]) -> List[Tuple[str, str, float]]:
+        targets = []
+        for store in stores:
+            chain = store.get("chain", "")
+            store_name = store.get("name", chain)
+            targets.append((chain, store_name, self.fallback_price(store_name)))
+        return targets
+
+    def quote(self, items: List[str], stores: List[Dict]) -> Dict:
+        """
+        Prices every item at every store, keyed by the item as given and then by
+        store name: ``{item: {store_name: {"price": ..., "confidence": ...}}}``.
+        """
+        targets = self._targets(stores)
+        rows = self._rows(items)
+        prices = {}
+        for item in items:
+            row = rows[item]
+            prices[item] = {
+                store_name: {
+                    "price": row.get(chain, fallback),
+                    "confidence": DEFAULT_CONFIDENCE,
+                }
+                for chain, store_name, fallback in targets
+            }
+        return prices
+
+    def price_matrix(self, items: List[str], stores: List[Dict]) -> PriceMatrix:
+        """
+        Builds the strategist's price matrix straight from the catalog, with the
+        same prices ``quote`` would produce.
+        """
+        # Later stores win duplicate names, as in quote()
+        by_name = {
+            name: (chain, fallback) for chain, name, fallback in self._targets(stores)
+        }
+        store_names = sorted(by_name)
+        item_rows = self._rows(items)
+        rows = []
+        for item in sorted(items):
+            row = item_rows[item]
+            rows.append([row.get(by_name[n][0], by_name[n][1]) for n in store_names])
+        return PriceMatrix.from_rows(sorted(items), store_names, rows)
+
+
+class PriceCatalog(BasePriceCatalog):
+    """Immutable item x chain price table built from base prices and multipliers."""
+
+    def __init__(
+        self,
+        base_prices: Mapping[str, float],
+        store_multipliers: Mapping[str, float],
+        **fallback_options,
+    ):
+        super().__init__(**fallback_options)
+        self.prices = MappingProxyType(
+            {
+                item: MappingProxyType(
+                    {
+                        chain: round(base * mult + ((idx % 5) * 0.05), 2)
+                        for chain, mult in store_multipliers.items()
+                    }
+                )
+                for idx, (item, base) in enumerate(base_prices.items())
+            }
+        )
+        self.chains = tuple(store_multipliers)
+
+    def row(self, item: str) -> Optional[Mapping[str, float]]:
+        return self.prices.get(item.lower())
+
+    def item_names(self) -> List[str]:
+        return list(self.prices)
+
+
+@functools.lru_cache(maxsize=None)
+def get_price_catalog() -> BasePriceCatalog:
+    """
+    Returns the process-wide catalog, building it and its fuzzy item index on
+    first use so no request pays for the index.
+
+    When ``PRICE_CATALOG_PATH`` points at a columnar catalog file (see
+    ``columnar_catalog``) it is memory-mapped instead of using the built-in prices.
+    """
+    path = os.getenv("PRICE_CATALOG_PATH")
+    if path:
+        from columnar_catalog import MmapPriceCatalog
+
+        catalog = MmapPriceCatalog(path)
+    else:
+        catalog = PriceCatalog(BASE_PRICES, STORE_MULTIPLIERS)
+    catalog.warm()
+    return catalog
@@ -0,0 +1,242 @@
+"""
+Dense items x stores price matrix used by ``ShoppingStrategist``.
+
+``price_data`` is converted once into a matrix with interned item and store
+indices, so scoring a store combination is a column-subset min/argmin instead of
+nested dictionary lookups. NumPy is used when installed; otherwise the same
+operations run on plain lists.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+class PriceMatrix:
+    """
+    Prices for ``items`` (rows, sorted) at every store (columns, sorted by name).
+
+    Prices missing from ``price_data`` are infinite, so such a store never wins
+    that item. An item no store in a plan prices is left out of that plan and
+    adds nothing to its item cost (see ``assign``).
+    """
+
+    def __init__(self, price_data: Dict[str, Dict], items: Sequence[str]):
+        items = sorted(items)
+        store_names = sorted(price_data[next(iter(price_data))].keys())
+
+        inf = float("inf")
+        rows = []
+        for item in items:
+            item_prices = price_data.get(item, {})
+            rows.append(
+                [
+                    item_prices[store]["price"] if store in item_prices else inf
+                    for store in store_names
+                ]
+            )
+        self._set_prices(items, store_names, rows)
+
+    @classmethod
+    def from_rows(
+        cls, items: Sequence[str], store_names: Sequence[str], rows
+    ) -> "PriceMatrix":
+        """
+        Wraps prebuilt price rows (lists or a NumPy array) for ``items`` x
+        ``store_names``, both already sorted.
+        """
+        matrix = cls.__new__(cls)
+        matrix._set_prices(list(items), list(store_names), rows)
+        return matrix
+
+    def _set_prices(self, items, store_names, rows):
+        self.items = items
+        self.store_names = store_names
+        self.store_index = {name: i for i, name in enumerate(store_names)}
+        if NUMPY_AVAILABLE:
+            self.prices = np.asarray(rows, dtype=np.float64).reshape(
+                len(items), len(store_names)
+            )
+        else:
+            self.prices = [list(row) for row in rows]
+
+    def columns(self, store_names: Sequence[str]) -> List[int]:
+        """Column indices of ``store_names`` in name order."""
+        return sorted(self.store_index[name] for name in store_names)
+
+    def best_prices(self, columns: Sequence[int]) -> Tuple[List[float], List[int]]:
+        """
+        Per-item minimum price over ``columns`` and the column that offers it.
+
+        Ties go to the first column, i.e. the alphabetically first store.
+        """
+        if NUMPY_AVAILABLE:
+            sub = self.prices[:, columns]
+            choice = sub.argmin(axis=1)
+            best = sub[np.arange(len(self.items)), choice]
+            return best.tolist(), [columns[c] for c in choice.tolist()]
+
+        best, chosen = [], []
+        for row in self.prices:
+            column = min(columns, key=lambda c: (row[c], c))
+            best.append(row[column])
+            chosen.append(column)
+        return best, chosen
+
+    def item_cost(self, store_names: Sequence[str]) -> float:
+        """The total ``assign`` returns, without building the shopping list."""
+        columns = self.columns(store_names)
+        if not columns:
+            return 0
+        best, _ = self.best_prices(columns)
+        inf = float("inf")
+        total_item_cost = 0
+        for price in best:
+            if price != inf:
+                total_item_cost += price
+        return total_item_cost
+
+    def assign(self, store_names: Sequence[str]) -> Tuple[Dict[str, List], float]:
+        """
+        Returns the shopping list (store name -> items) and total item cost for
+        buying every item at its cheapest store among ``store_names``.
+        """
+        columns = self.columns(store_names)
+        if not columns:
+            return {}, 0
+        best, chosen = self.best_prices(columns)
+
+        shopping_list = {}
+        total_item_cost = 0
+        inf = float("inf")
+        for item, price, column in zip(self.items, best, chosen):
+            if price == inf:
+                continue
+            shopping_list.setdefault(self.store_names[column], []).append(
+                {"item": item, "price": price}
+            )
+            # Summed in item order so totals match the original per-item loop
+            total_item_cost += price
+        return shopping_list, total_item_cost
+
+
+class SubsetCostEngine:
+    """
+    Depth-first search over store subsets with incremental per-item minimums.
+
+    Each subset's per-item minimum price is derived from its parent subset with a
+    single column ``minimum`` instead of being recomputed from scratch. Subsets
+    whose item cost plus a lower bound on travel exceeds the best total found so
+    far are not evaluated, and whole branches are pruned when even buying from
+    every remaining store plus that travel bound cannot beat it.
+    """
+
+    def __init__(self, matrix: PriceMatrix, store_names: Sequence[str]):
+        self.matrix = matrix
+        self.store_names = sorted(store_names)
+        columns = [matrix.store_index[name] for name in self.store_names]
+        self._columns = [self._column(c) for c in columns]
+
+        # _suffix[k] holds the per-item minimum over stores k..n-1
+        self._suffix = [None] * (len(columns) + 1)
+        for k in range(len(columns) - 1, -1, -1):
+            following = self._suffix[k + 1]
+            self._suffix[k] = (
+                self._columns[k]
+                if following is None
+                else self._minimum(self._columns[k], following)
+            )
+
+    def _column(self, column):
+        if NUMPY_AVAILABLE:
+            return self.matrix.prices[:, column]
+        return [row[column] for row in self.matrix.prices]
+
+    @staticmethod
+    def _minimum(a, b):
+        if NUMPY_AVAILABLE:
+            return np.minimum(a, b)
+        return [x if x <= y else y for x, y in zip(a, b)]
+
+    @staticmethod
+    def _total(prices) -> float:
+        # Items no store in the subset prices are skipped, as in PriceMatrix.assign
+        if NUMPY_AVAILABLE:
+            return float(prices[np.isfinite(prices)].sum())
+        return sum(p for p in prices if p != float("inf"))
+
+    @staticmethod
+    def _lower_bound(mins, suffix) -> float:
+        """
+        Lowest item cost of any superset of a subset with per-item ``mins``
+        that adds stores from ``suffix``.
+        """
+        # An item the subset can't price may stay unpriced (and skipped) in a
+        # superset, so it bounds at zero rather than at the suffix minimum
+        if NUMPY_AVAILABLE:
+            priced = np.isfinite(mins)
+            return float(np.minimum(mins[priced], suffix[priced]).sum())
+        inf = float("inf")
+        return sum(m if m <= s else s for m, s in zip(mins, suffix) if m != inf)
+
+    def search(
+        self,
+        evaluate: Callable[[List[str], float], Optional[float]],
+        travel_lower_bound: Callable[[List[str]], float],
+        max_size: Optional[int] = None,
+        tolerance: float = 0.01,
+    ) -> int:
+        """
+        Calls ``evaluate(store_names, item_cost)`` for every subset that could still
+        be the cheapest plan and returns how many subsets were evaluated.
+
+        ``evaluate`` returns the subset's total plan cost (or ``None`` if no plan
+        could be made). ``travel_lower_bound`` must never exceed the travel cost of
+        any plan containing the given stores. Every single-store subset is always
+        evaluated, since callers compare against single-store shopping.
+        """
+        n = len(self.store_names)
+        max_size = n if max_size is None else min(max_size, n)
+        state = {"incumbent": float("inf"), "evaluated": 0}
+
+        def consider(names, item_cost):
+            total = evaluate(names, item_cost)
+            state["evaluated"] += 1
+            if total is not None and total < state["incumbent"]:
+                state["incumbent"] = total
+
+        for k in range(n):
+            consider([self.store_names[k]], self._total(self._columns[k]))
+
+        def visit(last, names, mins):
+            for k in range(last + 1, n):
+                child_names = names + [self.store_names[k]]
+                child_mins = self._minimum(mins, self._columns[k])
+                travel_bound = travel_lower_bound(child_names)
+                if len(child_names) > 1:
+                    item_cost = self._total(child_mins)
+                    if item_cost + travel_bound <= state["incumbent"] + tolerance:
+                        consider(child_names, item_cost)
+                if len(child_names) >= max_size or k + 1 >= n:
+                    continue
+                bound = (
+                    self._lower_bound(child_mins, self._suffix[k + 1]) + travel_bound
+                )
+                if bound <= state["incumbent"] + tolerance:
+                    visit(k, child_names, child_mins)
+
+        if n and max_size > 1:
+            inf = float("inf")
+            start = (
+                np.full(len(self.matrix.items), inf)
+                if NUMPY_AVAILABLE
+                else [inf] * len(self.matrix.items)
+            )
+            visit(-1, [], start)
+        return state["evaluated"]
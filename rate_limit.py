@@ -0,0 +1,250 @@
+"""
+Rate limiting and per-workflow call budgets for the Google Maps APIs.
+
+Every Maps request takes a token from its endpoint's bucket first. Buckets are
+process-wide; with ``GOOGLE_MAPS_RATE_LIMIT_DIR`` set they live in lock-protected
+files there, so every worker process on the host shares one limit. A request that
+can't get a token within ``max_wait`` fails with ``RateLimited`` instead of
+queuing behind the burst.
+
+A workflow can also run under a ``call_budget``; once it has made that many Maps
+requests, further ones fail with ``BudgetExhausted``. Callers treat both as
+``QuotaExceeded`` and fall back to cached or estimated data.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process buckets are unavailable
+    fcntl = None
+
+from telemetry import count
+
+# Requests per second allowed per endpoint; bursts of twice that are absorbed.
+# Override with GOOGLE_MAPS_RATE_LIMITS="place/textsearch=5,directions=10".
+DEFAULT_RATE_LIMITS = {
+    "geocode": 50.0,
+    "place/textsearch": 20.0,
+    "place/nearbysearch": 20.0,
+    "distancematrix": 20.0,
+    "directions": 20.0,
+}
+DEFAULT_MAX_WAIT_SECONDS = 1.0
+
+
+class QuotaExceeded(Exception):
+    """A Maps request was refused locally to protect the API quota."""
+
+
+class RateLimited(QuotaExceeded):
+    """No token became available for the endpoint within the wait limit."""
+
+
+class BudgetExhausted(QuotaExceeded):
+    """The current workflow has used up its Maps call budget."""
+
+
+class TokenBucket:
+    """In-process token bucket refilled at ``rate`` tokens per second."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else 2 * rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_take(self) -> float:
+        """Takes a token if one is available; otherwise returns seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, max_wait: float = DEFAULT_MAX_WAIT_SECONDS) -> bool:
+        """Waits up to ``max_wait`` seconds for a token."""
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self._try_take()
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in a file guarded by ``flock``, shared by every
+    process using the same path. Wall-clock time is used since monotonic clocks
+    aren't comparable across processes.
+    """
+
+    def __init__(self, path: str, rate: float, capacity: Optional[float] = None):
+        if fcntl is None:
+            raise RuntimeError("Cross-process rate limiting needs fcntl (POSIX)")
+        super().__init__(rate, capacity)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _try_take(self) -> float:
+        with open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                state = f.read().split()
+                now = time.time()
+                if len(state) == 2:
+                    tokens, updated = float(state[0]), float(state[1])
+                    tokens = min(
+                        self.capacity, tokens + max(0.0, now - updated) * self.rate
+                    )
+                else:
+                    tokens = self.capacity
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+                f.seek(0)
+                f.truncate()
+                f.write(f"{tokens} {now}")
+                return wait
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _parse_limits(text: str) -> Dict[str, float]:
+    limits = {}
+    for part in text.split(","):
+        if "=" in part:
+            endpoint, rate = part.split("=", 1)
+            limits[endpoint.strip()] = float(rate)
+    return limits
+
+
+class RateLimiter:
+    """One token bucket per Maps endpoint."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, float]] = None,
+        state_dir: Optional[str] = None,
+        max_wait: float = DEFAULT_MAX_WAIT_SECONDS,
+    ):
+        self.limits = dict(DEFAULT_RATE_LIMITS, **(limits or {}))
+        self.state_dir = state_dir
+        self.max_wait = max_wait
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        return cls(
+            limits=_parse_limits(os.getenv("GOOGLE_MAPS_RATE_LIMITS", "")),
+            state_dir=os.getenv("GOOGLE_MAPS_RATE_LIMIT_DIR") or None,
+        )
+
+    def _bucket(self, endpoint: str) -> Optional[TokenBucket]:
+        rate = self.limits.get(endpoint)
+        if not rate:
+            return None
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(endpoint)
+                if bucket is None:
+                    if self.state_dir and fcntl is not None:
+                        path = os.path.join(
+                            self.state_dir, endpoint.replace("/", "_") + ".bucket"
+                        )
+                        bucket = FileTokenBucket(path, rate)
+                    else:
+                        bucket = TokenBucket(rate)
+                    self._buckets[endpoint] = bucket
+        return bucket
+
+    def acquire(self, endpoint: str):
+        """Takes a token for ``endpoint`` or raises ``RateLimited``."""
+        bucket = self._bucket(endpoint)
+        if bucket is not None and not bucket.acquire(self.max_wait):
+            count(f"maps.{endpoint}.rate_limited")
+            raise RateLimited(f"{endpoint} rate limit reached")
+
+
+class CallBudget:
+    """A fixed number of Maps requests shared by everything in one workflow."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit - self.used)
+
+    def check(self, endpoint: str):
+        """Raises ``BudgetExhausted`` if no call is left, without spending one."""
+        with self._lock:
+            self._check(endpoint)
+
+    def spend(self, endpoint: str):
+        with self._lock:
+            self._check(endpoint)
+            self.used += 1
+
+    def _check(self, endpoint: str):
+        if self.used >= self.limit:
+            count("maps.budget_exhausted")
+            raise BudgetExhausted(
+                f"Workflow used all {self.limit} Maps calls; {endpoint} refused"
+            )
+
+
+_current_budget: contextvars.ContextVar = contextvars.ContextVar(
+    "maps_call_budget", default=None
+)
+
+
+def current_budget() -> Optional[CallBudget]:
+    return _current_budget.get()
+
+
+@contextmanager
+def call_budget(limit: Optional[int]):
+    """Runs the block under a fresh budget of ``limit`` calls (``None``: unlimited)."""
+    budget = CallBudget(limit) if limit is not None else None
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the process-wide limiter, creating it on first use."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter.from_env()
+    return _limiter
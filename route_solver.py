@@ -0,0 +1,173 @@
+"""
+Round-trip route solving over a precomputed travel matrix.
+
+The strategist fetches one origin+stores travel matrix per workflow and solves each
+candidate store combination here instead of asking the Directions API. Index 0 of
+every matrix is the user's location; the trip starts and ends there.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+# Held-Karp is O(2^n * n^2); beyond this many stops the heuristic is used
+HELD_KARP_MAX_STOPS = 8
+
+
+def tour_cost(cost: Sequence[Sequence[float]], order: Sequence[int]) -> float:
+    """Cost of leaving the origin, visiting ``order`` and returning to the origin."""
+    total = 0.0
+    previous = 0
+    for node in order:
+        total += cost[previous][node]
+        previous = node
+    return total + cost[previous][0]
+
+
+def held_karp(
+    cost: Sequence[Sequence[float]], stops: Sequence[int]
+) -> Tuple[List[int], float]:
+    """Exact minimum-cost round trip from the origin through every stop."""
+    n = len(stops)
+    if n == 0:
+        return [], 0.0
+
+    inf = float("inf")
+    full = (1 << n) - 1
+    best = [[inf] * n for _ in range(full + 1)]
+    parent = [[-1] * n for _ in range(full + 1)]
+    for j in range(n):
+        best[1 << j][j] = cost[0][stops[j]]
+
+    for mask in range(1, full + 1):
+        row = best[mask]
+        for j in range(n):
+            current = row[j]
+            if current == inf:
+                continue
+            from_node = cost[stops[j]]
+            for k in range(n):
+                bit = 1 << k
+                if mask & bit:
+                    continue
+                candidate = current + from_node[stops[k]]
+                if candidate < best[mask | bit][k]:
+                    best[mask | bit][k] = candidate
+                    parent[mask | bit][k] = j
+
+    last, total = -1, inf
+    for j in range(n):
+        candidate = best[full][j] + cost[stops[j]][0]
+        if candidate < total:
+            last, total = j, candidate
+
+    order = []
+    mask = full
+    while last != -1:
+        order.append(stops[last])
+        last, mask = parent[mask][last], mask & ~(1 << last)
+    order.reverse()
+    return order, total
+
+
+def nearest_neighbor_two_opt(
+    cost: Sequence[Sequence[float]], stops: Sequence[int]
+) -> Tuple[List[int], float]:
+    """Nearest-neighbour tour improved with 2-opt moves until none helps."""
+    remaining = list(stops)
+    order = []
+    current = 0
+    while remaining:
+        nearest = min(remaining, key=lambda node: cost[current][node])
+        remaining.remove(nearest)
+        order.append(nearest)
+        current = nearest
+
+    total = tour_cost(cost, order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(order) - 1):
+            for j in range(i + 1, len(order)):
+                # Full recomputation keeps this correct for asymmetric matrices
+                candidate = order[:i] + order[i : j + 1][::-1] + order[j + 1 :]
+                candidate_total = tour_cost(cost, candidate)
+                if candidate_total < total - 1e-9:
+                    order, total = candidate, candidate_total
+                    improved = True
+    return order, total
+
+
+def solve_round_trip(
+    cost: Sequence[Sequence[float]], stops: Sequence[int]
+) -> Tuple[List[int], float]:
+    """Returns the visiting order and cost of the cheapest round trip found."""
+    if len(stops) <= HELD_KARP_MAX_STOPS:
+        return held_karp(cost, stops)
+    return nearest_neighbor_two_opt(cost, stops)
+
+
+class TravelMatrix:
+    """
+    Driving distances and durations between the origin (index 0) and stores.
+
+    ``weights`` combines both into a single edge cost so routes are optimized for
+    the same total travel cost the strategist ranks plans by.
+    """
+
+    def __init__(
+        self,
+        stores: List[Dict],
+        distance_meters: List[List[float]],
+        duration_seconds: List[List[float]],
+        cost_per_meter: float,
+        cost_per_second: float,
+    ):
+        self.stores = stores
+        self.distance_meters = distance_meters
+        self.duration_seconds = duration_seconds
+        self.index_by_name = {s["name"]: i + 1 for i, s in enumerate(stores)}
+        self.weights = [
+            [
+                d * cost_per_meter + t * cost_per_second
+                for d, t in zip(distance_row, duration_row)
+            ]
+            for distance_row, duration_row in zip(distance_meters, duration_seconds)
+        ]
+
+    def round_trip_lower_bound(self, store_names: List[str]) -> float:
+        """
+        Lower bound on the travel cost of any trip visiting ``store_names``.
+
+        Assuming road travel costs obey the triangle inequality, no tour can be
+        cheaper than driving straight to its farthest stop and back.
+        """
+        return max(
+            (
+                self.weights[0][i] + self.weights[i][0]
+                for i in (self.index_by_name.get(name) for name in store_names)
+                if i is not None
+            ),
+            default=0.0,
+        )
+
+    def solve_trip(self, stores: List[Dict]) -> Dict:
+        """
+        Solves the round trip through ``stores`` in the shape returned by
+        ``get_trip_details_from_api``.
+
+        Raises ``ValueError`` when a store is not in the matrix or unreachable.
+        """
+        try:
+            stops = [self.index_by_name[s["name"]] for s in stores]
+        except KeyError as e:
+            raise ValueError(f"Store {e} is not in the travel matrix")
+
+        order, total = solve_round_trip(self.weights, stops)
+        if total == float("inf"):
+            raise ValueError("No drivable route between the selected stores")
+
+        legs = list(zip([0] + order, order + [0]))
+        return {
+            "distance_meters": sum(self.distance_meters[a][b] for a, b in legs),
+            "duration_seconds": sum(self.duration_seconds[a][b] for a, b in legs),
+            "optimized_stores": [stores[stops.index(node)] for node in order],
+        }
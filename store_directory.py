@@ -0,0 +1,307 @@
+"""
+Persistent directory of the stores discovered through Places searches.
+
+Every store a Places search returns is recorded with its chain, together with
+the circle the search explored and the geohash cells lying entirely inside it.
+A later search is answered from an in-memory geohash grid without calling Places
+when one fresh explored circle contains it, or when every cell it overlaps is
+explored and fresh; otherwise it goes to the API. Re-exploring only drops the
+stores inside the new circle. Records, circles and explored cells are kept in
+SQLite (WAL mode) so every worker process and restart shares the map built so
+far.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from geo_utils import (
+    geohash_bounds,
+    geohash_cells_in_radius,
+    geohash_encode,
+    haversine_meters,
+)
+
+# Precision 5 cells are roughly 4.9 km x 4.9 km (narrower away from the equator)
+STORE_DIRECTORY_GEOHASH_PRECISION = 5
+STORE_DIRECTORY_TTL_SECONDS = 7 * 24 * 3600
+# Explored circles are indexed by the coarse (about 156 km) cells they overlap
+EXPLORED_AREA_INDEX_PRECISION = 3
+METERS_PER_MILE = 1609.34
+
+
+def _place_record(place: Dict) -> Dict:
+    """The parts of a Places result the store finder uses."""
+    location = place["geometry"]["location"]
+    record = {
+        "name": place.get("name", ""),
+        "formatted_address": place.get("formatted_address", ""),
+        "geometry": {"location": {"lat": location["lat"], "lng": location["lng"]}},
+        "place_id": place["place_id"],
+    }
+    if "rating" in place:
+        record["rating"] = place["rating"]
+    return record
+
+
+class StoreDirectory:
+    """Geohash-indexed store records per chain, optionally backed by SQLite."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = STORE_DIRECTORY_TTL_SECONDS,
+        precision: int = STORE_DIRECTORY_GEOHASH_PRECISION,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision
+        self.hits = 0
+        self.misses = 0
+        # cell -> {(chain, place_id): record}
+        self._grid = {}
+        # (chain, cell) -> explored_at, for cells entirely inside an explored circle
+        self._explored = {}
+        # (chain, coarse cell) -> {(lat, lng, radius_meters): explored_at}
+        self._areas = {}
+        self._loaded = path is None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stores ("
+                "chain TEXT, place_id TEXT, cell TEXT, payload TEXT, updated_at REAL, "
+                "PRIMARY KEY (chain, place_id))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS explored_cells ("
+                "chain TEXT, cell TEXT, explored_at REAL, PRIMARY KEY (chain, cell))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS explored_areas ("
+                "chain TEXT, lat REAL, lng REAL, radius REAL, explored_at REAL, "
+                "PRIMARY KEY (chain, lat, lng, radius))"
+            )
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def _ensure_loaded(self):
+        # Called with the lock held; the grid is filled once from SQLite
+        if self._loaded:
+            return
+        conn = self._connection()
+        for chain, place_id, cell, payload in conn.execute(
+            "SELECT chain, place_id, cell, payload FROM stores"
+        ):
+            self._grid.setdefault(cell, {})[(chain, place_id)] = json.loads(payload)
+        for chain, cell, explored_at in conn.execute(
+            "SELECT chain, cell, explored_at FROM explored_cells"
+        ):
+            self._explored[(chain, cell)] = explored_at
+        for chain, lat, lng, radius, explored_at in conn.execute(
+            "SELECT chain, lat, lng, radius, explored_at FROM explored_areas "
+            "WHERE explored_at > ?",
+            (time.time() - self.ttl_seconds,),
+        ):
+            self._add_area(chain, (lat, lng, radius), explored_at)
+        self._loaded = True
+
+    def _add_area(self, chain, area, explored_at):
+        lat, lng, radius_meters = area
+        for cell in geohash_cells_in_radius(
+            lat, lng, radius_meters, EXPLORED_AREA_INDEX_PRECISION
+        ):
+            self._areas.setdefault((chain, cell), {})[area] = explored_at
+
+    def _inside_explored_area(self, chain, lat, lng, radius_meters, fresh_after):
+        """Whether one fresh explored circle contains the whole search circle."""
+        cell = geohash_encode(lat, lng, EXPLORED_AREA_INDEX_PRECISION)
+        for (area_lat, area_lng, area_radius), explored_at in self._areas.get(
+            (chain, cell), {}
+        ).items():
+            if explored_at > fresh_after and (
+                haversine_meters(lat, lng, area_lat, area_lng) + radius_meters
+                <= area_radius
+            ):
+                return True
+        return False
+
+    @staticmethod
+    def _cell_inside(cell, lat, lng, radius_meters) -> bool:
+        lat_min, lat_max, lng_min, lng_max = geohash_bounds(cell)
+        return all(
+            haversine_meters(lat, lng, corner_lat, corner_lng) <= radius_meters
+            for corner_lat in (lat_min, lat_max)
+            for corner_lng in (lng_min, lng_max)
+        )
+
+    def search(
+        self, chain: str, lat: float, lng: float, radius_miles: float
+    ) -> Optional[List[Dict]]:
+        """
+        Returns the chain's known stores within the radius, nearest first, or
+        ``None`` if part of the radius hasn't been explored recently.
+        """
+        chain = chain.lower()
+        radius_meters = radius_miles * METERS_PER_MILE
+        cells = geohash_cells_in_radius(lat, lng, radius_meters, self.precision)
+        fresh_after = time.time() - self.ttl_seconds
+        with self._lock:
+            self._ensure_loaded()
+            if not self._inside_explored_area(
+                chain, lat, lng, radius_meters, fresh_after
+            ) and any(
+                self._explored.get((chain, cell), 0) <= fresh_after for cell in cells
+            ):
+                self.misses += 1
+                return None
+            self.hits += 1
+            found = []
+            for cell in cells:
+                for (record_chain, _), record in self._grid.get(cell, {}).items():
+                    if record_chain != chain:
+                        continue
+                    location = record["geometry"]["location"]
+                    meters = haversine_meters(
+                        lat, lng, location["lat"], location["lng"]
+                    )
+                    if meters <= radius_meters:
+                        found.append((meters, record["place_id"], record))
+        found.sort(key=lambda entry: entry[:2])
+        return [json.loads(json.dumps(record)) for _, _, record in found]
+
+    def record(
+        self,
+        chain: str,
+        lat: float,
+        lng: float,
+        explored_radius_miles: float,
+        places: List[Dict],
+    ):
+        """
+        Stores ``places`` for ``chain`` as the result of a search that found every
+        store within ``explored_radius_miles``. Stores previously recorded inside
+        that circle but missing from ``places`` are dropped.
+        """
+        chain = chain.lower()
+        now = time.time()
+        radius_meters = explored_radius_miles * METERS_PER_MILE
+        area = (round(lat, 6), round(lng, 6), radius_meters)
+        overlapping = geohash_cells_in_radius(lat, lng, radius_meters, self.precision)
+        explored = [
+            cell
+            for cell in overlapping
+            if self._cell_inside(cell, lat, lng, radius_meters)
+        ]
+        records = []
+        for place in places:
+            record = _place_record(place)
+            location = record["geometry"]["location"]
+            cell = geohash_encode(location["lat"], location["lng"], self.precision)
+            records.append((cell, record))
+
+        with self._lock:
+            self._ensure_loaded()
+            removed = []
+            for cell in overlapping:
+                for key, record in list(self._grid.get(cell, {}).items()):
+                    location = record["geometry"]["location"]
+                    if key[0] == chain and (
+                        haversine_meters(lat, lng, location["lat"], location["lng"])
+                        <= radius_meters
+                    ):
+                        del self._grid[cell][key]
+                        removed.append(key)
+            for cell in explored:
+                self._explored[(chain, cell)] = now
+            if radius_meters > 0:
+                self._add_area(chain, area, now)
+            for cell, record in records:
+                self._grid.setdefault(cell, {})[(chain, record["place_id"])] = record
+
+            if self.path:
+                conn = self._connection()
+                conn.executemany(
+                    "DELETE FROM stores WHERE chain = ? AND place_id = ?", removed
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO stores VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (chain, record["place_id"], cell, json.dumps(record), now)
+                        for cell, record in records
+                    ],
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO explored_cells VALUES (?, ?, ?)",
+                    [(chain, cell, now) for cell in explored],
+                )
+                if radius_meters > 0:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO explored_areas VALUES (?, ?, ?, ?, ?)",
+                        (chain, *area, now),
+                    )
+                conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "stores": sum(len(records) for records in self._grid.values()),
+                "explored_cells": len(self._explored),
+                "explored_areas": len(
+                    {
+                        (key[0], area)
+                        for key, areas in self._areas.items()
+                        for area in areas
+                    }
+                ),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._grid.clear()
+            self._explored.clear()
+            self._areas.clear()
+            if self.path:
+                conn = self._connection()
+                conn.execute("DELETE FROM stores")
+                conn.execute("DELETE FROM explored_cells")
+                conn.execute("DELETE FROM explored_areas")
+                conn.commit()
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_store_directory() -> StoreDirectory:
+    """Returns the process-wide directory, creating it on first use."""
+    global _directory
+    if _directory is None:
+        with _directory_lock:
+            if _directory is None:
+                cache_dir = os.getenv("GROCERY_CACHE_DIR", ".cache")
+                _directory = StoreDirectory(os.path.join(cache_dir, "stores.sqlite"))
+    return _directory
+
+
+def set_store_directory(directory: Optional[StoreDirectory]):
+    """Replaces the process-wide directory (``None`` resets to a fresh default)."""
+    global _directory
+    with _directory_lock:
+        _directory = directory
@@ -0,0 +1,147 @@
+"""
+Lightweight timing spans and counters for the shopping workflow.
+
+``span(name)`` times a block and ``count(name)`` bumps a counter. Both always
+feed the process-wide ``registry`` (rendered by ``render_prometheus``) and, when
+a ``trace()`` is active in the current context, that trace as well, which is how
+a single workflow run gets its own timings. The active trace lives in a
+``contextvars.ContextVar``: asyncio tasks and ``asyncio.to_thread`` inherit it
+automatically, while plain thread pools need ``submit_in_context``.
+"""
+
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class Metrics:
+    """Thread-safe span timings and counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._counters = {}
+
+    def record_span(self, name: str, seconds: float):
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                self._spans[name] = [1, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = max(stats[2], seconds)
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "spans": {
+                    name: {
+                        "count": count,
+                        "total_seconds": round(total, 6),
+                        "max_seconds": round(longest, 6),
+                    }
+                    for name, (count, total, longest) in sorted(self._spans.items())
+                },
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+
+class Trace(Metrics):
+    """Metrics for one unit of work, such as a single workflow run."""
+
+    def __init__(self):
+        super().__init__()
+        self.started = time.perf_counter()
+
+    def summary(self) -> Dict:
+        summary = self.snapshot()
+        summary["total_seconds"] = round(time.perf_counter() - self.started, 6)
+        return summary
+
+
+registry = Metrics()
+_current_trace: contextvars.ContextVar = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace():
+    """Makes a new ``Trace`` current for the duration of the block."""
+    active = Trace()
+    token = _current_trace.set(active)
+    try:
+        yield active
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str):
+    """Records the wall time of the block under ``name``, even if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.record_span(name, elapsed)
+        active = _current_trace.get()
+        if active is not None:
+            active.record_span(name, elapsed)
+
+
+def count(name: str, value: float = 1):
+    registry.increment(name, value)
+    active = _current_trace.get()
+    if active is not None:
+        active.increment(name, value)
+
+
+def submit_in_context(pool, fn, *args, **kwargs):
+    """``pool.submit`` that runs ``fn`` in a copy of the caller's context."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(metrics: Metrics = registry, prefix: str = "grocery") -> str:
+    """Renders ``metrics`` in the Prometheus text exposition format."""
+    prefix = re.sub(r"[^a-zA-Z0-9_]", "_", prefix)
+    snapshot = metrics.snapshot()
+    lines = [
+        f"# HELP {prefix}_span_seconds Wall time spent in instrumented spans.",
+        f"# TYPE {prefix}_span_seconds summary",
+    ]
+    for name, stats in snapshot["spans"].items():
+        label = f'{{span="{_label(name)}"}}'
+        lines.append(f"{prefix}_span_seconds_sum{label} {stats['total_seconds']}")
+        lines.append(f"{prefix}_span_seconds_count{label} {stats['count']}")
+    lines.append(f"# HELP {prefix}_span_max_seconds Longest single span.")
+    lines.append(f"# TYPE {prefix}_span_max_seconds gauge")
+    for name, stats in snapshot["spans"].items():
+        label = f'{{span="{_label(name)}"}}'
+        lines.append(f"{prefix}_span_max_seconds{label} {stats['max_seconds']}")
+    lines.append(f"# HELP {prefix}_events_total Counted events.")
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for name, value in snapshot["counters"].items():
+        lines.append(f'{prefix}_events_total{{name="{_label(name)}"}} {value}')
+    return "\n".join(lines) + "\n"
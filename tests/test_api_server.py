@@ -0,0 +1,129 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Provide a minimal stub for the requests package so agents.py can be imported
+import types as _types
+requests_stub = _types.ModuleType('requests')
+def _dummy_get(*args, **kwargs):
+    class _Resp:
+        def json(self):
+            return {}
+    return _Resp()
+requests_stub.get = _dummy_get
+sys.modules.setdefault('requests', requests_stub)
+
+import json
+import threading
+import time
+import urllib.request
+
+import api_server
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = api_server.SingleFlight()
+    calls = []
+    barrier = threading.Barrier(5)
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    def worker():
+        barrier.wait()
+        results.append(flight.do("key", compute))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(value == "value" for value, _ in results)
+    # Once finished, the key can run again
+    assert flight.do("key", lambda: "again") == ("again", False)
+
+
+def test_request_key_ignores_address_formatting_but_not_item_order():
+    a = {"location": api_server._normalize_location({"address": "Columbus,  OH"}),
+         "items": api_server._names(["Milk", "eggs "], "items")}
+    b = {"location": api_server._normalize_location({"address": "columbus, oh"}),
+         "items": api_server._names(["Milk", "eggs"], "items")}
+    c = dict(b, items=api_server._names(["eggs", "Milk"], "items"))
+    assert api_server.request_key("workflow", a) == api_server.request_key("workflow", b)
+    assert api_server.request_key("workflow", b) != api_server.request_key("workflow", c)
+
+
+def test_workflow_gets_items_and_stores_as_sent():
+    calls = []
+
+    def fake_workflow(location, items, preferred_stores, strict_mode, max_distance_miles=30):
+        calls.append((items, preferred_stores))
+        return {"status": "success", "items": items}
+
+    service = api_server.ShoppingService()
+    # Stands in for app.GoogleADKMultiAgent, which needs Streamlit
+    service._workflow = _types.SimpleNamespace(execute_shopping_workflow=fake_workflow)
+    body = {"location": {"lat": 1, "lng": 2}, "items": ["Whole Milk", "eggs", "Bread"],
+            "preferred_stores": ["Trader Joe's"]}
+
+    status, result = service.workflow(body)
+    assert status == 200 and result["items"] == ["Whole Milk", "eggs", "Bread"]
+    status, result = service.workflow(dict(body, items=["bread", "whole milk", "Eggs"]))
+    assert result["items"] == ["bread", "whole milk", "Eggs"]
+    assert calls == [
+        (["Whole Milk", "eggs", "Bread"], ["Trader Joe's"]),
+        (["bread", "whole milk", "Eggs"], ["Trader Joe's"]),
+    ]
+
+
+def _post(port, path, payload):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}{path}",
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_server_endpoints(monkeypatch):
+    seen = []
+
+    def fake_find(location, chains, radius):
+        seen.append((location["lat"], chains, radius))
+        return [{"name": "StoreA", "lat": 1, "lng": 2}]
+
+    monkeypatch.setattr(api_server, "find_stores_with_maps_api", fake_find)
+    server = api_server.create_server(port=0)
+    port = server.server_port
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=5) as r:
+            assert json.loads(r.read()) == {"status": "ok"}
+
+        status, body = _post(port, "/stores", {"location": {"lat": 1.0, "lng": 2.0}, "radius": 10})
+        assert status == 200
+        assert body["stores"][0]["name"] == "StoreA"
+        assert seen == [(1.0, api_server.DEFAULT_SEARCH_CHAINS, 10.0)]
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as r:
+            assert r.headers["Content-Type"].startswith("text/plain")
+            assert b"# TYPE grocery_span_seconds summary" in r.read()
+
+        status, body = _post(port, "/workflow", {"location": {"lat": 1, "lng": 2}})
+        assert status == 400
+        status, body = _post(port, "/nope", {})
+        assert status == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,105 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Provide a minimal stub for the requests package so agents.py can be imported
+import types as _types
+requests_stub = _types.ModuleType('requests')
+def _dummy_get(*args, **kwargs):
+    class _Resp:
+        def json(self):
+            return {}
+    return _Resp()
+requests_stub.get = _dummy_get
+sys.modules.setdefault('requests', requests_stub)
+
+# Stub streamlit so importing app does not fail
+streamlit_stub = _types.ModuleType('streamlit')
+streamlit_stub.secrets = {}
+def _dummy(*args, **kwargs):
+    return None
+for name in ['set_page_config', 'title', 'subheader', 'text_input', 'multiselect', 'checkbox', 'slider', 'text_area', 'button', 'status', 'success', 'error', 'tabs', 'info', 'warning', 'dataframe', 'header', 'metric', 'markdown', 'link_button', 'caption']:
+    setattr(streamlit_stub, name, _dummy)
+sys.modules.setdefault('streamlit', streamlit_stub)
+
+# stub dotenv
+dotenv_stub = _types.ModuleType('dotenv')
+def load_dotenv(*args, **kwargs):
+    return None
+dotenv_stub.load_dotenv = load_dotenv
+sys.modules.setdefault('dotenv', dotenv_stub)
+
+# stub pandas
+pandas_stub = _types.ModuleType('pandas')
+pandas_stub.DataFrame = object
+pandas_stub.read_csv = lambda *a, **k: None
+pandas_stub.__version__ = '0.0'
+sys.modules.setdefault('pandas', pandas_stub)
+
+import types
+import io
+import json
+
+import app
+import batch_runner
+
+
+def test_run_batch_streams_results_and_counts_failures(monkeypatch):
+    monkeypatch.setattr(app, "geocode_address", lambda address: {
+        'lat': 1.0, 'lng': 2.0, 'formatted_address': address
+    })
+    calls = []
+
+    def fake_workflow(self, location, items, preferred, strict, max_distance_miles=30):
+        calls.append((location['formatted_address'], items, preferred, strict, max_distance_miles))
+        return {'status': 'success', 'best_plan': {'total_plan_cost': 1.0}}
+
+    monkeypatch.setattr(app.GoogleADKMultiAgent, "execute_shopping_workflow", fake_workflow)
+
+    source = io.StringIO(
+        json.dumps({"id": "a", "address": "Town", "items": ["milk"], "strict": True, "radius": 5}) + "\n"
+        "\n"
+        + json.dumps({"id": "b", "address": "", "items": ["eggs"]}) + "\n"
+        "not json\n"
+    )
+    sink = io.StringIO()
+    counts = batch_runner.run_batch(source, sink, workers=1, progress_stream=io.StringIO())
+
+    results = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert counts == {'done': 3, 'failed': 2}
+    assert [r['line'] for r in results] == [1, 3, 4]
+    assert results[0]['status'] == 'success' and results[0]['id'] == 'a'
+    assert results[1]['status'] == 'error' and results[1]['id'] is None
+    assert calls == [('Town', ['milk'], [], True, 5)]
+
+
+def test_in_process_batch_uses_cache_dir_then_restores_it(monkeypatch, tmp_path):
+    from geocode_cache import get_geocode_cache
+    from llm_cache import get_llm_cache
+    from store_directory import get_store_directory
+    monkeypatch.setenv("GROCERY_CACHE_DIR", str(tmp_path / "original"))
+    monkeypatch.setenv("GROCERY_LLM_CACHE_DISK", "1")
+    monkeypatch.setattr(app, "geocode_address", lambda address: {
+        'lat': 1.0, 'lng': 2.0, 'formatted_address': address
+    })
+    seen = []
+
+    def fake_workflow(self, location, items, preferred, strict, max_distance_miles=30):
+        seen.append([
+            os.path.dirname(cache.path)
+            for cache in (get_geocode_cache(), get_llm_cache(), get_store_directory())
+        ])
+        return {'status': 'success'}
+
+    monkeypatch.setattr(app.GoogleADKMultiAgent, "execute_shopping_workflow", fake_workflow)
+    batch_dir = str(tmp_path / "batch")
+    source = io.StringIO(json.dumps({"address": "Town", "items": ["milk"]}) + "\n")
+    batch_runner.run_batch(
+        source, io.StringIO(), workers=1, cache_dir=batch_dir, progress_stream=io.StringIO()
+    )
+
+    # Every cache follows the batch's directory, not just the geocode cache
+    assert seen == [[batch_dir] * 3]
+    assert os.environ["GROCERY_CACHE_DIR"] == str(tmp_path / "original")
+    assert os.path.dirname(get_geocode_cache().path) == str(tmp_path / "original")
+    batch_runner._use_cache_dir(None)
@@ -0,0 +1,61 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Provide a minimal stub for the requests package so agents.py can be imported
+import types as _types
+requests_stub = _types.ModuleType('requests')
+def _dummy_get(*args, **kwargs):
+    class _Resp:
+        def json(self):
+            return {}
+    return _Resp()
+requests_stub.get = _dummy_get
+sys.modules.setdefault('requests', requests_stub)
+
+import agents
+import benchmark
+import maps_client
+import store_directory
+from maps_stub import SyntheticMaps, SyntheticSession
+
+
+def test_synthetic_maps_drives_the_store_finder(monkeypatch):
+    monkeypatch.setenv("GOOGLE_MAPS_API_KEY", "synthetic-test-key")
+    agents.places_cache.clear()
+    session = SyntheticSession(SyntheticMaps(seed=1))
+    monkeypatch.setattr(maps_client, "_client", maps_client.MapsClient(session=session))
+    monkeypatch.setattr(store_directory, "_directory", store_directory.StoreDirectory())
+
+    stores = agents.find_stores_with_maps_api(
+        {'lat': 39.96, 'lng': -83.0}, ['Walmart', 'Target'], 15
+    )
+
+    assert sorted(s['chain'] for s in stores) == ['Target', 'Walmart']
+    assert all('Gas Station' not in s['name'] for s in stores)
+    assert session.calls == 4  # one Places search and one Distance Matrix per chain
+    agents.places_cache.clear()
+
+
+def test_synthetic_data_shapes():
+    maps = SyntheticMaps()
+    stores = benchmark.synthetic_stores(12, maps)
+    items = benchmark.synthetic_items(130)
+
+    assert len(stores) == 12
+    assert len({s['name'] for s in stores}) == 12
+    assert len(set(items)) == 130
+    price_data = benchmark.synthetic_price_data(items, stores)
+    assert set(price_data) == set(items)
+    assert set(price_data[items[-1]]) == {s['name'] for s in stores}
+    assert price_data[items[0]][stores[0]['name']]['price'] > 0
+
+
+def test_measure_reports_latency_percentiles():
+    result = benchmark.measure("noop", {"items": 1}, lambda: [0] * 1000, repeat=4)
+    assert result['runs'] == 4
+    assert result['p50_ms'] <= result['p99_ms']
+    assert result['ops_per_sec'] > 0
+    assert result['peak_memory_kb'] > 0
+    assert benchmark.percentile([1, 2, 3, 4], 0.5) == 2
+    assert benchmark.percentile([1, 2, 3, 4], 0.99) == 4
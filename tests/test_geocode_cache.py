@@ -0,0 +1,31 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from geocode_cache import GeocodeCache, normalize_address
+
+
+def test_normalize_address():
+    assert normalize_address('  San Francisco ,CA ') == 'san francisco, ca'
+    assert normalize_address('SAN   FRANCISCO, CA.') == 'san francisco, ca'
+
+
+def test_cache_round_trip_across_instances(tmp_path):
+    path = str(tmp_path / 'geocode.sqlite')
+    result = {'lat': 1.0, 'lng': 2.0, 'formatted_address': 'Somewhere', 'source': 'google_api'}
+    GeocodeCache(path).put('Somewhere, USA', result)
+    GeocodeCache(path).put('Nowhere', None, negative=True)
+
+    cache = GeocodeCache(path)
+    assert cache.get('somewhere,usa') == {'negative': False, 'result': result}
+    assert cache.get('NOWHERE') == {'negative': True, 'result': {}}
+    assert cache.get('Elsewhere') is None
+
+
+def test_expired_entries_are_misses(tmp_path):
+    path = str(tmp_path / 'geocode.sqlite')
+    GeocodeCache(path, ttl_seconds=-1).put('Somewhere', {'lat': 1.0, 'lng': 2.0})
+
+    cache = GeocodeCache(path)
+    assert cache.get('Somewhere') is None
+    assert cache.purge_expired() == 1
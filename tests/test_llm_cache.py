@@ -0,0 +1,97 @@
+import importlib.util
+import os
+import sys
+import types
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import llm_cache
+from llm_cache import LlmResponseCache, request_key
+
+
+class _Request:
+    def __init__(self, content, context=None):
+        self.content = content
+        self.context = context or {}
+
+
+def test_key_ignores_context_ordering():
+    first = _Request("plan", {"stores": ["A", "B"], "strict": False, "tags": {"x", "y"}})
+    second = _Request("plan", {"tags": {"y", "x"}, "strict": False, "stores": ["A", "B"]})
+    key = request_key("advisor", "gemini", "be helpful", first)
+    assert key == request_key("advisor", "gemini", "be helpful", second)
+    assert key != request_key("advisor", "gemini-pro", "be helpful", first)
+    assert key != request_key("advisor", "gemini", "be helpful", _Request("plan"))
+
+
+def test_lru_ttl_and_disk_tier(tmp_path):
+    cache = LlmResponseCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", {"content": "1"})
+    cache.put("b", {"content": "2"})
+    cache.get("a")
+    cache.put("c", {"content": "3"})
+    assert cache.get("b") is None  # least recently used
+    assert cache.get("a") == {"content": "1"}
+    assert not cache.put("d", {"content": object()})
+
+    expired = LlmResponseCache(ttl_seconds=-1)
+    expired.put("a", "x")
+    assert expired.get("a") is None
+
+    path = str(tmp_path / "llm.sqlite")
+    LlmResponseCache(path=path).put("k", {"content": "shared"})
+    assert LlmResponseCache(path=path).get("k") == {"content": "shared"}
+
+
+def _load_agents_with_fake_adk(monkeypatch, replies):
+    google = types.ModuleType("google")
+    adk = types.ModuleType("google.adk")
+    tools = types.ModuleType("google.adk.tools")
+
+    class Agent:
+        def __init__(self, **kwargs):
+            pass
+
+        def run(self, request):
+            reply = replies.pop(0)
+            if isinstance(reply, Exception):
+                raise reply
+            return AgentResponse(content=reply)
+
+    class AgentRequest(_Request):
+        pass
+
+    class AgentResponse:
+        def __init__(self, content, **kwargs):
+            self.content = content
+
+    adk.Agent, adk.AgentRequest, adk.AgentResponse = Agent, AgentRequest, AgentResponse
+    tools.FunctionTool = lambda func=None, **kwargs: func
+    google.adk = adk
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.adk", adk)
+    monkeypatch.setitem(sys.modules, "google.adk.tools", tools)
+
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "agents.py")
+    spec = importlib.util.spec_from_file_location("agents_with_adk", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_agent_run_is_cached_but_errors_are_not(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_cache", LlmResponseCache())
+    replies = [RuntimeError("model overloaded"), {"advice": "go to Aldi"}]
+    adk_agents = _load_agents_with_fake_adk(monkeypatch, replies)
+    assert adk_agents.ADK_AVAILABLE
+    agent = adk_agents.LlmAgent(name="advisor", model="m", instructions="i")
+    request = adk_agents.AgentRequest("advise", {"stores": ["Aldi"]})
+
+    assert "model overloaded" in agent.run(request)
+    first = agent.run(request)
+    second = agent.run(adk_agents.AgentRequest("advise", {"stores": ["Aldi"]}))
+    assert first.content == second.content == {"advice": "go to Aldi"}
+    assert replies == []  # the model was asked once after the error
+
+    monkeypatch.setenv("GROCERY_LLM_CACHE", "off")
+    replies.append("fresh")
+    assert agent.run(request).content == "fresh"
@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import maps_client
+from maps_cassette import CassetteMiss, MapsCassette
+from maps_stub import SyntheticMaps, SyntheticSession
+
+
+class _FailingSession:
+    calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        raise AssertionError("replay must not touch the network")
+
+
+def test_record_then_replay_without_network(tmp_path):
+    path = str(tmp_path / "maps.jsonl.gz")
+    session = SyntheticSession(SyntheticMaps())
+    recorder = maps_client.MapsClient(
+        session=session, cassette=MapsCassette(path, "record")
+    )
+    params = {"address": "1 Main St", "key": "secret-key-1"}
+    recorded = recorder.get_json("geocode", params)
+    recorder.get_json("geocode", dict(params))  # identical answer isn't appended twice
+    assert session.calls == 2
+
+    replayer = maps_client.MapsClient(
+        session=_FailingSession(), cassette=MapsCassette(path, "replay")
+    )
+    # A different key and parameter order still match the recording
+    replayed = replayer.get_json("geocode", {"key": "other-key-22", "address": "1 Main St"})
+    assert replayed == recorded
+    replayed["status"] = "mutated"
+    assert replayer.get_json("geocode", params)["status"] == "OK"
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    assert b"secret-key-1" not in raw
+    assert len(MapsCassette(path, "replay")) == 1
+
+    with pytest.raises(CassetteMiss):
+        replayer.get_json("geocode", {"address": "2 Main St", "key": "k"})
+
+
+def test_fallback_serves_recording_when_throttled(tmp_path):
+    path = str(tmp_path / "maps.jsonl.gz")
+    cassette = MapsCassette(path, "fallback")
+    cassette.record("geocode", {"address": "x"}, {"status": "OK", "results": [1]})
+
+    def throttled():
+        return {"status": "OVER_QUERY_LIMIT"}
+
+    def offline():
+        raise ConnectionError("offline")
+
+    assert cassette.call("geocode", {"address": "x"}, throttled)["results"] == [1]
+    assert cassette.call("geocode", {"address": "x"}, offline)["results"] == [1]
+    assert cassette.call("geocode", {"address": "y"}, throttled)["status"] == "OVER_QUERY_LIMIT"
+    with pytest.raises(ConnectionError):
+        cassette.call("geocode", {"address": "y"}, offline)
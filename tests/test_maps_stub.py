@@ -0,0 +1,111 @@
+import gzip
+import json
+import os
+import sys
+import threading
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import maps_stub
+
+
+def _serve(config):
+    server = maps_stub.create_stub_server(
+        port=0, maps=maps_stub.SyntheticMaps(center=(39.96, -83.0)), config=config
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _get(server, path, gzipped=False):
+    request = urllib.request.Request(f"http://127.0.0.1:{server.server_port}{path}")
+    if gzipped:
+        request.add_header("Accept-Encoding", "gzip")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            body = response.read()
+            if response.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            return response.status, json.loads(body)
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_stub_server_answers_maps_endpoints():
+    server = _serve(maps_stub.StubServerConfig())
+    try:
+        status, data = _get(server, "/maps/api/geocode/json?address=1+Main+St&key=k", gzipped=True)
+        assert status == 200 and data["status"] == "OK"
+        location = data["results"][0]["geometry"]["location"]
+        assert abs(location["lat"] - 39.96) < 0.3
+
+        status, data = _get(server, "/maps/api/geocode/json?address=1+Main+St")
+        assert data["status"] == "REQUEST_DENIED"
+
+        origin = f"{location['lat']},{location['lng']}"
+        status, data = _get(
+            server,
+            f"/maps/api/place/textsearch/json?query=Kroger+near+{origin}&location={origin}&radius=40000&key=k",
+        )
+        assert data["status"] == "OK"
+        assert all("Kroger" in place["name"] for place in data["results"])
+
+        status, page = _get(
+            server,
+            f"/maps/api/place/nearbysearch/json?location={origin}&radius=40000&type=grocery_or_supermarket&key=k",
+        )
+        ids = [place["place_id"] for place in page["results"]]
+        assert len(ids) == 20 and page["next_page_token"]
+        status, page = _get(
+            server, f"/maps/api/place/nearbysearch/json?pagetoken={page['next_page_token']}&key=k"
+        )
+        assert page["status"] == "OK" and not set(ids) & {p["place_id"] for p in page["results"]}
+
+        stops = "|".join(
+            "{lat},{lng}".format(**p["geometry"]["location"]) for p in data["results"][:3]
+        )
+        status, data = _get(
+            server, f"/maps/api/directions/json?origin={origin}&destination={origin}&waypoints=optimize:true|{stops}&key=k"
+        )
+        assert sorted(data["routes"][0]["waypoint_order"]) == [0, 1, 2]
+        assert len(data["routes"][0]["legs"]) == 4
+
+        status, stats = _get(server, "/stats")
+        assert stats["requests"] == 6
+        assert stats["endpoints"]["geocode"] == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_synthetic_stores_keep_their_place_across_searches():
+    maps = maps_stub.SyntheticMaps(seed=3)
+    first = {p["place_id"]: p for p in maps.chain_stores("Kroger", 39.96, -83.0, 30000)}
+    second = {p["place_id"]: p for p in maps.chain_stores("Kroger", 40.05, -83.1, 30000)}
+    shared = set(first) & set(second)
+    assert shared
+    for place_id in shared:
+        assert first[place_id]["geometry"] == second[place_id]["geometry"]
+        assert first[place_id]["name"] == second[place_id]["name"]
+
+
+def test_stub_server_injects_errors_and_quota():
+    server = _serve(maps_stub.StubServerConfig(quota=1))
+    try:
+        path = "/maps/api/distancematrix/json?origins=1,1&destinations=1.1,1|1.2,1&key=k"
+        status, data = _get(server, path)
+        assert data["status"] == "OK" and len(data["rows"][0]["elements"]) == 2
+        status, data = _get(server, path)
+        assert data["status"] == "OVER_QUERY_LIMIT"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    server = _serve(maps_stub.StubServerConfig(error_rate=1.0))
+    try:
+        status, data = _get(server, "/maps/api/geocode/json?address=x&key=k")
+        assert status == 500
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,106 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import price_matrix
+from columnar_catalog import MmapPriceCatalog, build_catalog
+from price_catalog import BASE_PRICES, STORE_MULTIPLIERS, PriceCatalog
+from price_matrix import PriceMatrix
+
+STORES = [
+    {'name': 'Walmart Supercenter', 'chain': 'Walmart'},
+    {'name': 'Target', 'chain': 'Target'},
+    {'name': 'Corner Shop', 'chain': 'General'},
+]
+
+
+def _write_catalog(tmp_path):
+    csv_path = tmp_path / 'prices.csv'
+    csv_path.write_text(
+        'item,Walmart,Target\n'
+        'Milk,0.95,1.05\n'
+        'bread,1.20,\n'
+        'zucchini,2.50,2.75\n'
+        'Crème fraîche,3.10,3.30\n'
+    )
+    out_path = str(tmp_path / 'prices.gpcat')
+    assert build_catalog(str(csv_path), out_path) == 4
+    return MmapPriceCatalog(out_path)
+
+
+def test_mmap_catalog_lookups(tmp_path):
+    catalog = _write_catalog(tmp_path)
+    assert len(catalog) == 4
+    assert catalog.chains == ('Walmart', 'Target')
+    assert catalog.row('MILK') == {'Walmart': 0.95, 'Target': 1.05}
+    assert catalog.row('bread') == {'Walmart': 1.2}
+    assert catalog.row('crème fraîche') == {'Walmart': 3.1, 'Target': 3.3}
+    assert catalog.row('apples') is None
+
+    prices = catalog.quote(['bread', 'apples'], STORES)
+    assert prices['bread']['Walmart Supercenter']['price'] == 1.2
+    # Missing chain prices and unknown items fall back like the built-in catalog
+    assert prices['bread']['Target']['price'] == 2.85
+    assert prices['apples']['Corner Shop']['price'] == 3.0
+    catalog.close()
+
+
+def test_catalog_price_matrix_matches_quote(tmp_path, monkeypatch):
+    items = ['milk', 'bread', 'zucchini', 'apples']
+    builtin = PriceCatalog(BASE_PRICES, STORE_MULTIPLIERS)
+    for numpy_available in (True, False):
+        monkeypatch.setattr(price_matrix, 'NUMPY_AVAILABLE', numpy_available)
+        catalog = _write_catalog(tmp_path)
+        for source in (catalog, builtin):
+            expected = PriceMatrix(source.quote(items, STORES), items)
+            matrix = source.price_matrix(items, STORES)
+            assert matrix.store_names == expected.store_names
+            assert matrix.assign(matrix.store_names) == expected.assign(expected.store_names)
+        catalog.close()
+
+
+def test_trigram_index_resolves_free_text_items(monkeypatch):
+    import item_matcher
+    names = list(BASE_PRICES)
+    for numpy_available in (True, False):
+        monkeypatch.setattr(item_matcher, 'NUMPY_AVAILABLE', numpy_available)
+        index = item_matcher.TrigramIndex(names)
+        assert index.match_many(['2% milk', 'banana', 'eggs large', 'bluberries', 'dragon fruit']) == {
+            '2% milk': 'milk',
+            'banana': 'bananas',
+            'eggs large': 'eggs',
+            'bluberries': 'blueberries',
+            'dragon fruit': None,
+        }
+
+
+def test_quote_prices_fuzzy_matches_under_the_original_item():
+    catalog = PriceCatalog(BASE_PRICES, STORE_MULTIPLIERS)
+    prices = catalog.quote(['2% milk', 'Milk'], STORES)
+    assert prices['2% milk'] == prices['Milk']
+    assert prices['2% milk']['Target']['price'] == catalog.prices['milk']['Target']
+
+
+def test_saved_trigram_index_matches_without_decoding_every_name(tmp_path, monkeypatch):
+    import item_matcher
+    names = list(BASE_PRICES)
+    queries = ['2% milk', 'banana', 'eggs large', 'bluberries', 'dragon fruit', 'Eggs']
+    path = str(tmp_path / 'names.trigrams')
+    item_matcher.TrigramIndex(names).save(path)
+    for numpy_available in (True, False):
+        monkeypatch.setattr(item_matcher, 'NUMPY_AVAILABLE', numpy_available)
+        decoded = []
+        mapped = item_matcher.MappedTrigramIndex(path, lambda i: decoded.append(i) or names[i])
+        assert mapped.match_many(queries) == item_matcher.TrigramIndex(names).match_many(queries)
+        assert len(set(decoded)) < len(names)
+        mapped.close()
+
+    # The catalog opens the index built next to it instead of listing every item
+    catalog = _write_catalog(tmp_path)
+    monkeypatch.setattr(catalog, 'item_names', lambda: 1 / 0)
+    assert isinstance(catalog.matcher, item_matcher.MappedTrigramIndex)
+    assert catalog.resolve(['zucchinis', 'creme fraiche']) == {
+        'zucchinis': 'zucchini',
+        'creme fraiche': 'crème fraîche',
+    }
+    catalog.close()
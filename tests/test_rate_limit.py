@@ -0,0 +1,128 @@
+import contextvars
+import os
+import sys
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+
+import agents
+import maps_client
+from maps_stub import SyntheticMaps, SyntheticSession
+from rate_limit import (
+    BudgetExhausted,
+    FileTokenBucket,
+    RateLimited,
+    RateLimiter,
+    TokenBucket,
+    call_budget,
+)
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=100, capacity=3)
+    assert all(bucket.acquire(max_wait=0) for _ in range(3))
+    assert not bucket.acquire(max_wait=0)
+    # One token refills in 10ms
+    assert bucket.acquire(max_wait=0.5)
+
+
+def test_rate_limiter_refuses_instead_of_queuing():
+    limiter = RateLimiter(limits={"geocode": 1}, max_wait=0)
+    limiter.acquire("geocode")
+    limiter.acquire("geocode")  # burst capacity is twice the rate
+    with pytest.raises(RateLimited):
+        limiter.acquire("geocode")
+    limiter.acquire("unlisted-endpoint")  # endpoints without a limit pass
+
+
+def test_file_bucket_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "geocode.bucket")
+    first = FileTokenBucket(path, rate=0.001, capacity=2)
+    second = FileTokenBucket(path, rate=0.001, capacity=2)
+    assert first.acquire(max_wait=0)
+    assert second.acquire(max_wait=0)
+    assert not first.acquire(max_wait=0)
+
+
+def test_call_budget_is_shared_across_threads():
+    session = SyntheticSession(SyntheticMaps())
+    client = maps_client.MapsClient(session=session, rate_limiter=RateLimiter())
+    errors = []
+
+    def geocode():
+        try:
+            client.get_json("geocode", {"address": "1 Main St"})
+        except BudgetExhausted as e:
+            errors.append(e)
+
+    with call_budget(3) as budget:
+        threads = []
+        for _ in range(5):
+            # Threads don't inherit context variables; the app uses
+            # copy_context/submit_in_context to carry it over
+            context = contextvars.copy_context()
+            threads.append(threading.Thread(target=context.run, args=(geocode,)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert budget.used == 3
+    assert len(errors) == 2
+    assert session.calls == 3
+    # Outside the block nothing is budgeted
+    client.get_json("geocode", {"address": "1 Main St"})
+
+
+def test_rate_limited_requests_are_not_charged_to_the_budget():
+    session = SyntheticSession(SyntheticMaps())
+    limiter = RateLimiter(limits={"geocode": 1}, max_wait=0)
+    client = maps_client.MapsClient(session=session, rate_limiter=limiter)
+
+    with call_budget(5) as budget:
+        for _ in range(2):
+            client.get_json("geocode", {"address": "1 Main St"})
+        with pytest.raises(RateLimited):
+            client.get_json("geocode", {"address": "1 Main St"})
+
+    assert budget.used == session.calls == 2
+
+    # A spent budget refuses the call before it takes a rate limit token
+    limiter = RateLimiter(limits={"geocode": 1}, max_wait=0)
+    client = maps_client.MapsClient(session=session, rate_limiter=limiter)
+    with call_budget(0):
+        with pytest.raises(BudgetExhausted):
+            client.get_json("geocode", {"address": "1 Main St"})
+    limiter.acquire("geocode")
+    limiter.acquire("geocode")
+
+
+def test_strategist_estimates_travel_when_budget_is_spent(monkeypatch):
+    monkeypatch.setenv("GOOGLE_MAPS_API_KEY", "synthetic-test-key")
+    session = SyntheticSession(SyntheticMaps())
+    monkeypatch.setattr(maps_client, "_client", maps_client.MapsClient(session=session))
+    stores = [
+        {"name": "Walmart", "chain": "Walmart", "address": "A", "lat": 39.97, "lng": -83.0},
+        {"name": "Target", "chain": "Target", "address": "B", "lat": 39.95, "lng": -82.98},
+    ]
+    price_data = {
+        "milk": {"Walmart": {"price": 3.0}, "Target": {"price": 3.5}},
+        "eggs": {"Walmart": {"price": 2.5}, "Target": {"price": 2.0}},
+    }
+    strategist = agents.ShoppingStrategist(
+        {"lat": 39.96, "lng": -82.99}, ["milk", "eggs"], price_data
+    )
+
+    with call_budget(0):
+        plan = strategist.find_best_strategy(available_stores=stores)
+
+    assert session.calls == 0
+    assert plan["travel_estimated"] is True
+    assert plan["travel_costs"]["distance_miles"] > 0
+
+    with call_budget(0):
+        elements = agents.get_distance_matrix_elements(
+            "39.96,-82.99", ["39.97,-83.0"], "key"
+        )
+    assert elements[0]["status"] == "OK" and elements[0]["estimated"]
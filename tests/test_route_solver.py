@@ -0,0 +1,44 @@
+import itertools
+import os
+import random
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from route_solver import TravelMatrix, held_karp, nearest_neighbor_two_opt, tour_cost
+
+
+def _random_matrix(size, seed):
+    rng = random.Random(seed)
+    return [[0 if i == j else rng.randint(1, 100) for j in range(size)] for i in range(size)]
+
+
+def test_held_karp_matches_brute_force():
+    for seed in range(5):
+        cost = _random_matrix(7, seed)
+        stops = [1, 2, 3, 4, 5, 6]
+        brute = min(tour_cost(cost, order) for order in itertools.permutations(stops))
+        order, total = held_karp(cost, stops)
+        assert total == brute
+        assert sorted(order) == stops
+        assert tour_cost(cost, order) == total
+
+
+def test_heuristic_visits_every_stop_once():
+    cost = _random_matrix(16, 42)
+    stops = list(range(1, 16))
+    order, total = nearest_neighbor_two_opt(cost, stops)
+    assert sorted(order) == stops
+    assert tour_cost(cost, order) == total
+
+
+def test_travel_matrix_solves_trip_in_api_shape():
+    stores = [{'name': 'A'}, {'name': 'B'}]
+    distance = [[0, 10, 30], [10, 0, 10], [30, 10, 0]]
+    duration = [[0, 60, 180], [60, 0, 60], [180, 60, 0]]
+    matrix = TravelMatrix(stores, distance, duration, cost_per_meter=1.0, cost_per_second=0.0)
+
+    trip = matrix.solve_trip([stores[1], stores[0]])
+
+    assert trip['distance_meters'] == 50
+    assert trip['duration_seconds'] == 300
+    assert [s['name'] for s in trip['optimized_stores']] in (['A', 'B'], ['B', 'A'])
@@ -0,0 +1,73 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from geo_utils import geohash_cells_in_radius, geohash_encode, haversine_meters
+from store_directory import StoreDirectory
+
+
+def _place(place_id, lat, lng, name="Kroger"):
+    return {
+        "name": name,
+        "formatted_address": f"{place_id} address",
+        "geometry": {"location": {"lat": lat, "lng": lng}},
+        "place_id": place_id,
+        "types": ["grocery_or_supermarket"],
+    }
+
+
+def test_cells_in_radius_cover_the_circle():
+    cells = set(geohash_cells_in_radius(39.96, -83.0, 10000, 5))
+    assert geohash_encode(39.96, -83.0, 5) in cells
+    # Points on the circle's edge fall in listed cells
+    for lat, lng in [(40.049, -83.0), (39.871, -83.0), (39.96, -82.884), (39.96, -83.116)]:
+        assert haversine_meters(39.96, -83.0, lat, lng) <= 10000
+        assert geohash_encode(lat, lng, 5) in cells
+
+
+def test_search_answers_explored_ground_and_persists(tmp_path):
+    path = str(tmp_path / "stores.sqlite")
+    directory = StoreDirectory(path)
+    assert directory.search("Kroger", 39.96, -83.0, 10) is None
+
+    directory.record(
+        "Kroger", 39.96, -83.0, 10,
+        [_place("near", 39.97, -83.0), _place("far", 40.2, -83.0)],
+    )
+    found = directory.search("kroger", 39.97, -83.01, 5)
+    assert [p["place_id"] for p in found] == ["near"]
+    assert "types" not in found[0]  # only the fields the store finder uses
+    assert directory.search("Target", 39.96, -83.0, 5) is None
+    assert directory.search("Kroger", 39.96, -83.0, 30) is None  # beyond explored
+
+    # A fresh instance (another worker, or after a restart) loads the same map
+    reloaded = StoreDirectory(path)
+    assert [p["place_id"] for p in reloaded.search("Kroger", 39.96, -83.0, 10)] == [
+        "near"
+    ]
+
+    # Re-exploring drops stores the new search no longer returns
+    reloaded.record("Kroger", 39.96, -83.0, 10, [])
+    assert StoreDirectory(path).search("Kroger", 39.96, -83.0, 10) == []
+
+
+def test_small_explorations_only_vouch_for_their_own_circle():
+    directory = StoreDirectory()
+    # ~1.2 miles north of the origin, inside the origin's geohash cell
+    store = _place("store", 39.977, -83.0)
+    directory.record("Kroger", 39.96, -83.0, 10, [store])
+    directory.record("Kroger", 39.96, -83.0, 0.2, [])
+    assert [p["place_id"] for p in directory.search("Kroger", 39.96, -83.0, 10)] == [
+        "store"
+    ]
+
+    fresh = StoreDirectory()
+    fresh.record("Kroger", 39.96, -83.0, 0.1, [])
+    assert fresh.search("Kroger", 39.96, -83.0, 1.5) is None
+    assert fresh.search("Kroger", 39.96, -83.0, 0.05) == []
+
+
+def test_stale_cells_are_searched_again():
+    directory = StoreDirectory(ttl_seconds=-1)
+    directory.record("Kroger", 39.96, -83.0, 10, [_place("a", 39.97, -83.0)])
+    assert directory.search("Kroger", 39.96, -83.0, 10) is None
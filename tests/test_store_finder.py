@@ -0,0 +1,303 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Provide a minimal stub for the requests package so agents.py can be imported
+import types as _types
+requests_stub = _types.ModuleType('requests')
+def _dummy_get(*args, **kwargs):
+    class _Resp:
+        def json(self):
+            return {}
+    return _Resp()
+requests_stub.get = _dummy_get
+sys.modules.setdefault('requests', requests_stub)
+
+import agents
+import maps_client
+import store_directory
+from places_cache import PlacesCache
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def _place(name, lat, lng):
+    return {
+        'name': name,
+        'formatted_address': f'{name} address',
+        'geometry': {'location': {'lat': lat, 'lng': lng}},
+        'place_id': f'id-{name}-{lat}',
+    }
+
+
+def _fake_maps(calls, per_chain=15):
+    def fake_get(url, params=None, timeout=None, **kwargs):
+        calls.append((url, params))
+        if url.endswith('place/textsearch/json'):
+            chain = params['query'].split(' near ')[0]
+            return _FakeResponse({'status': 'OK', 'results': [
+                _place(f'{chain} Supercenter', 0.01 * i, 0.0) for i in range(1, per_chain + 1)
+            ] + [_place(f'{chain} Vision Center', 0.5, 0.0)]})
+        destinations = params['destinations'].split('|')
+        return _FakeResponse({'status': 'OK', 'rows': [{'elements': [
+            {
+                'status': 'OK',
+                'distance': {'value': int(float(d.split(',')[0]) * 100000)},
+                'duration': {'value': int(float(d.split(',')[0]) * 10000)},
+            }
+            for d in destinations
+        ]}]})
+    return fake_get
+
+
+class _FakeSession:
+    def __init__(self, get):
+        self.get = get
+
+
+def _use_fake_maps(monkeypatch, get):
+    monkeypatch.setenv('GOOGLE_MAPS_API_KEY', 'test-key-1234567890')
+    monkeypatch.setattr(maps_client, '_client', maps_client.MapsClient(session=_FakeSession(get)))
+    monkeypatch.setattr(store_directory, '_directory', store_directory.StoreDirectory())
+    agents.places_cache.clear()
+
+
+def test_distance_matrix_is_batched_per_chain(monkeypatch):
+    calls = []
+    _use_fake_maps(monkeypatch, _fake_maps(calls))
+
+    stores = agents.find_stores_with_maps_api({'lat': 0.0, 'lng': 0.0}, ['Walmart', 'Target'], 15)
+
+    matrix_calls = [p for url, p in calls if url.endswith('distancematrix/json')]
+    # 15 candidates per chain -> only the 5 nearest, in one request per chain
+    assert len(matrix_calls) == 2
+    assert all(
+        p['destinations'].split('|') == [f'{0.01 * i},0.0' for i in range(1, 6)]
+        for p in matrix_calls
+    )
+    assert [s['chain'] for s in stores] == ['Walmart', 'Target']
+    assert all(s['lat'] == 0.01 and s['distance_meters'] == 1000 for s in stores)
+
+    # Larger batches are split to the API's per-request destination limit
+    calls.clear()
+    elements = agents.get_distance_matrix_elements('0,0', [f'{0.01 * i},0' for i in range(30)], 'key')
+    assert len(elements) == 30
+    assert [len(p['destinations'].split('|')) for url, p in calls] == [25, 5]
+
+
+def test_candidates_beyond_radius_are_dropped_before_distance_matrix():
+    places = [
+        {'geometry': {'location': {'lat': lat, 'lng': 0.0}}, 'name': str(lat)}
+        for lat in [0.3, 0.05, 0.2, 0.01]
+    ]
+    # 0.2 degrees is about 13.8 miles, 0.3 about 20.7
+    nearest = agents.nearest_candidates(0.0, 0.0, places, 15, limit=2)
+    assert [p['name'] for p in nearest] == ['0.01', '0.05']
+    assert len(agents.nearest_candidates(0.0, 0.0, places, 15)) == 3
+
+
+def test_haversine_many_matches_scalar_with_and_without_numpy(monkeypatch):
+    import geo_utils
+    lats, lngs = [39.97, 40.5, -33.9], [-83.0, -82.1, 151.2]
+    expected = [geo_utils.haversine_meters(39.96, -83.0, a, b) for a, b in zip(lats, lngs)]
+    for numpy_available in (geo_utils.NUMPY_AVAILABLE, False):
+        monkeypatch.setattr(geo_utils, 'NUMPY_AVAILABLE', numpy_available)
+        distances = geo_utils.haversine_meters_many(39.96, -83.0, lats, lngs)
+        assert [round(d, 3) for d in distances] == [round(d, 3) for d in expected]
+
+
+def test_concurrent_search_matches_sequential(monkeypatch):
+    _use_fake_maps(monkeypatch, _fake_maps([]))
+    chains = ['Walmart', 'Target', 'Kroger']
+    origin = {'lat': 0.0, 'lng': 0.0}
+
+    sequential = agents.find_stores_with_maps_api(origin, chains, 15, max_workers=1)
+    concurrent = agents.find_stores_with_maps_api(origin, chains, 15, max_workers=3)
+
+    assert concurrent == sequential
+
+
+def test_concurrent_search_drops_chains_past_deadline(monkeypatch):
+    import threading
+    release = threading.Event()
+    fake_get = _fake_maps([])
+
+    def slow_get(url, params=None, timeout=None, **kwargs):
+        if 'Target' in params.get('query', ''):
+            release.wait(2)
+        return fake_get(url, params=params, timeout=timeout)
+
+    _use_fake_maps(monkeypatch, slow_get)
+    try:
+        stores = agents.find_stores_with_maps_api(
+            {'lat': 0.0, 'lng': 0.0}, ['Walmart', 'Target'], 15, max_workers=2, deadline_seconds=0.2
+        )
+    finally:
+        release.set()
+
+    assert [s['chain'] for s in stores] == ['Walmart']
+
+
+def test_places_search_is_reused_within_neighbourhood(monkeypatch):
+    calls = []
+    _use_fake_maps(monkeypatch, _fake_maps(calls))
+
+    first = agents.find_stores_with_maps_api({'lat': 0.0, 'lng': 0.0}, ['Walmart'], 15)
+    # A few hundred metres away, smaller radius: same geohash cell, covered bucket
+    second = agents.find_stores_with_maps_api({'lat': 0.001, 'lng': 0.001}, ['Walmart'], 10)
+
+    searches = [url for url, p in calls if url.endswith('place/textsearch/json')]
+    assert len(searches) == 1
+    assert first and second
+    assert agents.places_cache.stats()['hits'] >= 1
+
+
+def test_places_cache_only_serves_searches_that_cover_the_circle():
+    cache = PlacesCache()
+    cache.put('Walmart', 0.0, 0.0, 3, [_place('Walmart', 0.01, 0.0)])
+    # A 3-mile search can't answer a 5-mile one
+    assert cache.get('Walmart', 0.0, 0.0, 5) is None
+    assert cache.get('Walmart', 0.0, 0.0, 2) is not None
+    # Nor a 3-mile one from elsewhere in the same cell
+    assert cache.get('Walmart', 0.004, 0.004, 3) is None
+
+    cache.put('Walmart', 0.0, 0.0, 15, [])
+    assert cache.get('Walmart', 0.004, 0.004, 10) == []
+
+
+def test_explored_area_is_answered_from_store_directory(monkeypatch):
+    calls = []
+    _use_fake_maps(monkeypatch, _fake_maps(calls))
+
+    agents.find_stores_with_maps_api({'lat': 0.0, 'lng': 0.0}, ['Walmart'], 15)
+    # A few kilometres away: another Places cache cell, but inside explored ground
+    stores = agents.find_stores_with_maps_api({'lat': 0.05, 'lng': 0.03}, ['Walmart'], 5)
+
+    searches = [url for url, p in calls if url.endswith('place/textsearch/json')]
+    assert len(searches) == 1
+    assert stores and stores[0]['chain'] == 'Walmart'
+    assert store_directory.get_store_directory().stats()['hits'] == 1
+
+
+def test_full_page_text_search_vouches_for_no_area(monkeypatch):
+    calls = []
+    # A full page of results ranked by prominence may have skipped nearer stores
+    _use_fake_maps(monkeypatch, _fake_maps(calls, per_chain=agents.PLACES_PAGE_SIZE))
+
+    agents.find_stores_with_maps_api({'lat': 0.0, 'lng': 0.0}, ['Walmart'], 15)
+    agents.find_stores_with_maps_api({'lat': 0.0, 'lng': 0.0}, ['Walmart'], 1)
+
+    searches = [url for url, p in calls if url.endswith('place/textsearch/json')]
+    assert len(searches) == 2
+    assert store_directory.get_store_directory().stats()['explored_areas'] == 0
+
+
+def test_chain_matcher_classifies_names_locally():
+    matcher = agents.ChainMatcher(['Whole Foods', 'Target', "Trader Joe's"])
+    assert matcher.classify('Whole Foods Market') == 'Whole Foods'
+    assert matcher.classify("TRADER JOE'S #42") == "Trader Joe's"
+    assert matcher.classify('Target Optical') is None  # service-word exclusion
+    assert matcher.classify('Corner Market') is None
+    assert agents.ChainMatcher([]).classify('Target') is None
+    assert agents.chain_matcher(('Target',)) is agents.chain_matcher(('Target',))
+
+
+def test_nearby_mode_searches_once_for_every_chain(monkeypatch):
+    from maps_stub import SyntheticMaps, SyntheticSession
+    monkeypatch.setenv('GOOGLE_MAPS_API_KEY', 'test-key-1234567890')
+    monkeypatch.setattr(store_directory, '_directory', store_directory.StoreDirectory())
+    agents.places_cache.clear()
+    session = SyntheticSession(SyntheticMaps(seed=1))
+    monkeypatch.setattr(maps_client, '_client', maps_client.MapsClient(session=session))
+    endpoints = []
+    handle = session.maps.handle
+    monkeypatch.setattr(session.maps, 'handle', lambda endpoint, params: endpoints.append(endpoint) or handle(endpoint, params))
+    chains = ['Walmart', 'Target', 'Kroger', 'Costco', 'Whole Foods', 'Safeway', 'Aldi']
+
+    stores = agents.find_stores_with_maps_api({'lat': 39.96, 'lng': -83.0}, chains, 15, search_mode='nearby')
+
+    # More chains than text mode allows, from one paginated search
+    assert len(stores) > agents.TEXT_SEARCH_MAX_CHAINS
+    assert 'place/textsearch' not in endpoints
+    assert 1 <= endpoints.count('place/nearbysearch') <= agents.NEARBY_SEARCH_MAX_PAGES
+    assert all(not s['name'].endswith('Gas Station') for s in stores)
+
+    # A second search in the same place is answered from the caches
+    endpoints.clear()
+    agents.find_stores_with_maps_api({'lat': 39.96, 'lng': -83.0}, chains, 15, search_mode='nearby')
+    assert 'place/nearbysearch' not in endpoints
+    agents.places_cache.clear()
+
+
+def test_nearby_mode_text_searches_untagged_chains_and_caps_explored_ground(monkeypatch):
+    from maps_stub import SyntheticMaps, SyntheticSession
+    monkeypatch.setenv('GOOGLE_MAPS_API_KEY', 'test-key-1234567890')
+    directory = store_directory.StoreDirectory()
+    monkeypatch.setattr(store_directory, '_directory', directory)
+    agents.places_cache.clear()
+    # Places doesn't tag Target as a grocery store, so Nearby Search never returns it
+    maps = SyntheticMaps(seed=1, nearby_chains=('Walmart', 'Kroger'))
+    session = SyntheticSession(maps)
+    monkeypatch.setattr(maps_client, '_client', maps_client.MapsClient(session=session))
+    queries = []
+    handle = maps.handle
+    monkeypatch.setattr(maps, 'handle', lambda endpoint, params: queries.append((endpoint, params.get('query'))) or handle(endpoint, params))
+
+    found = agents.search_nearby_places(39.96, -83.0, ['Walmart', 'Target'], 'key', 50)
+
+    # Target falls back to its own text search; Walmart needs none
+    text_searches = [query for endpoint, query in queries if endpoint == 'place/textsearch']
+    assert len(text_searches) == 1 and text_searches[0].startswith('Target near')
+    assert found['Target'] and all('Target' in p['name'] for p in found['Target'])
+    assert found['Walmart']
+    # The search radius is capped at 50 km, so 50 miles was never explored
+    assert agents.places_cache.get('Walmart', 39.96, -83.0, 50) is None
+    assert directory.search('Walmart', 39.96, -83.0, 50) is None
+    agents.places_cache.clear()
+
+
+def test_maps_client_retries_over_query_limit(monkeypatch):
+    responses = [{'status': 'OVER_QUERY_LIMIT'}, {'status': 'OVER_QUERY_LIMIT'}, {'status': 'OK', 'results': []}]
+    calls = []
+
+    def fake_get(url, params=None, timeout=None, **kwargs):
+        calls.append((url, timeout))
+        return _FakeResponse(responses[len(calls) - 1])
+
+    monkeypatch.setattr(maps_client.time, 'sleep', lambda seconds: None)
+    client = maps_client.MapsClient(base_url='http://maps.local/api', session=_FakeSession(fake_get))
+
+    assert client.get_json('geocode', {'address': 'x'}) == {'status': 'OK', 'results': []}
+    assert calls == [('http://maps.local/api/geocode/json', 15)] * 3
+
+
+def test_maps_client_reports_http_errors_after_retries(monkeypatch):
+    class _ErrorPage:
+        status_code = 503
+        content = b'<html>Service Unavailable</html>'
+        headers = {}
+
+        def json(self):
+            raise ValueError('not JSON')
+
+    calls = []
+
+    def fake_get(url, params=None, timeout=None, **kwargs):
+        calls.append(url)
+        return _ErrorPage()
+
+    monkeypatch.setattr(maps_client.time, 'sleep', lambda seconds: None)
+    client = maps_client.MapsClient(base_url='http://maps.local/api', session=_FakeSession(fake_get))
+
+    data = client.get_json('geocode', {'address': 'x'})
+    assert data['status'] == maps_client.HTTP_ERROR_STATUS
+    assert '503' in data['error_message']
+    assert len(calls) == client.max_retries + 1
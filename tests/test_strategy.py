@@ -96,3 +96,151 @@ def test_scenario_3_strict_mode(monkeypatch):
     plan = strategist.find_best_strategy(stores, strict_mode=True, preferred_store_names=['Walmart', 'Target'])
     assert isinstance(plan, dict)
     assert plan['scenario'] == 'scenario_3_strict_mode'
+
+
+def test_single_plan_skips_the_travel_matrix(monkeypatch):
+    strategist, stores = _setup_strategist()
+    directions_calls = []
+
+    def fake_directions(loc, stores, optimize=True):
+        directions_calls.append([s['name'] for s in stores])
+        return {'distance_meters': 0, 'duration_seconds': 0, 'optimized_stores': stores, 'overview_polyline': 'abc'}
+
+    def no_matrix(loc, stores):
+        raise AssertionError('travel matrix fetched for a single plan')
+
+    monkeypatch.setattr(agents, 'get_trip_details_from_api', fake_directions)
+    monkeypatch.setattr(agents, 'get_travel_matrix_from_api', no_matrix)
+    plan = strategist.find_best_strategy(stores, strict_mode=True, preferred_store_names=['Walmart', 'Target'])
+
+    assert plan['scenario'] == 'scenario_3_strict_mode'
+    assert directions_calls == [['Target', 'Walmart']]
+    assert plan['route_polyline'] == 'abc'
+
+
+def test_travel_matrix_replaces_per_plan_directions(monkeypatch):
+    strategist, stores = _setup_strategist()
+    directions_calls = []
+
+    def fake_directions(loc, stores, optimize=True):
+        directions_calls.append([s['name'] for s in stores])
+        return {'distance_meters': 0, 'duration_seconds': 0, 'optimized_stores': stores, 'overview_polyline': 'abc'}
+
+    size = len(stores) + 1
+    monkeypatch.setattr(agents, 'get_trip_details_from_api', fake_directions)
+    monkeypatch.setattr(
+        agents,
+        'get_travel_matrix_from_api',
+        lambda loc, stores: agents.TravelMatrix(
+            stores, [[1000] * size] * size, [[60] * size] * size, cost_per_meter=0.001, cost_per_second=0.01
+        ),
+    )
+    matrix = strategist.price_matrix
+    assigned = []
+    assign = matrix.assign
+    monkeypatch.setattr(matrix, 'assign', lambda names: assigned.append(names) or assign(names))
+    plan = strategist.find_best_strategy(stores)
+
+    assert plan['scenario'] == 'scenario_1_no_preferences'
+    assert 3 <= plan['total_plans_evaluated'] <= 7
+    assert len(directions_calls) == 1
+    assert plan['route_polyline'] == 'abc'
+    # Candidates are scored from the search's item costs; only the winner is itemized
+    assert assigned == [plan['plan_stores']]
+    assert sum(len(entries) for entries in plan['shopping_list'].values()) == 3
+
+
+def test_price_matrix_assigns_cheapest_store_with_name_tiebreak():
+    from price_matrix import PriceMatrix
+    price_data = {
+        'milk': {'A': {'price': 2.0}, 'B': {'price': 1.0}, 'C': {'price': 1.0}},
+        'bread': {'A': {'price': 1.5}, 'B': {'price': 3.0}, 'C': {'price': 1.5}},
+    }
+    matrix = PriceMatrix(price_data, ['milk', 'bread'])
+
+    shopping_list, total = matrix.assign(['C', 'B', 'A'])
+    assert shopping_list == {'A': [{'item': 'bread', 'price': 1.5}], 'B': [{'item': 'milk', 'price': 1.0}]}
+    assert total == 2.5
+
+    shopping_list, total = matrix.assign(['C'])
+    assert list(shopping_list) == ['C'] and total == 2.5
+
+
+def test_subset_engine_finds_exhaustive_optimum():
+    import itertools
+    import random
+    from price_matrix import PriceMatrix, SubsetCostEngine
+    rng = random.Random(7)
+    stores = [f'S{i}' for i in range(9)]
+    items = [f'item{i}' for i in range(30)]
+    price_data = {i: {s: {'price': round(rng.uniform(1, 4), 2)} for s in stores} for i in items}
+    drive = {s: rng.uniform(0.5, 3) for s in stores}
+    matrix = PriceMatrix(price_data, items)
+
+    def total(names):
+        return round(matrix.assign(names)[1] + 2 * max(drive[s] for s in names) + 0.5 * len(names), 2)
+
+    evaluated = []
+
+    def evaluate(names, item_cost):
+        evaluated.append((total(names), names))
+        return evaluated[-1][0]
+
+    count = SubsetCostEngine(matrix, stores).search(evaluate, lambda names: 2 * max(drive[s] for s in names))
+    exhaustive = min(
+        (total(list(c)), list(c)) for k in range(1, 10) for c in itertools.combinations(stores, k)
+    )
+
+    assert min(evaluated) == exhaustive
+    assert count == len(evaluated) < 2 ** 9 - 1
+
+
+def test_subset_engine_skips_items_a_subset_cannot_price(monkeypatch):
+    import itertools
+    import random
+    import price_matrix
+    from price_matrix import PriceMatrix, SubsetCostEngine
+    stores = [f'S{i}' for i in range(6)]
+    items = [f'item{i}' for i in range(8)]
+    for numpy_available in (price_matrix.NUMPY_AVAILABLE, False):
+        monkeypatch.setattr(price_matrix, 'NUMPY_AVAILABLE', numpy_available)
+        for seed in range(40):
+            rng = random.Random(seed)
+            price_data = {i: {s: {'price': round(rng.uniform(1, 4), 2)} for s in stores} for i in items}
+            # Some items aren't sold everywhere; a plan without them skips them
+            for item in items[-2:]:
+                for s in rng.sample(stores, 4):
+                    del price_data[item][s]
+            drive = {s: rng.uniform(0.5, 3) for s in stores}
+            matrix = PriceMatrix(price_data, items)
+
+            def total(names, item_cost):
+                return round(item_cost + 2 * max(drive[s] for s in names) + 0.5 * len(names), 2)
+
+            evaluated = []
+
+            def evaluate(names, item_cost):
+                assert abs(item_cost - matrix.item_cost(names)) < 1e-9
+                evaluated.append(total(names, item_cost))
+                return evaluated[-1]
+
+            SubsetCostEngine(matrix, stores).search(evaluate, lambda names: 2 * max(drive[s] for s in names))
+            exhaustive = min(
+                total(list(c), matrix.item_cost(list(c)))
+                for k in range(1, 7)
+                for c in itertools.combinations(stores, k)
+            )
+            assert min(evaluated) == exhaustive
+
+
+def test_price_catalog_is_built_once_and_quotes_fallbacks():
+    from price_catalog import get_price_catalog
+    catalog = get_price_catalog()
+    assert get_price_catalog() is catalog
+
+    stores = [{'name': 'Walmart Supercenter', 'chain': 'Walmart'}, {'name': 'Corner Shop', 'chain': 'General'}]
+    prices = catalog.quote(['Milk', 'dragon fruit'], stores)
+
+    assert prices['Milk']['Walmart Supercenter']['price'] == catalog.prices['milk']['Walmart']
+    assert prices['Milk']['Corner Shop']['price'] == 3.0
+    assert prices['dragon fruit']['Walmart Supercenter'] == {'price': 2.7, 'confidence': 0.8}
@@ -0,0 +1,78 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Provide a minimal stub for the requests package so agents.py can be imported
+import types as _types
+requests_stub = _types.ModuleType('requests')
+def _dummy_get(*args, **kwargs):
+    class _Resp:
+        def json(self):
+            return {}
+    return _Resp()
+requests_stub.get = _dummy_get
+sys.modules.setdefault('requests', requests_stub)
+
+from concurrent.futures import ThreadPoolExecutor
+
+import maps_client
+import telemetry
+
+
+class _FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = {"Content-Length": "42"}
+
+    def json(self):
+        return self.payload
+
+
+class _FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def get(self, url, params=None, timeout=None):
+        return self.responses.pop(0)
+
+
+def test_trace_collects_spans_and_counters_across_threads():
+    with telemetry.trace() as trace:
+        with telemetry.span("outer"):
+            telemetry.count("things", 2)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            telemetry.submit_in_context(pool, telemetry.count, "things").result()
+    telemetry.count("things")  # outside the trace
+
+    summary = trace.summary()
+    assert summary["spans"]["outer"]["count"] == 1
+    assert summary["counters"]["things"] == 3
+    assert summary["total_seconds"] >= summary["spans"]["outer"]["total_seconds"]
+
+
+def test_maps_client_records_calls_retries_and_bytes():
+    session = _FakeSession([
+        _FakeResponse({"status": "OVER_QUERY_LIMIT"}),
+        _FakeResponse({"status": "OK", "results": []}),
+    ])
+    client = maps_client.MapsClient(session=session, backoff_base=0)
+    with telemetry.trace() as trace:
+        assert client.get_json("geocode", {})["status"] == "OK"
+
+    summary = trace.summary()
+    assert summary["spans"]["maps.geocode"]["count"] == 1
+    assert summary["counters"]["maps.geocode.calls"] == 1
+    assert summary["counters"]["maps.geocode.retries"] == 1
+    assert summary["counters"]["maps.geocode.bytes"] == 84
+
+
+def test_render_prometheus():
+    metrics = telemetry.Metrics()
+    metrics.record_span('maps."x"', 0.5)
+    metrics.increment("cache.places.hits", 3)
+    text = telemetry.render_prometheus(metrics)
+    assert 'grocery_span_seconds_sum{span="maps.\\"x\\""} 0.5' in text
+    assert 'grocery_span_seconds_count{span="maps.\\"x\\""} 1' in text
+    assert 'grocery_events_total{name="cache.places.hits"} 3' in text
+    assert text.endswith("\n")
@@ -95,6 +95,9 @@ def test_execute_workflow_returns_dict(monkeypatch):
     assert isinstance(result, dict)
     assert result['status'] == 'success'
     assert 'advisor_response' in result
+    timings = result['workflow_metadata']['timings']
+    assert timings['spans']['stage.store_finder']['count'] == 1
+    assert 'stage.shopping_strategist' in timings['spans']
 
 
 def test_calculate_travel_costs():
@@ -102,3 +105,268 @@ def test_calculate_travel_costs():
     assert result['gas_cost'] == 0.14
     assert result['time_hours'] == 1.0
     assert result['total_travel_cost'] == 20.14
+
+
+def test_async_workflow_skips_timed_out_optional_stage(monkeypatch):
+    import asyncio
+    import time
+    import app
+    monkeypatch.setattr(app, "ADK_AVAILABLE", False)
+    store = {'name': 'StoreA', 'address': 'A', 'lat': 0, 'lng': 0, 'chain': 'A'}
+    monkeypatch.setattr(app, "find_stores_with_maps_api", lambda loc, chains, max_distance: [store])
+    price_data = mock_data.get_scenario1_data()
+    first_item = next(iter(price_data))
+    monkeypatch.setattr(app, "estimate_prices_simple", lambda items, stores: price_data)
+    dummy_plan = {
+        'plan_stores': ['StoreA'],
+        'optimized_stores_in_route': [store],
+        'shopping_list': {'StoreA': [{'item': first_item, 'price': 1.0}]},
+        'item_cost': 1.0,
+        'travel_costs': {'gas_cost': 0, 'distance_miles': 0, 'time_hours': 0},
+        'total_plan_cost': 1.0,
+        'savings': 0,
+        'scenario': 'scenario_1_no_preferences'
+    }
+    monkeypatch.setattr(app.ShoppingStrategist, 'find_best_strategy', lambda self, **kw: dummy_plan)
+    monkeypatch.setattr(app, 'create_Maps_url', lambda loc, stores: 'http://maps.example')
+
+    def slow_route(self, *args):
+        time.sleep(0.5)
+        return {"maps_url": "http://too.late"}
+
+    monkeypatch.setattr(GoogleADKMultiAgent, '_optimize_route', slow_route)
+
+    workflow = GoogleADKMultiAgent(stage_timeouts={"route_optimizer": 0.05})
+    result = asyncio.run(
+        workflow.execute_shopping_workflow_async(
+            {'lat': 0, 'lng': 0, 'formatted_address': 'Test'}, [first_item], [], False
+        )
+    )
+
+    assert result['status'] == 'success'
+    assert result['maps_url'] == 'http://maps.example'
+    assert result['advisor_response']
+
+
+def test_sync_workflow_returns_when_a_stage_times_out(monkeypatch):
+    import time
+    import app
+    monkeypatch.setattr(app, "ADK_AVAILABLE", False)
+
+    def slow_find(loc, chains, max_distance):
+        time.sleep(1.5)
+        return []
+
+    monkeypatch.setattr(app, "find_stores_with_maps_api", slow_find)
+    workflow = GoogleADKMultiAgent(stage_timeouts={"store_finder": 0.2})
+    started = time.monotonic()
+    result = workflow.execute_shopping_workflow(
+        {'lat': 0, 'lng': 0, 'formatted_address': 'Test'}, ['milk'], [], False
+    )
+    # The abandoned stage keeps its thread, but the caller doesn't wait for it
+    assert time.monotonic() - started < 1.0
+    assert result['status'] == 'error'
+
+
+def test_hung_stage_does_not_starve_later_workflows(monkeypatch):
+    import threading
+    import time
+    import app
+    monkeypatch.setattr(app, "ADK_AVAILABLE", False)
+    # One thread per pool: a shared pool would stay blocked by the hung stage
+    monkeypatch.setattr(app, "WORKFLOW_POOL_THREADS", 1)
+    release = threading.Event()
+    calls = []
+
+    def find(loc, chains, max_distance):
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+        return []
+
+    monkeypatch.setattr(app, "find_stores_with_maps_api", find)
+    workflow = GoogleADKMultiAgent(stage_timeouts={"store_finder": 0.2})
+    location = {'lat': 0, 'lng': 0, 'formatted_address': 'Test'}
+    try:
+        workflow.execute_shopping_workflow(location, ['milk'], [], False)
+        started = time.monotonic()
+        workflow.execute_shopping_workflow(location, ['milk'], [], False)
+        # The second run's store search ran rather than queueing behind the first
+        assert len(calls) == 2
+        assert time.monotonic() - started < 0.2
+    finally:
+        release.set()
+
+
+def test_iter_workflow_yields_stage_events_in_order(monkeypatch):
+    import app
+    monkeypatch.setattr(app, "ADK_AVAILABLE", False)
+    store = {'name': 'StoreA', 'address': 'A', 'lat': 0, 'lng': 0, 'chain': 'A'}
+
+    def fake_find(loc, chains, max_distance, on_store=None):
+        on_store(store)
+        return [store]
+
+    monkeypatch.setattr(app, "find_stores_with_maps_api", fake_find)
+    price_data = mock_data.get_scenario1_data()
+    first_item = next(iter(price_data))
+    monkeypatch.setattr(app, "estimate_prices_simple", lambda items, stores: price_data)
+    dummy_plan = {
+        'plan_stores': ['StoreA'],
+        'optimized_stores_in_route': [store],
+        'shopping_list': {'StoreA': [{'item': first_item, 'price': 1.0}]},
+        'item_cost': 1.0,
+        'travel_costs': {'gas_cost': 0, 'distance_miles': 0, 'time_hours': 0},
+        'total_plan_cost': 1.0,
+        'savings': 0,
+        'scenario': 'scenario_1_no_preferences'
+    }
+
+    def fake_strategy(self, on_plan=None, **kw):
+        on_plan(dummy_plan, 1)
+        return dummy_plan
+
+    monkeypatch.setattr(app.ShoppingStrategist, 'find_best_strategy', fake_strategy)
+    monkeypatch.setattr(app, 'create_Maps_url', lambda loc, stores: 'http://maps.example')
+
+    location = {'lat': 0, 'lng': 0, 'formatted_address': 'Test'}
+    events = list(GoogleADKMultiAgent().iter_shopping_workflow(location, [first_item], [], False))
+
+    assert [e.kind for e in events] == [
+        'location', 'store_found', 'stores_ready', 'prices_ready',
+        'plans_evaluated', 'best_plan', 'route', 'result',
+    ]
+    assert events[1].data == store
+    assert events[4].data == {'plans_evaluated': 1, 'best_plan': dummy_plan}
+    assert events[6].data['maps_url'] == 'http://maps.example'
+    assert events[-1].data['status'] == 'success'
+
+
+def test_speculation_takes_first_valid_result(monkeypatch):
+    import time
+    import app
+    monkeypatch.setattr(app, "ADK_AVAILABLE", True)
+
+    class _Agent:
+        name = "fake"
+
+        def __init__(self, delay, reply):
+            self.delay, self.reply = delay, reply
+
+        def run(self, request):
+            time.sleep(self.delay)
+            return app.AgentResponse(content=self.reply)
+
+    def parse(response):
+        return response.content if isinstance(response, app.AgentResponse) else None
+
+    def slow_fallback():
+        time.sleep(0.3)
+        return "fallback"
+
+    workflow = GoogleADKMultiAgent(stage_timeouts={"price_optimizer": 0.05})
+    # A fast, valid agent answer beats the deterministic path
+    assert workflow._speculate("store_finder", _Agent(0, "agent"), "req", parse, slow_fallback) == "agent"
+    # Invalid answers and agents over budget fall through to the fallback
+    assert workflow._speculate("store_finder", _Agent(0, None), "req", parse, slow_fallback) == "fallback"
+    started = time.monotonic()
+    assert workflow._speculate("price_optimizer", _Agent(1, "late"), "req", parse, lambda: "fallback") == "fallback"
+    assert time.monotonic() - started < 0.5
+
+    # Agent-only stages give up once the agent's share of the deadline is spent
+    workflow = GoogleADKMultiAgent(deadline_seconds=1, agent_deadline_shares={"route_optimizer": 0.05})
+    workflow.route_optimizer_agent = _Agent(1, {"maps_url": "http://too.late"})
+    token = app._current_deadline.set(app._Deadline(1))
+    started = time.monotonic()
+    try:
+        assert workflow._optimize_route({}, {'optimized_stores_in_route': []}, 5) is None
+    finally:
+        app._current_deadline.reset(token)
+    assert time.monotonic() - started < 0.5
+
+
+def test_speculation_waits_for_agent_when_fallback_fails(monkeypatch):
+    import time
+    import app
+    import pytest
+    monkeypatch.setattr(app, "ADK_AVAILABLE", True)
+
+    class _Agent:
+        name = "fake"
+
+        def __init__(self, reply):
+            self.reply = reply
+
+        def run(self, request):
+            time.sleep(0.1)
+            return app.AgentResponse(content=self.reply)
+
+    def no_key():
+        raise ValueError("Google Maps API key is required.")
+
+    def parse(response):
+        return response.content if isinstance(response, app.AgentResponse) else None
+
+    workflow = GoogleADKMultiAgent()
+    assert workflow._speculate("store_finder", _Agent(["A"]), "req", parse, no_key) == ["A"]
+    # The fallback's error surfaces only once the agent has failed as well
+    with pytest.raises(ValueError, match="API key"):
+        workflow._speculate("store_finder", _Agent(None), "req", parse, no_key)
+
+
+def test_store_events_come_only_from_the_winning_source(monkeypatch):
+    import time
+    import app
+    monkeypatch.setattr(app, "ADK_AVAILABLE", True)
+    maps_store = {'name': 'Maps Store', 'lat': 0, 'lng': 0, 'chain': 'A'}
+    agent_store = {'name': 'Agent Store', 'lat': 0, 'lng': 0, 'chain': 'A'}
+
+    def slow_find(loc, chains, max_distance, on_store=None):
+        on_store(maps_store)
+        time.sleep(0.2)
+        return [maps_store]
+
+    class _Agent:
+        name = "fake"
+
+        def __init__(self, reply):
+            self.reply = reply
+
+        def run(self, request):
+            time.sleep(0.05)
+            return app.AgentResponse(content=self.reply)
+
+    monkeypatch.setattr(app, "find_stores_with_maps_api", slow_find)
+    location = {'lat': 0, 'lng': 0, 'formatted_address': 'Test'}
+
+    workflow = GoogleADKMultiAgent()
+    workflow.store_finder_agent = _Agent([agent_store])
+    found = []
+    assert workflow._find_stores(location, ['A'], 5, False, [], found.append) == [agent_store]
+    assert found == [agent_store]
+
+    # An unusable agent answer lets the Maps search's events through
+    workflow.store_finder_agent = _Agent("no stores, sorry")
+    found = []
+    assert workflow._find_stores(location, ['A'], 5, False, [], found.append) == [maps_store]
+    assert found == [maps_store]
+
+
+def test_deadline_bounds_streamed_workflow(monkeypatch):
+    import time
+    import app
+    monkeypatch.setattr(app, "ADK_AVAILABLE", False)
+
+    def slow_find(loc, chains, max_distance, on_store=None):
+        time.sleep(1.5)
+        return []
+
+    monkeypatch.setattr(app, "find_stores_with_maps_api", slow_find)
+    workflow = GoogleADKMultiAgent(deadline_seconds=0.3)
+    location = {'lat': 0, 'lng': 0, 'formatted_address': 'Test'}
+    started = time.monotonic()
+    events = list(workflow.iter_shopping_workflow(location, ['milk'], [], False))
+    elapsed = time.monotonic() - started
+
+    assert events[-1].kind == 'result'
+    assert elapsed < 0.3 + 0.5